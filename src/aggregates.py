@@ -0,0 +1,350 @@
+"""
+Incremental aggregates of test results.
+
+Every final result of a test updates running statistics per chain, test, solver, and value:
+count, sum, mean, variance, min, max, and a quantile sketch. Statistics are kept over all time
+and over rolling windows, see AGGREGATE_WINDOWS_IN_SEC. Windows consist of time buckets of width
+AGGREGATE_BUCKET_IN_SEC, so that recording a value is O(1) and only the buckets of a window are
+merged when it is queried. Windows are aligned to buckets, i.e. a window of one hour covers the
+current bucket and the buckets of the preceding hour. Results of runs which need to be run again
+are not aggregated, see BaseTest.finish_run.
+
+Aggregates over all solvers are kept under the empty solver, and aggregates over all chains
+under the empty chain. Whether a result raised an alert is aggregated as value `alert`, so its
+mean is the alert rate.
+
+Aggregates are served as JSON on localhost, on the port AGGREGATES_PORT:
+
+    GET /aggregates?test=HighScoreTest&solver=0x...&chain=mainnet&window=1h
+"""
+
+from __future__ import annotations
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Optional
+from urllib.parse import parse_qs, urlparse
+from src.helper_functions import get_logger
+from src.results import Result
+from src.constants import (
+    AGGREGATE_BUCKET_IN_SEC,
+    AGGREGATE_QUANTILE_ACCURACY,
+    AGGREGATE_WINDOWS_IN_SEC,
+    AGGREGATES_PORT,
+)
+
+# name of the window over all time
+ALL_TIME = "all"
+QUANTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99}
+
+
+class RunningStats:
+    """Count, mean, variance, min, and max of a stream of values, using Welford's algorithm."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    def add(self, value: float) -> None:
+        """Add a value."""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+
+    def merge(self, other: RunningStats) -> None:
+        """Add all values of other, using the parallel variant of Welford's algorithm."""
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta**2 * self.count * other.count / count
+        self.count = count
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    @property
+    def variance(self) -> float:
+        """Population variance of the values."""
+        return self.m2 / self.count if self.count > 0 else 0.0
+
+    @property
+    def total(self) -> float:
+        """Sum of the values."""
+        return self.mean * self.count
+
+
+class QuantileSketch:
+    """
+    Sketch of the distribution of a stream of values, in the style of DDSketch. Values are
+    counted in logarithmic bins, so that quantiles are estimated with the given relative
+    accuracy, using memory logarithmic in the range of values.
+    """
+
+    def __init__(self, relative_accuracy: float = AGGREGATE_QUANTILE_ACCURACY) -> None:
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.positive: dict[int, int] = {}
+        self.negative: dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, value: float) -> None:
+        """Add a value."""
+        self.count += 1
+        if value > 0:
+            index = math.ceil(math.log(value) / self.log_gamma)
+            self.positive[index] = self.positive.get(index, 0) + 1
+        elif value < 0:
+            index = math.ceil(math.log(-value) / self.log_gamma)
+            self.negative[index] = self.negative.get(index, 0) + 1
+        else:
+            self.zeros += 1
+
+    def merge(self, other: QuantileSketch) -> None:
+        """Add all values of other, which must have the same accuracy."""
+        for index, count in other.positive.items():
+            self.positive[index] = self.positive.get(index, 0) + count
+        for index, count in other.negative.items():
+            self.negative[index] = self.negative.get(index, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+
+    def bin_value(self, index: int) -> float:
+        """Estimate of the absolute value of values in a bin."""
+        return 2 * self.gamma**index / (self.gamma + 1)
+
+    def quantile(self, quantile: float) -> Optional[float]:
+        """Estimate of a quantile of the values, None if there are no values."""
+        if self.count == 0:
+            return None
+        rank = quantile * (self.count - 1)
+        seen = 0
+        for index in sorted(self.negative, reverse=True):
+            seen += self.negative[index]
+            if seen > rank:
+                return -self.bin_value(index)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.positive):
+            seen += self.positive[index]
+            if seen > rank:
+                return self.bin_value(index)
+        return self.bin_value(max(self.positive))
+
+
+class RollingAggregate:
+    """
+    Statistics and quantile sketch of a stream of values over all time and over the buckets of
+    the last retention seconds.
+    """
+
+    def __init__(self, bucket_width: float, retention: float) -> None:
+        self.bucket_width = bucket_width
+        self.retention_buckets = math.ceil(retention / bucket_width)
+        self.stats = RunningStats()
+        self.sketch = QuantileSketch()
+        self.buckets: deque[tuple[int, RunningStats, QuantileSketch]] = deque()
+
+    def add(self, value: float, now: float) -> None:
+        """Add a value recorded at time now."""
+        self.stats.add(value)
+        self.sketch.add(value)
+        index = int(now // self.bucket_width)
+        if not self.buckets or self.buckets[-1][0] != index:
+            self.buckets.append((index, RunningStats(), QuantileSketch()))
+        while self.buckets[0][0] < index - self.retention_buckets:
+            self.buckets.popleft()
+        _, stats, sketch = self.buckets[-1]
+        stats.add(value)
+        sketch.add(value)
+
+    def window(
+        self, window: Optional[float], now: float
+    ) -> tuple[RunningStats, QuantileSketch]:
+        """Statistics and sketch of the values of a window, or of all values if it is None."""
+        if window is None:
+            return self.stats, self.sketch
+        first_index = int(now // self.bucket_width) - math.ceil(
+            window / self.bucket_width
+        )
+        stats, sketch = RunningStats(), QuantileSketch()
+        for index, bucket_stats, bucket_sketch in self.buckets:
+            if index >= first_index:
+                stats.merge(bucket_stats)
+                sketch.merge(bucket_sketch)
+        return stats, sketch
+
+    def summary(self, window: Optional[float], now: float) -> dict[str, Any]:
+        """Summary of the values of a window as JSON serializable dict."""
+        stats, sketch = self.window(window, now)
+        summary: dict[str, Any] = {
+            "count": stats.count,
+            "total": stats.total,
+            "mean": stats.mean,
+            "variance": stats.variance,
+            "min": stats.minimum if stats.count > 0 else None,
+            "max": stats.maximum if stats.count > 0 else None,
+        }
+        for name, quantile in QUANTILES.items():
+            summary[name] = sketch.quantile(quantile)
+        return summary
+
+
+class Aggregator:
+    """Rolling aggregates of the values of results per chain, test, solver, and value."""
+
+    def __init__(
+        self,
+        windows: Optional[dict[str, float]] = None,
+        bucket_width: float = AGGREGATE_BUCKET_IN_SEC,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.windows = windows if windows is not None else AGGREGATE_WINDOWS_IN_SEC
+        self.bucket_width = bucket_width
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.aggregates: dict[tuple[str, str, str, str], RollingAggregate] = {}
+
+    def record(self, result: Result) -> None:
+        """
+        Update the aggregates of the chain and solver of a result, and those over all chains and
+        solvers.
+        """
+        values = dict(result.values, alert=float(result.alert))
+        solvers = {result.solver, ""}
+        chains = {result.chain, ""}
+        now = self.clock()
+        with self.lock:
+            for name, value in values.items():
+                for chain in chains:
+                    for solver in solvers:
+                        key = (chain, result.test, solver, name)
+                        if key not in self.aggregates:
+                            self.aggregates[key] = RollingAggregate(
+                                self.bucket_width,
+                                max(self.windows.values(), default=0),
+                            )
+                        self.aggregates[key].add(value, now)
+
+    def window_length(self, window: str) -> Optional[float]:
+        """Length of a window in seconds, None for all time."""
+        if window == ALL_TIME:
+            return None
+        if window not in self.windows:
+            raise ValueError(f"Unknown window {window}.")
+        return self.windows[window]
+
+    def get(
+        self,
+        test: str,
+        solver: str,
+        value: str,
+        window: str = ALL_TIME,
+        chain: str = "",
+    ) -> Optional[dict[str, Any]]:
+        """
+        Summary of a value of a test, solver, and chain over a window, or None if it was never
+        recorded. The empty solver aggregates all solvers, the empty chain all chains.
+        """
+        length = self.window_length(window)
+        with self.lock:
+            aggregate = self.aggregates.get((chain, test, solver, value))
+            if aggregate is None:
+                return None
+            return aggregate.summary(length, self.clock())
+
+    def query(
+        self,
+        test: Optional[str] = None,
+        solver: Optional[str] = None,
+        window: str = ALL_TIME,
+        chain: Optional[str] = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Summaries of all aggregates over a window, optionally of one test, solver, or chain only.
+        """
+        length = self.window_length(window)
+        now = self.clock()
+        with self.lock:
+            return [
+                {
+                    "chain": key[0],
+                    "test": key[1],
+                    "solver": key[2],
+                    "value": key[3],
+                    "window": window,
+                    **aggregate.summary(length, now),
+                }
+                for key, aggregate in sorted(self.aggregates.items())
+                if chain in (None, key[0])
+                and test in (None, key[1])
+                and solver in (None, key[2])
+            ]
+
+
+@lru_cache(maxsize=1)
+def get_aggregator() -> Aggregator:
+    """Get the process wide aggregator. It is created on first use."""
+    return Aggregator()
+
+
+class AggregatesHandler(BaseHTTPRequestHandler):
+    """Serves aggregates of the process wide aggregator as JSON."""
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """Serve GET /aggregates with optional parameters test, solver, chain, and window."""
+        url = urlparse(self.path)
+        if url.path != "/aggregates":
+            self.send_error(404)
+            return
+        parameters = {key: values[0] for key, values in parse_qs(url.query).items()}
+        try:
+            aggregates = get_aggregator().query(
+                parameters.get("test"),
+                parameters.get("solver"),
+                parameters.get("window", ALL_TIME),
+                parameters.get("chain"),
+            )
+        except ValueError as err:
+            self.send_error(400, str(err))
+            return
+        body = json.dumps(aggregates).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:  # pylint: disable=W0622
+        get_logger(type(self).__name__).debug(format, *args)
+
+
+def start_aggregates_server(
+    port: Optional[int] = None,
+) -> Optional[ThreadingHTTPServer]:
+    """
+    Serve aggregates on localhost in a background thread, on the port AGGREGATES_PORT, which can
+    be overwritten by the environment variable of the same name. Setting the port to 0 disables
+    the server.
+    """
+    if port is None:
+        port = int(os.getenv("AGGREGATES_PORT", str(AGGREGATES_PORT)))
+    if port <= 0:
+        return None
+    server = ThreadingHTTPServer(("127.0.0.1", port), AggregatesHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,302 @@
+"""
+Suppression of repeated alerts and asynchronous delivery of alerts to Slack.
+
+Repeated alerts with the same key, e.g. the same test, solver, and token pair, are suppressed
+within a window and summarized when the window closes.
+
+Alerts are put into a bounded queue and delivered by a background thread, so that a slow or
+rate limited Slack API never blocks the execution of tests. Alerts arriving within a short
+interval are coalesced into one message per source, messages are rate limited with a token
+bucket, and failed deliveries are retried with exponential backoff.
+"""
+
+from __future__ import annotations
+import atexit
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, Hashable, Optional
+from src.helper_functions import get_logger
+from src.constants import (
+    ALERT_QUEUE_SIZE,
+    ALERT_FLUSH_INTERVAL_IN_SEC,
+    ALERT_MAX_RETRIES,
+    SLACK_MESSAGE_MAX_LENGTH,
+    SLACK_RATE_LIMIT_PER_SEC,
+    SLACK_RATE_LIMIT_BURST,
+)
+
+if TYPE_CHECKING:
+    from slack_sdk import WebClient
+
+
+@dataclass
+class SuppressionWindow:
+    """Class for the state of alerts with one key within a suppression window."""
+
+    start: float
+    suppressed: int
+    last_msg: str
+
+
+class AlertSuppressor:
+    """
+    In-memory index of suppression windows. The first alert for a key opens a window of `window`
+    seconds, during which further alerts for that key are only counted. When the window closes,
+    a summary is returned if alerts were suppressed.
+    """
+
+    def __init__(
+        self, window: float, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.window = window
+        self.clock = clock
+        self.windows: dict[Hashable, SuppressionWindow] = {}
+
+    def check(self, key: Hashable, msg: str) -> bool:
+        """
+        Register an alert for key. Returns True if the alert should be emitted and False if it
+        is suppressed.
+        """
+        now = self.clock()
+        window = self.windows.get(key)
+        if window is None or now - window.start >= self.window:
+            self.windows[key] = SuppressionWindow(now, 0, msg)
+            return True
+        window.suppressed += 1
+        window.last_msg = msg
+        return False
+
+    def expire(self) -> list[str]:
+        """
+        Close all windows which are older than the suppression window and return summaries for
+        those in which alerts were suppressed.
+        """
+        now = self.clock()
+        summaries: list[str] = []
+        for key, window in list(self.windows.items()):
+            if now - window.start < self.window:
+                continue
+            del self.windows[key]
+            if window.suppressed > 0:
+                summaries.append(
+                    f"{window.suppressed} repeated alerts suppressed for {key} within "
+                    f"{self.window:.0f}s. Last alert: {window.last_msg}"
+                )
+        return summaries
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter. Tokens are refilled continuously at `rate` tokens per second, up
+    to `capacity` tokens.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: int,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = float(capacity)
+        self.timestamp = clock()
+
+    def refill(self) -> None:
+        """Add tokens for the time passed since the last refill."""
+        now = self.clock()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.timestamp) * self.rate
+        )
+        self.timestamp = now
+
+    def acquire(self) -> None:
+        """Take one token, waiting until one is available."""
+        self.refill()
+        while self.tokens < 1:
+            self.sleep((1 - self.tokens) / self.rate)
+            self.refill()
+        self.tokens -= 1
+
+
+class SlackAlertDispatcher:
+    """
+    Background sink for alerts. Alerts are submitted without blocking and delivered by a worker
+    thread. All alerts submitted within ALERT_FLUSH_INTERVAL_IN_SEC of the first alert of a batch
+    are coalesced into one message per source, e.g. per test.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self,
+        client: WebClient,
+        channel: str,
+        *,
+        max_queue_size: int = ALERT_QUEUE_SIZE,
+        flush_interval: float = ALERT_FLUSH_INTERVAL_IN_SEC,
+        rate_limiter: Optional[TokenBucket] = None,
+        max_retries: int = ALERT_MAX_RETRIES,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.client = client
+        self.channel = channel
+        self.queue: queue.Queue[Optional[tuple[str, str]]] = queue.Queue(
+            maxsize=max_queue_size
+        )
+        self.flush_interval = flush_interval
+        self.rate_limiter = rate_limiter or TokenBucket(
+            SLACK_RATE_LIMIT_PER_SEC, SLACK_RATE_LIMIT_BURST
+        )
+        self.max_retries = max_retries
+        self.sleep = sleep
+        self.logger = get_logger(type(self).__name__)
+        self.dropped = 0
+        self.thread = threading.Thread(
+            target=self.run, name="slack-alert-dispatcher", daemon=True
+        )
+        self.thread.start()
+
+    def submit(self, source: str, msg: str) -> bool:
+        """
+        Submit an alert without blocking. Returns False if the queue is full and the alert was
+        dropped.
+        """
+        try:
+            self.queue.put_nowait((source, msg))
+        except queue.Full:
+            self.dropped += 1
+            self.logger.warning(
+                "Alert queue full, dropped %s alerts so far.", self.dropped
+            )
+            return False
+        return True
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Deliver all submitted alerts and stop the worker thread. If the queue stays full for
+        timeout seconds, or the flush interval if no timeout is given, e.g. while Slack is rate
+        limited, pending alerts are dropped so that stopping does not hang.
+        """
+        if not self.thread.is_alive():
+            return
+        try:
+            self.queue.put(
+                None, timeout=timeout if timeout is not None else self.flush_interval
+            )
+        except queue.Full:
+            while True:
+                self.drop_pending()
+                try:
+                    self.queue.put_nowait(None)
+                    break
+                except queue.Full:
+                    continue
+        self.thread.join(timeout)
+
+    def drop_pending(self) -> None:
+        """
+        Drop all alerts in the queue which were not taken by the worker thread yet.
+        """
+        dropped = 0
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
+            dropped += 1
+        self.dropped += dropped
+        self.logger.warning(
+            "Alert queue full while stopping, dropped %s pending alerts.", dropped
+        )
+
+    def run(self) -> None:
+        """
+        Worker loop: collect alerts for one flush interval, then deliver them.
+        """
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self.deliver(batch)
+
+    def deliver(self, batch: list[tuple[str, str]]) -> None:
+        """
+        Coalesce a batch of alerts into one message per source and post the messages.
+        """
+        alerts_per_source: dict[str, list[str]] = {}
+        for source, msg in batch:
+            alerts_per_source.setdefault(source, []).append(msg)
+        for source, msgs in alerts_per_source.items():
+            if len(msgs) == 1:
+                text = msgs[0]
+            else:
+                text = "\n".join([f"{len(msgs)} alerts from {source}:", *msgs])
+            for start in range(0, len(text), SLACK_MESSAGE_MAX_LENGTH):
+                self.post(text[start : start + SLACK_MESSAGE_MAX_LENGTH])
+
+    def post(self, text: str) -> bool:
+        """
+        Post a message to Slack, respecting the rate limit. Failed requests are retried with
+        exponential backoff, using the Retry-After header of rate limited responses if present.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                self.client.chat_postMessage(channel=self.channel, text=text)
+                return True
+            except Exception as err:  # pylint: disable=W0718
+                backoff = float(2**attempt)
+                response = getattr(err, "response", None)
+                if response is not None and response.status_code == 429:
+                    backoff = float(response.headers.get("Retry-After", backoff))
+                self.logger.warning(
+                    "Error of type %s while posting alert "
+                    "(attempt %s), retrying in %ss: %s",
+                    type(err),
+                    attempt + 1,
+                    backoff,
+                    err,
+                )
+                if attempt < self.max_retries:
+                    self.sleep(backoff)
+        self.logger.error("Could not deliver alert to Slack: %s", text)
+        return False
+
+
+@lru_cache(maxsize=1)
+def get_alert_dispatcher() -> Optional[SlackAlertDispatcher]:
+    """
+    Get the process wide alert dispatcher. It is created on first use if SLACK_BOT_TOKEN is set,
+    and None is returned otherwise.
+    """
+    if "SLACK_BOT_TOKEN" not in os.environ:
+        return None
+    # slack_sdk is only imported if alerts are sent to Slack
+    from slack_sdk import WebClient  # pylint: disable=import-outside-toplevel
+
+    dispatcher = SlackAlertDispatcher(
+        WebClient(token=os.environ["SLACK_BOT_TOKEN"]),
+        os.environ.get("SLACK_CHANNEL", "#alerts-ebbo"),
+    )
+    atexit.register(dispatcher.stop, 2 * ALERT_FLUSH_INTERVAL_IN_SEC)
+    return dispatcher
@@ -2,14 +2,13 @@
 API for fetching auction instances from AWS.
 """
 
-# pylint: disable=logging-fstring-interpolation
-
 from typing import Any, Optional
 from copy import deepcopy
 import json
 import requests
 from src.models import OrderData
-from src.helper_functions import get_logger
+from src.helper_functions import get_logger, get_session
+from src.metrics import observe_api_request
 from src.constants import (
     header,
     REQUEST_TIMEOUT,
@@ -30,18 +29,21 @@ class AuctionInstanceAPI:
     Class for fetching auction instance files from AWS.
     """
 
-    def __init__(self) -> None:
-        self.logger = get_logger()
+    def __init__(self, base_url: Optional[str] = None) -> None:
+        self.logger = get_logger(type(self).__name__)
+        self.prod_base_url = base_url or PROD_BASE_URL
+        self.barn_base_url = base_url or BARN_BASE_URL
 
+    @observe_api_request("auction_instance")
     def get_auction_instance(self, auction_id: int) -> Optional[dict[str, Any]]:
         """
         Get auction instance files for an auction id.
         """
-        prod_endpoint_url = f"{PROD_BASE_URL}{auction_id}.json"
-        barn_endpoint_url = f"{BARN_BASE_URL}{auction_id}.json"
+        prod_endpoint_url = f"{self.prod_base_url}{auction_id}.json"
+        barn_endpoint_url = f"{self.barn_base_url}{auction_id}.json"
         auction_instance: Optional[dict[str, Any]] = None
         try:
-            json_auction_instance = requests.get(
+            json_auction_instance = get_session().get(
                 prod_endpoint_url,
                 headers=header,
                 timeout=REQUEST_TIMEOUT,
@@ -49,7 +51,7 @@ class AuctionInstanceAPI:
             if json_auction_instance.status_code == SUCCESS_CODE:
                 auction_instance = json.loads(json_auction_instance.text)
             elif json_auction_instance.status_code == FAIL_CODE:
-                json_auction_instance = requests.get(
+                json_auction_instance = get_session().get(
                     barn_endpoint_url, headers=header, timeout=REQUEST_TIMEOUT
                 )
                 if json_auction_instance.status_code == SUCCESS_CODE:
@@ -59,7 +61,9 @@ class AuctionInstanceAPI:
         except requests.RequestException as err:
             self.logger.warning(
                 "Connection error while fetching auction instance. "
-                f"Auction ID: {auction_id}, error: {err}"
+                "Auction ID: %s, error: %s",
+                auction_id,
+                err,
             )
             return None
         return auction_instance
@@ -2,11 +2,10 @@
 CoingeckoAPI for fetching the price in usd of a given token.
 """
 
-# pylint: disable=logging-fstring-interpolation
-
 from typing import Optional
 import requests
-from src.helper_functions import get_logger
+from src.helper_functions import get_logger, get_session
+from src.metrics import observe_api_request
 from src.constants import (
     header,
     REQUEST_TIMEOUT,
@@ -15,23 +14,27 @@ from src.constants import (
 
 class CoingeckoAPI:
     """
-    Class for fetching token prices from Coingecko.
+    Class for fetching token prices from Coingecko, for tokens on the given asset platform, see
+    COINGECKO_PLATFORMS.
     """
 
-    def __init__(self) -> None:
-        self.logger = get_logger()
+    def __init__(self, platform: str = "ethereum") -> None:
+        self.logger = get_logger(type(self).__name__)
+        self.platform = platform
 
+    @observe_api_request("coingecko")
     def get_token_price_in_usd(self, address: str) -> Optional[float]:
         """
         Returns the Coingecko price in usd of the given token.
         """
         coingecko_url = (
-            "https://api.coingecko.com/api/v3/simple/token_price/ethereum?contract_addresses="
+            f"https://api.coingecko.com/api/v3/simple/token_price/{self.platform}"
+            + "?contract_addresses="
             + address
             + "&vs_currencies=usd"
         )
         try:
-            coingecko_data = requests.get(
+            coingecko_data = get_session().get(
                 coingecko_url,
                 headers=header,
                 timeout=REQUEST_TIMEOUT,
@@ -40,7 +43,9 @@ class CoingeckoAPI:
             coingecko_price_in_usd = float(coingecko_rsp[address]["usd"])
         except requests.RequestException as err:
             self.logger.warning(
-                f"Connection error while fetching Coingecko price for token {address}, error: {err}"
+                "Connection error while fetching Coingecko price for token %s, error: %s",
+                address,
+                err,
             )
             return None
         return coingecko_price_in_usd
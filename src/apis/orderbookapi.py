@@ -2,18 +2,19 @@
 OrderbookAPI for fetching relevant data using the CoW Swap Orderbook API.
 """
 
-# pylint: disable=logging-fstring-interpolation
-
 from typing import Any, Optional
 import json
+import time
 import requests
-from src.helper_functions import get_logger
+from src.helper_functions import get_logger, get_session
+from src.metrics import observe_api_request, record_cache_lookup
 from src.models import Trade, OrderData, OrderExecution
 from src.constants import (
     header,
     REQUEST_TIMEOUT,
     SUCCESS_CODE,
     FAIL_CODE,
+    NATIVE_PRICES_CACHE_TIME_IN_SEC,
 )
 
 
@@ -22,11 +23,18 @@ class OrderbookAPI:
     Class for fetching data from a Web3 API.
     """
 
-    def __init__(self, chain_name: str) -> None:
-        self.logger = get_logger()
-        self.prod_url_prefix = f"https://api.cow.fi/{chain_name}/api/v1/"
-        self.barn_url_prefix = f"https://barn.api.cow.fi/{chain_name}/api/v1/"
+    def __init__(self, chain_name: str, url_prefix: Optional[str] = None) -> None:
+        self.logger = get_logger(type(self).__name__)
+        if url_prefix is None:
+            self.prod_url_prefix = f"https://api.cow.fi/{chain_name}/api/v1/"
+            self.barn_url_prefix = f"https://barn.api.cow.fi/{chain_name}/api/v1/"
+        else:
+            # a single orderbook, e.g. a local one for testing
+            self.prod_url_prefix = self.barn_url_prefix = url_prefix
+        self.native_prices: Optional[dict[str, int]] = None
+        self.native_prices_timestamp = 0.0
 
+    @observe_api_request("orderbook")
     def get_solver_competition_data(self, tx_hash: str) -> Optional[dict[str, Any]]:
         """
         Get solver competition data from a transaction hash.
@@ -41,7 +49,7 @@ class OrderbookAPI:
         )
         solver_competition_data: Optional[dict[str, Any]] = None
         try:
-            json_competition_data = requests.get(
+            json_competition_data = get_session().get(
                 prod_endpoint_url,
                 headers=header,
                 timeout=REQUEST_TIMEOUT,
@@ -49,7 +57,7 @@ class OrderbookAPI:
             if json_competition_data.status_code == SUCCESS_CODE:
                 solver_competition_data = json.loads(json_competition_data.text)
             elif json_competition_data.status_code == FAIL_CODE:
-                barn_competition_data = requests.get(
+                barn_competition_data = get_session().get(
                     barn_endpoint_url, headers=header, timeout=REQUEST_TIMEOUT
                 )
                 if barn_competition_data.status_code == SUCCESS_CODE:
@@ -58,11 +66,14 @@ class OrderbookAPI:
                     return None
         except requests.RequestException as err:
             self.logger.warning(
-                f"Connection error while fetching competition data. Hash: {tx_hash}, error: {err}"
+                "Connection error while fetching competition data. Hash: %s, error: %s",
+                tx_hash,
+                err,
             )
             return None
         return solver_competition_data
 
+    @observe_api_request("orderbook")
     def get_order_data(self, uid: str) -> dict[str, Any] | None:
         """Get order data from uid.
         The returned dict follows the schema outlined here:
@@ -72,7 +83,7 @@ class OrderbookAPI:
         barn_endpoint_url = f"{self.barn_url_prefix}orders/{uid}"
         order_data: Optional[dict[str, Any]] = None
         try:
-            json_order_data = requests.get(
+            json_order_data = get_session().get(
                 prod_endpoint_url,
                 headers=header,
                 timeout=REQUEST_TIMEOUT,
@@ -80,7 +91,7 @@ class OrderbookAPI:
             if json_order_data.status_code == SUCCESS_CODE:
                 order_data = json_order_data.json()
             elif json_order_data.status_code == FAIL_CODE:
-                barn_order_data = requests.get(
+                barn_order_data = get_session().get(
                     barn_endpoint_url, headers=header, timeout=REQUEST_TIMEOUT
                 )
                 if barn_order_data.status_code == SUCCESS_CODE:
@@ -89,11 +100,49 @@ class OrderbookAPI:
                     return None
         except requests.RequestException as err:
             self.logger.warning(
-                f"Connection error while fetching order data. UID: {uid}, error: {err}"
+                "Connection error while fetching order data. UID: %s, error: %s",
+                uid,
+                err,
             )
             return None
         return order_data
 
+    @observe_api_request("orderbook")
+    def get_native_prices(self) -> Optional[dict[str, int]]:
+        """Get native prices of the latest auction.
+        The result maps lower case token addresses to the price of one atom of the token in wei,
+        multiplied by 10**18. Prices are cached for NATIVE_PRICES_CACHE_TIME_IN_SEC seconds since
+        the auction endpoint returns a large payload. If fetching fails, previously cached prices
+        are returned.
+        """
+        cache_hit = (
+            self.native_prices is not None
+            and time.time() - self.native_prices_timestamp
+            < NATIVE_PRICES_CACHE_TIME_IN_SEC
+        )
+        record_cache_lookup("native_prices", cache_hit)
+        if cache_hit:
+            return self.native_prices
+        try:
+            json_auction = get_session().get(
+                f"{self.prod_url_prefix}auction",
+                headers=header,
+                timeout=REQUEST_TIMEOUT,
+            )
+            if json_auction.status_code != SUCCESS_CODE:
+                return self.native_prices
+            prices = json_auction.json()["prices"]
+        except requests.RequestException as err:
+            self.logger.warning(
+                "Connection error while fetching native prices, error: %s", err
+            )
+            return self.native_prices
+        self.native_prices = {
+            token.lower(): int(price) for token, price in prices.items()
+        }
+        self.native_prices_timestamp = time.time()
+        return self.native_prices
+
     def get_trade(
         self, order_response: dict[str, Any], execution_response: dict[str, Any]
     ) -> Trade:
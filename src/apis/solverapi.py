@@ -2,15 +2,14 @@
 API for calling an http solver with auction instances.
 """
 
-# pylint: disable=logging-fstring-interpolation
-
 from os import getenv
 from typing import Any, Optional
 import json
 import requests
 from dotenv import load_dotenv
 from src.models import OrderExecution
-from src.helper_functions import get_logger
+from src.helper_functions import get_logger, get_session
+from src.metrics import observe_api_request
 from src.constants import (
     header,
     REQUEST_TIMEOUT,
@@ -24,13 +23,15 @@ class SolverAPI:
     """
 
     def __init__(self, url: Optional[str] = None) -> None:
-        self.logger = get_logger()
+        self.logger = get_logger(type(self).__name__)
+        self.solver_url = url
         if url is None:
             load_dotenv()
             self.solver_url = getenv("QUASIMODO_SOLVER_URL")
             if self.solver_url is not None:
                 self.solver_url = self.solver_url.replace("prod", "staging")
 
+    @observe_api_request("solver")
     def solve_instance(
         self, auction_instance: dict[str, Any]
     ) -> Optional[dict[str, Any]]:
@@ -39,7 +40,7 @@ class SolverAPI:
         """
         solution: Optional[dict[str, Any]] = None
         try:
-            json_solution = requests.post(
+            json_solution = get_session().post(
                 f"{self.solver_url}/solve?time_limit={SOLVER_TIME_LIMIT}&use_internal_buffers=false"
                 "&objective=surplusfeescosts",
                 headers=header,
@@ -53,7 +54,9 @@ class SolverAPI:
         except requests.RequestException as err:
             self.logger.warning(
                 "Connection error while computing solution. "
-                f"Auction ID: {auction_instance['metadata']['auction_id']}, error: {err}"
+                "Auction ID: %s, error: %s",
+                auction_instance["metadata"]["auction_id"],
+                err,
             )
             return None
         return solution
@@ -2,13 +2,12 @@
 TenderlyAPI for simulating transactions on tenderly.
 """
 
-# pylint: disable=logging-fstring-interpolation
-
 from os import getenv
 from typing import Any, Optional
 import requests
 from dotenv import load_dotenv
 from src.helper_functions import get_logger
+from src.metrics import observe_api_request
 from src.constants import (
     SETTLEMENT_CONTRACT_ADDRESS,
     REQUEST_TIMEOUT,
@@ -21,7 +20,7 @@ class TenderlyAPI:
     """
 
     def __init__(self) -> None:
-        self.logger = get_logger()
+        self.logger = get_logger(type(self).__name__)
         load_dotenv()
         self.tenderly_url = (
             "https://api.tenderly.co/api/v1/account/"
@@ -45,6 +44,7 @@ class TenderlyAPI:
 
         return self.simulate_calldata(calldata, solution["solverAddress"], block_number)
 
+    @observe_api_request("tenderly")
     def simulate_calldata(
         self, calldata: str, solver: str, block_number: int
     ) -> Optional[dict[str, Any]]:
@@ -87,8 +87,9 @@ class TenderlyAPI:
                 return None
         except requests.RequestException as err:
             self.logger.warning(
-                f"Error while simulating transaction.\
-                    Simulation input: {simulation_input}, error: {err}"
+                "Error while simulating transaction. Simulation input: %s, error: %s",
+                simulation_input,
+                err,
             )
             return None
         return simulation_output
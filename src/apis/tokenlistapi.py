@@ -2,10 +2,10 @@
 TokenListAPI for fetching a curated token list.
 """
 
-# pylint: disable=logging-fstring-interpolation
 from typing import Optional
 import requests
-from src.helper_functions import get_logger
+from src.helper_functions import get_logger, get_session
+from src.metrics import observe_api_request
 from src.constants import (
     header,
     REQUEST_TIMEOUT,
@@ -18,13 +18,14 @@ class TokenListAPI:
     """
 
     def __init__(self) -> None:
-        self.logger = get_logger()
+        self.logger = get_logger(type(self).__name__)
         self.token_lists = [
             "http://t2crtokens.eth.link",
             "https://tokens.1inch.eth.link",
             "https://tokenlist.aave.eth.link",
         ]
 
+    @observe_api_request("tokenlist")
     def get_token_list(self) -> Optional[list[str]]:
         """
         Returns a token list.
@@ -32,7 +33,7 @@ class TokenListAPI:
         token_list: list[str] = []
         for url in self.token_lists:
             try:
-                data = requests.get(
+                data = get_session().get(
                     url,
                     headers=header,
                     timeout=REQUEST_TIMEOUT,
@@ -42,7 +43,7 @@ class TokenListAPI:
                     for token in rsp["tokens"]:
                         token_list.append(token["address"].lower())
             except requests.RequestException as err:
-                self.logger.warning(f"Exception while fetching a token list: {err}")
+                self.logger.warning("Exception while fetching a token list: %s", err)
             if len(token_list) > 0:
                 return token_list
         return None
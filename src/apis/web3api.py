@@ -2,39 +2,103 @@
 Web3API for fetching relevant data using the web3 library.
 """
 
-# pylint: disable=logging-fstring-interpolation
+# pylint: disable=import-outside-toplevel
 
+from __future__ import annotations
+from functools import cached_property
 from os import getenv
-from typing import Any, Optional
+from typing import TYPE_CHECKING, Any, Optional
 from fractions import Fraction
 from dotenv import load_dotenv
-from web3 import Web3
-from web3.types import TxData, TxReceipt, FilterParams
 from eth_typing import Address, HexStr
 from hexbytes import HexBytes
 from contracts.gpv2_settlement import gpv2_settlement
-from src.models import Trade, OrderData, OrderExecution
-from src.helper_functions import get_logger
-from src.constants import SETTLEMENT_CONTRACT_ADDRESS
+from contracts.multicall3 import multicall3
+from src.models import (
+    Trade,
+    OrderData,
+    OrderExecution,
+    TradeEvent,
+    SettlementEvent,
+)
+from src.settlement import (
+    Settlement,
+    SettlementTrade,
+    checksum_address,
+    decode_settlement,
+)
+from src.helper_functions import get_logger, get_session
+from src.metrics import observe_api_request
+from src.constants import (
+    SETTLEMENT_CONTRACT_ADDRESS,
+    MULTICALL3_ADDRESS,
+    MULTICALL_BATCH_SIZE,
+)
+
+if TYPE_CHECKING:
+    from web3 import Web3
+    from web3.contract import Contract
+    from web3.types import TxData, TxReceipt, FilterParams, BlockIdentifier
+
+# selector of the ERC20 function balanceOf(address)
+BALANCE_OF_SELECTOR = HexBytes("0x70a08231")
+# topic of the Trade event of the settlement contract
+TRADE_EVENT_TOPIC = HexStr(
+    "0xa07a543ab8a018198e99ca0184c93fe9050a79400a0a723441f84de1d972cc17"
+)
+# types of the non-indexed inputs of the Trade event
+TRADE_EVENT_DATA_TYPES = [
+    "address",
+    "address",
+    "uint256",
+    "uint256",
+    "uint256",
+    "bytes",
+]
+# topic of the SafeReceived event emitted by Safes when receiving ETH
+SAFE_RECEIVED_EVENT_TOPIC = HexStr(
+    "0x3d0ce9bfc3ed7d6862dbb28b2dea94561fe714a1b4d019aa8af39730d1ad7c3d"
+)
 
 
 class Web3API:
     """
     Class for fetching data from a Web3 API.
+
+    web3 takes more than a second to import, so the client and contracts are created on first
+    use. Importing this module and creating instances does not import web3.
     """
 
-    def __init__(self) -> None:
+    # pylint: disable=too-many-public-methods
+
+    def __init__(self, url: Optional[str] = None) -> None:
         load_dotenv()
-        if getenv("NODE_URL"):
-            self.url = getenv("NODE_URL")
-        else:
+        self.url = url or getenv("NODE_URL")
+        if not self.url:
             infura_key = getenv("INFURA_KEY")
             self.url = f"https://mainnet.infura.io/v3/{infura_key}"
-        self.web_3 = Web3(Web3.HTTPProvider(self.url))
-        self.contract = self.web_3.eth.contract(
+        self.logger = get_logger(type(self).__name__)
+
+    @cached_property
+    def web_3(self) -> Web3:
+        """Web3 client of the node, using the shared HTTP session."""
+        from web3 import Web3
+
+        return Web3(Web3.HTTPProvider(self.url, session=get_session()))
+
+    @cached_property
+    def contract(self) -> Contract:
+        """The settlement contract."""
+        return self.web_3.eth.contract(
             address=Address(HexBytes(SETTLEMENT_CONTRACT_ADDRESS)), abi=gpv2_settlement
         )
-        self.logger = get_logger()
+
+    @cached_property
+    def multicall_contract(self) -> Contract:
+        """The Multicall3 contract."""
+        return self.web_3.eth.contract(
+            address=Address(HexBytes(MULTICALL3_ADDRESS)), abi=multicall3
+        )
 
     def get_chain_id(self) -> int:
         """
@@ -42,6 +106,7 @@ class Web3API:
         """
         return self.web_3.eth.chain_id
 
+    @observe_api_request("web3")
     def get_current_block_number(self) -> Optional[int]:
         """
         Function that returns the current block number
@@ -49,33 +114,40 @@ class Web3API:
         try:
             return int(self.web_3.eth.block_number)
         except ValueError as err:
-            self.logger.warning(f"Error while fetching block number: {err}")
+            self.logger.warning("Error while fetching block number: %s", err)
             return None
         except Exception as err:  # pylint: disable=W0718
-            self.logger.warning(f"Exception of type {type(err)} not handled: {err}")
+            self.logger.warning("Exception of type %s not handled: %s", type(err), err)
             return None
 
+    @observe_api_request("web3")
     def get_filtered_receipts(
-        self, start_block: int, end_block: int, target: str, topics: list[Any]
+        self,
+        start_block: int,
+        end_block: int,
+        target: str | list[str],
+        topics: list[Any],
     ) -> Optional[list[Any]]:
         """
-        Function filters receipts by contract address, and block ranges
+        Function filters receipts by contract address (or a list of addresses), and block ranges.
+        All logs are fetched with a single eth_getLogs call.
         """
         if start_block > end_block:
             return []
+        targets = [target] if isinstance(target, str) else target
         filter_criteria: FilterParams = {
             "fromBlock": int(start_block),
             "toBlock": int(end_block),
-            "address": self.web_3.to_checksum_address(target),
+            "address": [self.web_3.to_checksum_address(t) for t in targets],
             "topics": topics,
         }
         try:
-            log_receipts = self.web_3.eth.filter(filter_criteria).get_all_entries()
+            log_receipts = list(self.web_3.eth.get_logs(filter_criteria))
         except ValueError as err:
-            self.logger.warning(f"ValueError while fetching hashes: {err}")
+            self.logger.warning("ValueError while fetching hashes: %s", err)
             return None
         except Exception as err:  # pylint: disable=W0718
-            self.logger.warning(f"Exception of type {type(err)} not handled: {err}")
+            self.logger.warning("Exception of type %s not handled: %s", type(err), err)
             return None
         return log_receipts
 
@@ -83,19 +155,83 @@ class Web3API:
         """
         Function filters hashes by contract address, and block ranges
         """
-        topics = [
-            HexStr("0xa07a543ab8a018198e99ca0184c93fe9050a79400a0a723441f84de1d972cc17")
+        return [
+            event.tx_hash
+            for event in self.get_settlement_events(start_block, end_block)
         ]
+
+    def get_settlement_events(
+        self, start_block: int, end_block: int
+    ) -> list[SettlementEvent]:
+        """
+        Function filters settlements by block range, using the Trade logs of the settlement
+        contract. Settlements are returned in the order in which they were executed, together
+        with their block and decoded Trade logs.
+        """
         log_receipts = self.get_filtered_receipts(
-            start_block, end_block, SETTLEMENT_CONTRACT_ADDRESS, topics
+            start_block, end_block, SETTLEMENT_CONTRACT_ADDRESS, [TRADE_EVENT_TOPIC]
         )
 
         if log_receipts is None:
             return []
-        settlement_hashes_list = list(
-            {log_receipt["transactionHash"].hex() for log_receipt in log_receipts}
+        settlement_events: dict[str, SettlementEvent] = {}
+        for log_receipt in log_receipts:
+            tx_hash = log_receipt["transactionHash"].hex()
+            if tx_hash not in settlement_events:
+                settlement_events[tx_hash] = SettlementEvent(
+                    tx_hash,
+                    int(log_receipt["blockNumber"]),
+                    log_receipt["blockHash"].hex(),
+                    int(log_receipt["transactionIndex"]),
+                    [],
+                )
+            settlement_events[tx_hash].trades.append(
+                self.decode_trade_event(log_receipt)
+            )
+        return list(settlement_events.values())
+
+    @staticmethod
+    def decode_trade_event(log_receipt: Any) -> TradeEvent:
+        """
+        Decode a Trade log of the settlement contract.
+        """
+        from eth_abi.abi import decode
+
+        sell_token, buy_token, sell_amount, buy_amount, fee_amount, order_uid = decode(
+            TRADE_EVENT_DATA_TYPES, bytes(log_receipt["data"])
+        )
+        return TradeEvent(
+            checksum_address(bytes(log_receipt["topics"][1])[12:]),
+            checksum_address(bytes(HexBytes(sell_token))),
+            checksum_address(bytes(HexBytes(buy_token))),
+            sell_amount,
+            buy_amount,
+            fee_amount,
+            "0x" + order_uid.hex(),
+            int(log_receipt["logIndex"]),
         )
-        return settlement_hashes_list
+
+    def get_eth_transfers_by_block(
+        self, start_block: int, end_block: int, targets: list[str]
+    ) -> Optional[dict[int, float]]:
+        """
+        Function that computes total eth transfers to a list of target Safe addresses for each
+        block within a certain block range. All transfers are fetched with one log query. Blocks
+        without transfers are not contained in the result.
+        """
+        log_receipts = self.get_filtered_receipts(
+            start_block, end_block, targets, [SAFE_RECEIVED_EVENT_TOPIC]
+        )
+        if log_receipts is None:
+            return None
+        transfers_in_eth: dict[int, float] = {}
+        for txs in log_receipts:
+            block_number = int(txs["blockNumber"])
+            transfers_in_eth[block_number] = (
+                transfers_in_eth.get(block_number, 0.0)
+                + int.from_bytes(bytes(txs["data"]), "big") / 10**18
+            )
+        return transfers_in_eth
 
     def get_eth_transfers_by_block_range(
         self, start_block: int, end_block: int, target: str
@@ -104,17 +240,14 @@ class Web3API:
         Function that computes total eth transfers to a target Safe address
         within a certain block range
         """
-        log_receipts = self.get_filtered_receipts(start_block, end_block, target, [])
-        if log_receipts is None:
+        transfers_in_eth = self.get_eth_transfers_by_block(
+            start_block, end_block, [target]
+        )
+        if transfers_in_eth is None:
             return None
-        total_transfers_in_eth = 0.0
-        for txs in log_receipts:
-            if txs["topics"][0] == HexBytes(
-                "0x3d0ce9bfc3ed7d6862dbb28b2dea94561fe714a1b4d019aa8af39730d1ad7c3d"
-            ):
-                total_transfers_in_eth += int(txs["data"].hex(), 16) / 10**18
-        return total_transfers_in_eth
+        return sum(transfers_in_eth.values())
 
+    @observe_api_request("web3")
     def get_transaction(self, tx_hash: str) -> Optional[TxData]:
         """
         Takes settlement hash as input, returns transaction data.
@@ -123,7 +256,7 @@ class Web3API:
             transaction = self.web_3.eth.get_transaction(HexStr(tx_hash))
         except Exception as err:  # pylint: disable=W0718
             self.logger.warning(
-                f"Error of type {type(err)} while fetching transaction: {err}"
+                "Error of type %s while fetching transaction: %s", type(err), err
             )
             transaction = None
         return transaction
@@ -137,6 +270,7 @@ class Web3API:
             return None
         return transaction["blockNumber"]
 
+    @observe_api_request("web3")
     def get_receipt(self, tx_hash: str) -> Optional[TxReceipt]:
         """
         Get the receipt of a transaction from the transaction hash.
@@ -145,29 +279,30 @@ class Web3API:
         try:
             receipt = self.web_3.eth.wait_for_transaction_receipt(HexStr(tx_hash))
         except ValueError as err:
-            self.logger.warning(f"Error fetching log receipt: {err}")
+            self.logger.warning("Error fetching log receipt: %s", err)
             receipt = None
         return receipt
 
-    def get_settlement(self, transaction: TxData) -> dict[str, Any]:
+    def get_settlement(self, transaction: TxData) -> Settlement:
         """
         Decode settlement from transaction using the settlement contract.
         """
-        return self.get_settlement_from_calldata(transaction["input"].hex())
+        return decode_settlement(bytes(transaction["input"]))
 
-    def get_settlement_from_calldata(self, calldata: str) -> dict[str, Any]:
+    def get_settlement_from_calldata(self, calldata: str) -> Settlement:
         """
-        Decode settlement from transaction using the settlement contract.
+        Decode settlement from calldata of the settle function of the settlement contract.
         """
-        args: dict[str, Any] = self.contract.decode_function_input(calldata)[1]
-        return args
+        return decode_settlement(calldata)
 
-    def get_trades(self, settlement: dict[str, Any]) -> list[Trade]:
+    def get_trades(self, settlement: Settlement) -> list[Trade]:
         """
         Get all trades from a settlement.
+        The map from tokens to uniform clearing prices is computed once per settlement, so this
+        runs in linear time in the number of trades and tokens.
         """
         trades = []
-        for i in range(len(settlement["trades"])):
+        for i in range(len(settlement.trades)):
             data = self.get_order_data_from_settlement(settlement, i)
             execution = self.get_order_execution_from_settlement(settlement, i)
             trades.append(Trade(data, execution))
@@ -175,48 +310,48 @@ class Web3API:
         return trades
 
     def get_order_data_from_settlement(
-        self, settlement: dict[str, Any], i: int
+        self, settlement: Settlement, i: int
     ) -> OrderData:
         """
         Given a settlement and the index of a trade, return order information.
         """
-        decoded_trade = settlement["trades"][i]
-        tokens = settlement["tokens"]
+        decoded_trade = settlement.trades[i]
+        tokens = settlement.tokens
 
         order_data = OrderData(
-            decoded_trade["buyAmount"],
-            decoded_trade["sellAmount"],
-            decoded_trade["feeAmount"],
-            tokens[decoded_trade["buyTokenIndex"]],
-            tokens[decoded_trade["sellTokenIndex"]],
+            decoded_trade.buy_amount,
+            decoded_trade.sell_amount,
+            decoded_trade.fee_amount,
+            tokens[decoded_trade.buy_token_index],
+            tokens[decoded_trade.sell_token_index],
             self.is_sell_order(decoded_trade),
             self.is_partially_fillable(decoded_trade),
         )
         return order_data
 
     def get_order_execution_from_settlement(
-        self, settlement: dict[str, Any], i: int
+        self, settlement: Settlement, i: int
     ) -> OrderExecution:
         # pylint: disable=too-many-locals
         """
         Given a settlement and the index of a trade, compute the execution of the order.
         """
-        decoded_trade = settlement["trades"][i]
-        tokens = settlement["tokens"]
-        clearing_prices = settlement["clearingPrices"]
+        decoded_trade = settlement.trades[i]
+        tokens = settlement.tokens
+        clearing_prices = settlement.clearing_prices
 
-        buy_token = tokens[decoded_trade["buyTokenIndex"]]
-        buy_token_price = clearing_prices[decoded_trade["buyTokenIndex"]]
-        buy_token_index_ucp = tokens.index(buy_token)
+        buy_token = tokens[decoded_trade.buy_token_index]
+        buy_token_price = clearing_prices[decoded_trade.buy_token_index]
+        buy_token_index_ucp = settlement.ucp_indices[buy_token]
         buy_token_price_ucp = clearing_prices[buy_token_index_ucp]
 
-        sell_token = tokens[decoded_trade["sellTokenIndex"]]
-        sell_token_price = clearing_prices[decoded_trade["sellTokenIndex"]]
-        sell_token_index_ucp = tokens.index(sell_token)
+        sell_token = tokens[decoded_trade.sell_token_index]
+        sell_token_price = clearing_prices[decoded_trade.sell_token_index]
+        sell_token_index_ucp = settlement.ucp_indices[sell_token]
         sell_token_price_ucp = clearing_prices[sell_token_index_ucp]
 
-        executed_amount = decoded_trade["executedAmount"]
-        precomputed_fee_amount = decoded_trade["feeAmount"]
+        executed_amount = decoded_trade.executed_amount
+        precomputed_fee_amount = decoded_trade.fee_amount
 
         if self.is_sell_order(decoded_trade):  # sell order
             buy_amount = int(
@@ -240,18 +375,18 @@ class Web3API:
         return OrderExecution(buy_amount, sell_amount, fee_amount)
 
     @staticmethod
-    def is_sell_order(decoded_trade: dict[str, Any]) -> bool:
+    def is_sell_order(decoded_trade: SettlementTrade) -> bool:
         """
         Check if the order corresponding to a trade is a sell order.
         """
-        return str(f"{decoded_trade['flags']:08b}")[-1] == "0"
+        return decoded_trade.is_sell_order
 
     @staticmethod
-    def is_partially_fillable(decoded_trade: dict[str, Any]) -> bool:
+    def is_partially_fillable(decoded_trade: SettlementTrade) -> bool:
         """
         Check if the order corresponding to a trade is partially-fillable.
         """
-        return str(f"{decoded_trade['flags']:08b}")[-2] == "1"
+        return decoded_trade.is_partially_fillable
 
     @staticmethod
     def get_batch_gas_costs(transaction: TxData, receipt: TxReceipt) -> tuple[int, int]:
@@ -260,6 +395,63 @@ class Web3API:
         """
         return int(receipt["gasUsed"]), int(transaction["gasPrice"])
 
+    @observe_api_request("web3")
+    def multicall(
+        self,
+        calls: list[tuple[str, bytes]],
+        block_identifier: BlockIdentifier = "latest",
+    ) -> Optional[list[Optional[bytes]]]:
+        """
+        Execute a list of (target, calldata) calls via the Multicall3 contract. Calls are bundled
+        into batches of MULTICALL_BATCH_SIZE, each batch being a single eth_call at the given
+        block. The return data of reverting calls is replaced by None. If one of the batches
+        cannot be fetched, None is returned.
+        """
+        results: list[Optional[bytes]] = []
+        for start in range(0, len(calls), MULTICALL_BATCH_SIZE):
+            batch = [
+                (self.web_3.to_checksum_address(target), True, calldata)
+                for target, calldata in calls[start : start + MULTICALL_BATCH_SIZE]
+            ]
+            try:
+                responses = self.multicall_contract.functions.aggregate3(batch).call(
+                    block_identifier=block_identifier
+                )
+            except Exception as err:  # pylint: disable=W0718
+                self.logger.warning(
+                    "Error of type %s while executing multicall: %s", type(err), err
+                )
+                return None
+            results += [
+                bytes(return_data) if success else None
+                for success, return_data in responses
+            ]
+        return results
+
+    def get_token_balances(
+        self,
+        tokens: list[str],
+        owner: str,
+        block_identifier: BlockIdentifier = "latest",
+    ) -> Optional[dict[str, int]]:
+        """
+        Get the ERC20 balances of owner for a list of tokens at a given block, using batched
+        multicalls. Tokens for which the balanceOf call fails are omitted from the result.
+        """
+        owner_argument = bytes(12) + bytes(HexBytes(owner))
+        calldata = bytes(BALANCE_OF_SELECTOR) + owner_argument
+        results = self.multicall(
+            [(token, calldata) for token in tokens], block_identifier
+        )
+        if results is None:
+            return None
+        return {
+            token: int.from_bytes(return_data[:32], "big")
+            for token, return_data in zip(tokens, results)
+            if return_data is not None and len(return_data) >= 32
+        }
+
+    @observe_api_request("web3")
     def get_current_gas_price(self) -> Optional[int]:
         """
         Get the current gas price.
@@ -267,6 +459,6 @@ class Web3API:
         try:
             gas_price = int(self.web_3.eth.gas_price)
         except ValueError as err:
-            self.logger.warning(f"Error fetching gas price: {err}")
+            self.logger.warning("Error fetching gas price: %s", err)
             gas_price = None
         return gas_price
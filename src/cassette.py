@@ -0,0 +1,239 @@
+"""
+Record and replay of HTTP traffic of all API clients.
+
+All clients, including the web3 HTTP provider, send requests through the process wide session,
+see get_session. A cassette is installed as interceptor of the session adapter. In record mode,
+responses of live services are stored in a SQLite file, keyed by request. In replay mode, stored
+responses are served without network access, optionally with simulated latency. Requests
+without a stored response fail with a connection error, which clients handle like an
+unreachable service.
+
+JSON-RPC requests are keyed by node and method and params, without the request id, so that
+calls to the nodes of different chains are kept apart. The node is identified by a hash of its
+URL, as node URLs usually contain an API key. Other requests are keyed by method, URL, and body,
+where the URL is stored without user info and without query parameters which carry credentials,
+see CREDENTIAL_PARAMETERS. Cassettes thus contain no credentials and can be shared.
+
+The daemon uses a cassette if the environment variable CASSETTE_MODE is set to record or
+replay. The file is set via CASSETTE_PATH, and the latency of replayed responses via
+CASSETTE_LATENCY, either in seconds or as "recorded" to reproduce recorded latencies.
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import timedelta
+from typing import Any, Callable, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import requests
+from requests import PreparedRequest, Response
+from requests.structures import CaseInsensitiveDict
+from src.helper_functions import MonitoredHTTPAdapter, get_logger
+
+RECORD = "record"
+REPLAY = "replay"
+# latency setting for reproducing recorded latencies
+RECORDED_LATENCY = "recorded"
+DEFAULT_CASSETTE_PATH = "cassette.sqlite"
+# query parameters which are removed from keys of requests, compared case insensitively
+CREDENTIAL_PARAMETERS = {
+    "access_token",
+    "api_key",
+    "apikey",
+    "auth",
+    "key",
+    "secret",
+    "token",
+}
+
+
+class CassetteMiss(requests.ConnectionError):
+    """Raised when replaying a request without stored response."""
+
+
+def parse_json_rpc(body: Optional[bytes]) -> Optional[Any]:
+    """Parse the body of a JSON-RPC request or batch request, None for other bodies."""
+    if not body:
+        return None
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return None
+    calls = payload if isinstance(payload, list) else [payload]
+    if calls and all(isinstance(call, dict) and "jsonrpc" in call for call in calls):
+        return payload
+    return None
+
+
+def public_url(url: str) -> str:
+    """URL without user info and without query parameters which carry credentials."""
+    parts = urlsplit(url)
+    netloc = f"{parts.hostname}:{parts.port}" if parts.port else f"{parts.hostname}"
+    query = [
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if name.lower() not in CREDENTIAL_PARAMETERS
+    ]
+    return urlunsplit((parts.scheme, netloc, parts.path, urlencode(query), ""))
+
+
+def request_key(request: PreparedRequest) -> str:
+    """Key of a request in the cassette."""
+    body = request.body.encode() if isinstance(request.body, str) else request.body
+    json_rpc = parse_json_rpc(body)
+    if json_rpc is not None:
+        calls = json_rpc if isinstance(json_rpc, list) else [json_rpc]
+        node = hashlib.sha256((request.url or "").encode()).hexdigest()[:16]
+        return f"rpc {node} " + json.dumps(
+            [[call.get("method"), call.get("params")] for call in calls],
+            sort_keys=True,
+        )
+    key = f"{request.method} {public_url(request.url or '')}"
+    if body:
+        key += " " + body.decode(errors="replace")
+    return key
+
+
+def replace_json_rpc_ids(content: bytes, json_rpc: Any) -> bytes:
+    """Set the ids of a recorded JSON-RPC response to the ids of the replayed request."""
+    payload = json.loads(content)
+    if isinstance(payload, list) and isinstance(json_rpc, list):
+        for response, call in zip(payload, json_rpc):
+            response["id"] = call.get("id")
+    elif isinstance(payload, dict) and isinstance(json_rpc, dict):
+        payload["id"] = json_rpc.get("id")
+    return json.dumps(payload).encode()
+
+
+class Cassette:
+    """
+    Store of recorded responses in a SQLite file. Response bodies are compressed.
+    In replay mode, `latency` is either a fixed latency in seconds or None for replaying with
+    recorded latencies.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self,
+        path: str,
+        mode: str,
+        latency: Optional[float] = 0.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown cassette mode {mode}.")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.sleep = sleep
+        self.logger = get_logger(type(self).__name__)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, status INTEGER, "
+            "reason TEXT, headers TEXT, body BLOB, elapsed REAL)"
+        )
+        self.connection.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def install(self) -> None:
+        """Route all requests of the process wide session through the cassette."""
+        MonitoredHTTPAdapter.interceptor = self
+
+    def uninstall(self) -> None:
+        """Stop routing requests through the cassette and close the store."""
+        if MonitoredHTTPAdapter.interceptor is self:
+            MonitoredHTTPAdapter.interceptor = None
+        with self.lock:
+            self.connection.close()
+
+    def send(
+        self, request: PreparedRequest, send_live: Callable[[], Response]
+    ) -> Response:
+        """Replay the response to a request, or send it and record the response."""
+        if self.mode == REPLAY:
+            return self.replay(request)
+        response = send_live()
+        self.record(request, response)
+        return response
+
+    def record(self, request: PreparedRequest, response: Response) -> None:
+        """Store the response to a request."""
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    request_key(request),
+                    response.status_code,
+                    response.reason,
+                    json.dumps(dict(response.headers)),
+                    zlib.compress(response.content or b""),
+                    response.elapsed.total_seconds(),
+                ),
+            )
+            self.connection.commit()
+
+    def replay(self, request: PreparedRequest) -> Response:
+        """Build the response to a request from the store."""
+        key = request_key(request)
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT status, reason, headers, body, elapsed FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            self.logger.debug("No recorded response for %s", key[:200])
+            raise CassetteMiss(f"No recorded response for {key[:200]}", request=request)
+        self.hits += 1
+        status, reason, headers, body, elapsed = row
+        latency = elapsed if self.latency is None else self.latency
+        if latency > 0:
+            self.sleep(latency)
+
+        content = zlib.decompress(body)
+        request_body = (
+            request.body.encode() if isinstance(request.body, str) else request.body
+        )
+        json_rpc = parse_json_rpc(request_body)
+        if json_rpc is not None:
+            content = replace_json_rpc_ids(content, json_rpc)
+
+        response = Response()
+        response.status_code = status
+        response.reason = reason
+        response.headers = CaseInsensitiveDict(json.loads(headers))
+        # the body is stored decoded, so it must not be decoded again
+        response.headers.pop("Content-Encoding", None)
+        response.headers["Content-Length"] = str(len(content))
+        response._content = content  # pylint: disable=protected-access
+        response.url = request.url or ""
+        response.request = request
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.elapsed = timedelta(seconds=latency)
+        return response
+
+
+def install_cassette_from_env() -> Optional[Cassette]:
+    """
+    Install a cassette configured via CASSETTE_MODE, CASSETTE_PATH, and CASSETTE_LATENCY. None
+    is returned if CASSETTE_MODE is not set.
+    """
+    mode = os.getenv("CASSETTE_MODE")
+    if not mode:
+        return None
+    latency_setting = os.getenv("CASSETTE_LATENCY", "0")
+    latency = None if latency_setting == RECORDED_LATENCY else float(latency_setting)
+    cassette = Cassette(
+        os.getenv("CASSETTE_PATH", DEFAULT_CASSETTE_PATH), mode, latency
+    )
+    cassette.install()
+    cassette.logger.info("Using cassette %s in %s mode.", cassette.path, mode)
+    return cassette
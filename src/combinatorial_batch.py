@@ -0,0 +1,319 @@
+"""
+Batched evaluation of the combinatorial auction on many competitions, e.g. for a backfill or for
+simulating changes to the mechanism on historical competitions.
+
+CombinatorialAuctionSurplusTest.evaluate runs the auction on one competition with loops over
+dicts of token pairs. Here, the surplus of all solutions of all competitions is stored as one
+sparse solution x token pair matrix in coordinate format, with one column per directed token
+pair of a competition. Baseline, filtering, and winner selection are then computed with numpy for
+all competitions at once.
+
+Payloads and results are those of CombinatorialAuctionSurplusTest, except that results contain
+no log output. Surplus is computed in float64 instead of exact fractions, so results can differ
+when surplus of solutions differs by less than float precision.
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, Collection, Optional
+import numpy as np
+import numpy.typing as npt
+from src.constants import (
+    COMBINATORIAL_AUCTION_ABSOLUTE_DEVIATION_ETH,
+    SURPLUS_ABSOLUTE_DEVIATION_ETH,
+)
+
+IntArray = npt.NDArray[np.int64]
+FloatArray = npt.NDArray[np.float64]
+BoolArray = npt.NDArray[np.bool_]
+
+
+@dataclass
+class SurplusMatrix:
+    """
+    Surplus of all solutions of a batch of competitions on directed token pairs. Solutions of
+    all competitions are numbered consecutively, and entry k says that solution rows[k] has
+    surplus surplus[k] in ETH on token pair columns[k]. Entries are unique per solution and
+    token pair.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    tx_hashes: list[str]
+    solvers: list[str]
+    # competition of every solution and of every token pair column
+    solution_competition: IntArray
+    column_competition: IntArray
+    # index of the first solution of every competition, followed by the number of solutions
+    offsets: IntArray
+    rows: IntArray
+    columns: IntArray
+    surplus: FloatArray
+
+    @property
+    def num_competitions(self) -> int:
+        """Number of competitions in the batch."""
+        return len(self.tx_hashes)
+
+    @property
+    def num_solutions(self) -> int:
+        """Number of solutions of all competitions."""
+        return len(self.solvers)
+
+    @property
+    def num_columns(self) -> int:
+        """Number of token pair columns of all competitions."""
+        return len(self.column_competition)
+
+    @cached_property
+    def entry_competition(self) -> IntArray:
+        """Competition of every entry."""
+        return self.solution_competition[self.rows]
+
+    @property
+    def winners(self) -> IntArray:
+        """Index of the winner of every competition, which is its last solution."""
+        return self.offsets[1:] - 1
+
+    def competition_surplus(self, entries: BoolArray) -> FloatArray:
+        """Surplus of the given entries summed per competition."""
+        return np.bincount(
+            self.entry_competition[entries],
+            weights=self.surplus[entries],
+            minlength=self.num_competitions,
+        ).astype(np.float64)
+
+    def competition_count(self, entries: BoolArray) -> IntArray:
+        """Number of the given entries per competition."""
+        return np.bincount(
+            self.entry_competition[entries], minlength=self.num_competitions
+        )
+
+
+def trade_surplus_eth(trade: list[Any], prices: dict[str, Any]) -> float:
+    """
+    Surplus of a trade in its compact representation in ETH, see Trade.to_payload. This is
+    Trade.get_surplus converted with the price of the surplus token, using integer arithmetic
+    instead of fractions.
+    """
+    (
+        limit_buy_amount,
+        limit_sell_amount,
+        precomputed_fee_amount,
+        buy_token,
+        sell_token,
+        is_sell_order,
+        _,
+        buy_amount,
+        sell_amount,
+        fee_amount,
+    ) = trade
+    if is_sell_order:
+        denominator = limit_sell_amount + precomputed_fee_amount
+        numerator = buy_amount * denominator - limit_buy_amount * (
+            sell_amount + fee_amount
+        )
+        surplus_token = buy_token
+    else:
+        denominator = limit_buy_amount
+        numerator = (
+            limit_sell_amount + precomputed_fee_amount
+        ) * buy_amount - denominator * (sell_amount + fee_amount)
+        surplus_token = sell_token
+    # round towards zero like int(Fraction)
+    surplus = abs(numerator) // denominator * (1 if numerator >= 0 else -1)
+    return float(int(prices[surplus_token.lower()]) * surplus / 10**36)
+
+
+def build_surplus_matrix(payloads: list[dict[str, Any]]) -> SurplusMatrix:
+    # pylint: disable=too-many-locals
+    """
+    Build the surplus matrix of competitions from their payloads, see
+    CombinatorialAuctionSurplusTest.create_payload. Every competition needs at least one
+    solution.
+    """
+    solvers: list[str] = []
+    solution_competition: list[int] = []
+    column_competition: list[int] = []
+    offsets = [0]
+    trade_rows: list[int] = []
+    trade_columns: list[int] = []
+    trade_surplus: list[float] = []
+    for competition, payload in enumerate(payloads):
+        pair_columns: dict[tuple[str, str], int] = {}
+        for solution in payload["solutions"]:
+            row = len(solvers)
+            solvers.append(solution["solver"])
+            solution_competition.append(competition)
+            for trade in solution["trades"]:
+                pair = (trade[4].lower(), trade[3].lower())
+                if pair not in pair_columns:
+                    pair_columns[pair] = len(column_competition)
+                    column_competition.append(competition)
+                trade_rows.append(row)
+                trade_columns.append(pair_columns[pair])
+                trade_surplus.append(trade_surplus_eth(trade, payload["prices"]))
+        offsets.append(len(solvers))
+
+    # aggregate surplus of trades of a solution on the same token pair
+    num_columns = max(len(column_competition), 1)
+    keys = np.array(trade_rows, dtype=np.int64) * num_columns + np.array(
+        trade_columns, dtype=np.int64
+    )
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    surplus = np.bincount(
+        inverse.ravel(),
+        weights=np.array(trade_surplus, dtype=np.float64),
+        minlength=len(unique_keys),
+    )
+    return SurplusMatrix(
+        tx_hashes=[payload["tx_hash"] for payload in payloads],
+        solvers=solvers,
+        solution_competition=np.array(solution_competition, dtype=np.int64),
+        column_competition=np.array(column_competition, dtype=np.int64),
+        offsets=np.array(offsets, dtype=np.int64),
+        rows=unique_keys // num_columns,
+        columns=unique_keys % num_columns,
+        surplus=surplus.astype(np.float64),
+    )
+
+
+def compute_baseline(
+    matrix: SurplusMatrix, solvers: Optional[Collection[str]] = None
+) -> tuple[FloatArray, IntArray]:
+    """
+    Baseline surplus of every token pair and the solution providing it, see
+    CombinatorialAuctionSurplusTest.compute_baseline_surplus. The baseline is the largest
+    positive surplus of solutions which only touch this token pair, ties are won by the first
+    solution. If solvers are given, only solutions of these solvers are considered. Token pairs
+    without baseline have the solution index num_solutions.
+    """
+    touched_pairs = np.bincount(matrix.rows, minlength=matrix.num_solutions)
+    candidates = (touched_pairs[matrix.rows] == 1) & (matrix.surplus > 0)
+    if solvers is not None:
+        is_candidate_solver = np.array(
+            [solver in solvers for solver in matrix.solvers], dtype=np.bool_
+        )
+        candidates &= is_candidate_solver[matrix.rows]
+    baseline = np.zeros(matrix.num_columns, dtype=np.float64)
+    np.maximum.at(baseline, matrix.columns[candidates], matrix.surplus[candidates])
+    best = candidates & (matrix.surplus == baseline[matrix.columns])
+    baseline_solution = np.full(
+        matrix.num_columns, matrix.num_solutions, dtype=np.int64
+    )
+    np.minimum.at(baseline_solution, matrix.columns[best], matrix.rows[best])
+    return baseline, baseline_solution
+
+
+def filtering_entries(
+    matrix: SurplusMatrix, baseline: FloatArray, baseline_solution: IntArray
+) -> BoolArray:
+    """
+    Entries with less surplus than the baseline of their token pair, see
+    CombinatorialAuctionSurplusTest.filter_solutions. Solutions with such entries are filtered
+    out.
+    """
+    has_baseline = baseline_solution < matrix.num_solutions
+    return has_baseline[matrix.columns] & (matrix.surplus < baseline[matrix.columns])
+
+
+def filtered_solutions(matrix: SurplusMatrix, filtering: BoolArray) -> BoolArray:
+    """Solutions with at least one filtering entry."""
+    filtered = np.zeros(matrix.num_solutions, dtype=np.bool_)
+    filtered[matrix.rows[filtering]] = True
+    return filtered
+
+
+def last_solutions(matrix: SurplusMatrix, selectable: BoolArray) -> IntArray:
+    """Index of the last selectable solution of every competition, -1 if there is none."""
+    result = np.full(matrix.num_competitions, -1, dtype=np.int64)
+    indices = np.flatnonzero(selectable)
+    np.maximum.at(result, matrix.solution_competition[indices], indices)
+    return result
+
+
+def combine_with_baseline(
+    matrix: SurplusMatrix, batch_winner: IntArray, baseline_solution: IntArray
+) -> BoolArray:
+    """
+    Winning entries if the batch winner of every competition wins all of its token pairs and
+    the remaining token pairs are won by their baseline solutions, see
+    CombinatorialAuctionSurplusTest.determine_winning_solutions. Competitions without batch
+    winner have the index -1.
+    """
+    batch_winner_entries: BoolArray = (
+        matrix.rows == batch_winner[matrix.entry_competition]
+    )
+    won_by_batch_winner = np.zeros(matrix.num_columns, dtype=np.bool_)
+    won_by_batch_winner[matrix.columns[batch_winner_entries]] = True
+    baseline_entries: BoolArray = (
+        matrix.rows == baseline_solution[matrix.columns]
+    ) & ~won_by_batch_winner[matrix.columns]
+    return batch_winner_entries | baseline_entries
+
+
+def evaluate_batch(payloads: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    # pylint: disable=too-many-locals
+    """
+    Run the combinatorial auction on the payloads of many competitions. For every competition,
+    the result contains the winning solver, the level of the result, and the values recorded by
+    CombinatorialAuctionSurplusTest.
+    """
+    if not payloads:
+        return []
+    matrix = build_surplus_matrix(payloads)
+    baseline, baseline_solution = compute_baseline(matrix)
+    filtering = filtering_entries(matrix, baseline, baseline_solution)
+    # the batch winner is the last solution which is not filtered out
+    batch_winner = last_solutions(matrix, ~filtered_solutions(matrix, filtering))
+    combinatorial_surplus = matrix.competition_surplus(
+        combine_with_baseline(matrix, batch_winner, baseline_solution)
+    )
+
+    winner = matrix.winners
+    winner_entries = matrix.rows == winner[matrix.entry_competition]
+    total_surplus = matrix.competition_surplus(winner_entries)
+    winner_filtering = filtering & winner_entries
+    filtering_solutions = matrix.competition_count(winner_filtering)
+    is_baseline_solver = np.array(
+        [solver == "baseline" for solver in matrix.solvers] + [False], dtype=np.bool_
+    )
+    columns = matrix.columns
+    alert = matrix.competition_count(
+        winner_filtering
+        & is_baseline_solver[baseline_solution[columns]]
+        & (
+            baseline[columns] - matrix.surplus
+            > COMBINATORIAL_AUCTION_ABSOLUTE_DEVIATION_ETH
+        )
+    )
+    difference = combinatorial_surplus - total_surplus
+
+    results = []
+    for competition in range(matrix.num_competitions):
+        if alert[competition] > 0:
+            level = "alert"
+        elif (
+            difference[competition] > SURPLUS_ABSOLUTE_DEVIATION_ETH / 10
+            or filtering_solutions[competition] > 0
+        ):
+            level = "info"
+        else:
+            level = "debug"
+        results.append(
+            {
+                "tx_hash": matrix.tx_hashes[competition],
+                "winner": matrix.solvers[winner[competition]],
+                "level": level,
+                "values": {
+                    "total_surplus_eth": float(total_surplus[competition]),
+                    "combinatorial_surplus_eth": float(
+                        combinatorial_surplus[competition]
+                    ),
+                    "absolute_difference_eth": float(difference[competition]),
+                    "filtering_solutions": int(filtering_solutions[competition]),
+                },
+            }
+        )
+    return results
@@ -5,12 +5,27 @@ All Constants that are used throughout the project
 # main loop
 SLEEP_TIME_IN_SEC = 10
 
+# port of the prometheus metrics endpoint
+METRICS_PORT = 8000
+
+# logging, see src/logs.py
+DEFAULT_LOG_LEVEL = "INFO"
+# log records waiting for the logging thread, further records are dropped
+LOG_QUEUE_SIZE = 10000
+
+# connections per host in the HTTP pool shared by all API clients
+HTTP_POOL_SIZE = 20
+
 # surplus tests
 SURPLUS_ABSOLUTE_DEVIATION_ETH = 0.05
 SURPLUS_REL_DEVIATION = 0.004
 
 # combinatorial auctions
 COMBINATORIAL_AUCTION_ABSOLUTE_DEVIATION_ETH = 0.005
+# time budget for finding the surplus maximizing winners of a competition
+WINNER_DETERMINATION_TIME_BUDGET_IN_SEC = 0.1
+# cache of competitions for simulating mechanisms, see src/mechanisms.py
+DEFAULT_COMPETITION_CACHE_PATH = "competitions.sqlite"
 
 # cost coverage test
 COST_COVERAGE_ABSOLUTE_DEVIATION_ETH = 0.01
@@ -31,6 +46,15 @@ BUFFER_INTERVAL = 150
 # threshold of value of buffers above which an alert is generated
 BUFFERS_VALUE_USD_THRESHOLD = 400000
 
+# maximal number of calls bundled into a single multicall eth_call
+MULTICALL_BATCH_SIZE = 500
+
+# time for which native prices of the latest auction are reused
+NATIVE_PRICES_CACHE_TIME_IN_SEC = 300
+
+# maximal number of blocks covered by a single log query for kickbacks
+KICKBACKS_MAX_BLOCK_RANGE = 1000
+
 # threshold parameter to generate an alert when receiving kickbacks
 KICKBACKS_ALERT_THRESHOLD = 0.5
 
@@ -45,11 +69,64 @@ UCP_VS_NATIVE_SENSITIVITY_THRESHOLD = 0.5
 
 # relevant addresses
 SETTLEMENT_CONTRACT_ADDRESS = "0x9008D19f58AAbD9eD0D60971565AA8510560ab41"
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+WETH_ADDRESS = "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2"
 MEV_BLOCKER_KICKBACKS_ADDRESSES = [
     "0xCe91228789B57DEb45e66Ca10Ff648385fE7093b",  # CoW DAO
     "0x008300082C3000009e63680088f8c7f4D3ff2E87",  # Copium Capital
     "0xbAda55BaBEE5D2B7F3B551f9da846838760E068C",  # Project Blanc
 ]
+# wrapped native token per chain, native prices of the orderbook are denominated in it
+WRAPPED_NATIVE_TOKEN_ADDRESSES = {
+    "mainnet": WETH_ADDRESS,
+    "xdai": "0xe91d153e0b41518a2ce8dd3d7944fa863463a97d",
+    "arbitrum_one": "0x82af49447d8a07e3bd95bd0d56f35241523fbab1",
+    "base": "0x4200000000000000000000000000000000000006",
+}
+# asset platform of Coingecko token prices per chain
+COINGECKO_PLATFORMS = {
+    "mainnet": "ethereum",
+    "xdai": "xdai",
+    "arbitrum_one": "arbitrum-one",
+    "base": "base",
+}
+
+# alerts
+ALERT_QUEUE_SIZE = 1000
+ALERT_FLUSH_INTERVAL_IN_SEC = 5
+ALERT_MAX_RETRIES = 5
+SLACK_MESSAGE_MAX_LENGTH = 3000
+SLACK_RATE_LIMIT_PER_SEC = 1
+SLACK_RATE_LIMIT_BURST = 3
+# window in which repeated alerts with the same key are suppressed
+ALERT_SUPPRESSION_WINDOW_IN_SEC = 3600
+
+# work queue for sharding settlement processing across workers
+DEFAULT_WORK_QUEUE_PATH = "work_queue.sqlite"
+# time after which a leased task is leased again if its worker did not finish it
+WORK_QUEUE_LEASE_IN_SEC = 600
+# delay before a task is retried when a test needs to be run again
+WORK_QUEUE_RETRY_DELAY_IN_SEC = 60
+# workers without heartbeat within this time are not assigned tasks
+WORKER_HEARTBEAT_TIMEOUT_IN_SEC = 60
+WORK_QUEUE_BATCH_SIZE = 10
+# time after which completed tasks and results of tests are deleted from the queue
+WORK_QUEUE_RETENTION_IN_SEC = 86400
+# points per worker on the consistent hashing ring
+HASH_RING_VIRTUAL_NODES = 64
+
+# results store
+RESULTS_BATCH_SIZE = 500
+RESULTS_EXPORT_INTERVAL_IN_SEC = 3600
+
+# aggregates of test results, served on a local port
+AGGREGATES_PORT = 8001
+# width of the time buckets of rolling aggregates
+AGGREGATE_BUCKET_IN_SEC = 600
+# rolling windows of aggregates, in addition to aggregates over all time
+AGGREGATE_WINDOWS_IN_SEC = {"1h": 3600, "1d": 86400}
+# relative accuracy of quantiles of aggregates
+AGGREGATE_QUANTILE_ACCURACY = 0.01
 
 # requests
 REQUEST_TIMEOUT = 5
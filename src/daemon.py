@@ -2,63 +2,291 @@
 An infinite loop is started which listens to CoW Protocol trade events. If such an event happens,
 the correstonding transaction hash is added to the queue of the individual tests.
 
+Several chains can be monitored by one process, with one pipeline per chain. Node URLs are set
+as comma separated list in NODE_URLS, the chain of a node is determined from its chain id. If
+NODE_URLS is not set, a single chain is monitored via NODE_URL. Pipelines are processed in turn
+and share HTTP connections, the cache of decoded settlements, and the alert dispatcher. API
+clients are per chain. Metrics, alerts, and results of tests are labelled with their chain. A
+failing pipeline does not stop the other chains and is retried in the next iteration.
+
+Processing can be sharded across workers via a work queue, see src/work_queue.py. The mode is set
+via DAEMON_ROLE: a coordinator ingests settlements and publishes them to the queue at
+WORK_QUEUE_PATH, and workers lease settlements from the queue and run the tests. By default, the
+daemon ingests settlements and runs tests in one process.
+
 If a settlement failes a test, an error level message is logged.
 """
 
-# pylint: disable=logging-fstring-interpolation
-
+import os
+import socket
 import time
+from os import getenv
 from typing import Optional
+from dotenv import load_dotenv
+from src.aggregates import start_aggregates_server
 from src.apis.web3api import Web3API
+from src.cassette import install_cassette_from_env
+from src.monitoring_tests.base_test import BaseTest
 from src.monitoring_tests.mev_blocker_kickbacks_test import (
     MEVBlockerRefundsMonitoringTest,
 )
-from src.constants import SLEEP_TIME_IN_SEC, CHAIN_ID_TO_NAME
+from src.constants import (
+    CHAIN_ID_TO_NAME,
+    DEFAULT_WORK_QUEUE_PATH,
+    SLEEP_TIME_IN_SEC,
+    WORK_QUEUE_BATCH_SIZE,
+    WORK_QUEUE_RETRY_DELAY_IN_SEC,
+)
+from src.metrics import (
+    BLOCKS_PROCESSED,
+    BLOCK_LAG,
+    SETTLEMENTS_PROCESSED,
+    start_metrics_server,
+)
+from src.work_queue import SettlementTask, SQLiteWorkQueue, WorkQueue
 
+STANDALONE = "standalone"
+COORDINATOR = "coordinator"
+WORKER = "worker"
 
-def main() -> None:
+
+def process_block_range(
+    web3_api: Web3API, tests: list[BaseTest], start_block: int, end_block: int
+) -> int:
     """
-    daemon function that runs as highlighted in docstring.
+    Run all tests on the settlements in a block range. Returns the number of settlements found,
+    tests are not run if there are none.
     """
-    web3_api = Web3API()
-    chain_id = web3_api.get_chain_id()
-    chain_name = CHAIN_ID_TO_NAME[chain_id]
-    # orderbook_api = OrderbookAPI(chain_name)
+    settlement_events = web3_api.get_settlement_events(start_block, end_block)
+    if not settlement_events:
+        return 0
 
-    # initialize tests
-    tests = [
-        # SolverCompetitionSurplusTest(orderbook_api),
-        # HighScoreTest(orderbook_api),
-        # PriceSensitivityTest(orderbook_api),
-    ]
-    # special case for mainnet as MEV Blocker only exists on mainnet
-    if chain_name == "mainnet":
-        tests.append(MEVBlockerRefundsMonitoringTest(web3_api))
+    tx_hashes = [event.tx_hash for event in settlement_events]
+    web3_api.logger.debug("%s hashes found: %s", len(tx_hashes), tx_hashes)
+    for test in tests:
+        test.add_settlement_events_to_queue(settlement_events)
+        web3_api.logger.debug("Running test (%s) for hashes %s.", test, test.tx_hashes)
+        test.run_queue()
+        web3_api.logger.debug("Test (%s) completed.", test)
+    return len(settlement_events)
 
-    start_block: Optional[int] = None
 
-    web3_api.logger.debug("Start infinite loop")
-    while True:
-        time.sleep(SLEEP_TIME_IN_SEC)
-        if start_block is None:
-            start_block = web3_api.get_current_block_number()
-            continue
-        end_block = web3_api.get_current_block_number()
+def publish_block_range(
+    web3_api: Web3API,
+    work_queue: WorkQueue,
+    chain_name: str,
+    start_block: int,
+    end_block: int,
+) -> int:
+    """
+    Publish the settlements in a block range as tasks to a work queue. Returns the number of
+    settlements found.
+    """
+    settlement_events = web3_api.get_settlement_events(start_block, end_block)
+    work_queue.publish(
+        [SettlementTask(chain_name, event) for event in settlement_events]
+    )
+    return len(settlement_events)
+
+
+class ChainPipeline:
+    """
+    Ingest pipeline of one chain. New blocks are fetched from the node at url and their
+    settlements are run through the tests of the chain, or published to work_queue if it is set.
+    Tests are set up once the chain id of the node is known.
+    """
+
+    def __init__(
+        self, url: Optional[str] = None, work_queue: Optional[WorkQueue] = None
+    ) -> None:
+        self.web3_api = Web3API(url)
+        self.work_queue = work_queue
+        self.logger = self.web3_api.logger
+        self.chain_name: Optional[str] = None
+        self.tests: list[BaseTest] = []
+        self.start_block: Optional[int] = None
+
+    def setup(self) -> str:
+        """Set up the tests for the chain of the node. Returns the name of the chain."""
+        chain_name = CHAIN_ID_TO_NAME[self.web3_api.get_chain_id()]
+        # orderbook_api = OrderbookAPI(chain_name)
+
+        # initialize tests
+        tests: list[BaseTest] = [
+            # SolverCompetitionSurplusTest(orderbook_api, chain_name=chain_name),
+            # HighScoreTest(orderbook_api, chain_name=chain_name),
+            # PriceSensitivityTest(orderbook_api, chain_name=chain_name),
+        ]
+        # special case for mainnet as MEV Blocker only exists on mainnet
+        if chain_name == "mainnet":
+            tests.append(
+                MEVBlockerRefundsMonitoringTest(self.web3_api, chain_name=chain_name)
+            )
+        self.tests = tests
+        self.chain_name = chain_name
+        self.logger.info("Monitoring %s with %s tests.", chain_name, len(tests))
+        return chain_name
+
+    def step(self) -> None:
+        """Process all blocks since the last step."""
+        chain_name = self.chain_name or self.setup()
+        if self.start_block is None:
+            self.start_block = self.web3_api.get_current_block_number()
+            return
+        end_block = self.web3_api.get_current_block_number()
         if end_block is None:
+            return
+        BLOCK_LAG.labels(chain_name).set(max(end_block - self.start_block + 1, 0))
+
+        if self.work_queue is None:
+            settlements = process_block_range(
+                self.web3_api, self.tests, self.start_block, end_block
+            )
+        else:
+            settlements = publish_block_range(
+                self.web3_api,
+                self.work_queue,
+                chain_name,
+                self.start_block,
+                end_block,
+            )
+        if settlements == 0:
+            return
+        SETTLEMENTS_PROCESSED.labels(chain_name).inc(settlements)
+
+        BLOCKS_PROCESSED.labels(chain_name).inc(end_block - self.start_block + 1)
+        BLOCK_LAG.labels(chain_name).set(0)
+        self.start_block = end_block + 1
+
+
+def run_pipelines(pipelines: list[ChainPipeline]) -> None:
+    """
+    Step every pipeline once, in turn. Errors are logged and do not affect other pipelines.
+    """
+    for pipeline in pipelines:
+        try:
+            pipeline.step()
+        except Exception as err:  # pylint: disable=W0718
+            pipeline.logger.error(
+                "Pipeline of %s failed with exception of type %s: %s",
+                pipeline.chain_name or pipeline.web3_api.url,
+                type(err),
+                err,
+            )
+
+
+def process_task(
+    pipeline: ChainPipeline, work_queue: WorkQueue, task: SettlementTask
+) -> bool:
+    """
+    Run the tests of the chain of a task which did not yet succeed on its settlement, and write
+    their results. Returns `False` if any test should be run again.
+    """
+    passed_tests = work_queue.passed_tests(task.tx_hash)
+    success = True
+    for test in pipeline.tests:
+        name = type(test).__name__
+        if name in passed_tests:
             continue
+        test_success = test.run_once(task.settlement_event)
+        work_queue.write_result(task.tx_hash, name, test_success)
+        success = success and test_success
+    return success
+
+
+def run_worker(
+    pipelines: list[ChainPipeline], work_queue: WorkQueue, worker_id: str
+) -> None:
+    """
+    Lease tasks from the work queue and process them with the pipeline of their chain, forever.
+    Tasks which need to be run again or fail are released and retried later.
+    """
+    while True:
+        for pipeline in pipelines:
+            if pipeline.chain_name is None:
+                try:
+                    pipeline.setup()
+                except Exception as err:  # pylint: disable=W0718
+                    pipeline.logger.error(
+                        "Setup of pipeline of %s failed with "
+                        "exception of type %s: %s",
+                        pipeline.web3_api.url,
+                        type(err),
+                        err,
+                    )
+        pipelines_by_chain = {pipeline.chain_name: pipeline for pipeline in pipelines}
 
-        tx_hashes = web3_api.get_tx_hashes_by_block(start_block, end_block)
-        if not tx_hashes:
+        work_queue.heartbeat(worker_id)
+        tasks = work_queue.lease(worker_id, WORK_QUEUE_BATCH_SIZE)
+        if not tasks:
+            time.sleep(SLEEP_TIME_IN_SEC)
             continue
+        for task in tasks:
+            task_pipeline = pipelines_by_chain.get(task.chain_name)
+            success = False
+            if task_pipeline is None:
+                pipelines[0].logger.warning(
+                    "No pipeline for chain %s of task %s.",
+                    task.chain_name,
+                    task.tx_hash,
+                )
+            else:
+                try:
+                    success = process_task(task_pipeline, work_queue, task)
+                except Exception as err:  # pylint: disable=W0718
+                    task_pipeline.logger.error(
+                        "Task %s failed with exception of type %s: %s",
+                        task.tx_hash,
+                        type(err),
+                        err,
+                    )
+            if success:
+                work_queue.complete(task)
+            else:
+                work_queue.release(task, WORK_QUEUE_RETRY_DELAY_IN_SEC)
+            work_queue.heartbeat(worker_id)
 
-        web3_api.logger.debug(f"{len(tx_hashes)} hashes found: {tx_hashes}")
-        for test in tests:
-            test.add_hashes_to_queue(tx_hashes)
-            web3_api.logger.debug(f"Running test ({test}) for hashes {test.tx_hashes}.")
-            test.run_queue()
-            web3_api.logger.debug(f"Test ({test}) completed.")
 
-        start_block = end_block + 1
+def get_node_urls() -> list[Optional[str]]:
+    """
+    Node URLs of all monitored chains, from the comma separated list NODE_URLS. If it is not
+    set, the default node of Web3API is used.
+    """
+    node_urls = [url.strip() for url in getenv("NODE_URLS", "").split(",")]
+    return [url for url in node_urls if url] or [None]
+
+
+def main() -> None:
+    """
+    daemon function that runs as highlighted in docstring.
+    """
+    load_dotenv()
+    start_metrics_server()
+    start_aggregates_server()
+    install_cassette_from_env()
+    role = getenv("DAEMON_ROLE", STANDALONE)
+    if role not in (STANDALONE, COORDINATOR, WORKER):
+        raise ValueError(f"Unknown daemon role {role}.")
+    work_queue: Optional[WorkQueue] = None
+    if role != STANDALONE:
+        work_queue = SQLiteWorkQueue(getenv("WORK_QUEUE_PATH", DEFAULT_WORK_QUEUE_PATH))
+    pipelines = [
+        ChainPipeline(url, work_queue if role == COORDINATOR else None)
+        for url in get_node_urls()
+    ]
+    if role == WORKER:
+        assert work_queue is not None
+        worker_id = getenv("WORKER_ID", f"{socket.gethostname()}-{os.getpid()}")
+        pipelines[0].logger.info("Starting worker %s.", worker_id)
+        run_worker(pipelines, work_queue, worker_id)
+        return
+
+    pipelines[0].logger.debug("Start infinite loop")
+    while True:
+        time.sleep(SLEEP_TIME_IN_SEC)
+        run_pipelines(pipelines)
+        if work_queue is not None:
+            work_queue.prune()
 
 
 if __name__ == "__main__":
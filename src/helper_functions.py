@@ -4,21 +4,95 @@ This file contains some auxiliary functions
 
 from __future__ import annotations
 import logging
-from typing import Optional
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from typing import Any, Callable, Optional, Protocol
+import requests
+from requests.adapters import HTTPAdapter
+from src.logs import configure_logging
+from src.metrics import is_failure_status, record_failed_request
+from src.profiling import record_http_request
+from src.constants import HTTP_POOL_SIZE
 
 
-def get_logger(filename: Optional[str] = None) -> logging.Logger:
+def get_logger(name: Optional[str] = None) -> logging.Logger:
     """
-    get_logger() returns a logger object that can write to a file, terminal or only file if needed.
+    get_logger() returns the logger of the daemon, or its child logger `name`, e.g. of a test, so
+    that levels can be set per test. Logging is configured on the first call, see src/logs.py.
     """
-    logging.basicConfig(format="%(levelname)s - %(message)s")
-    logger = logging.getLogger()
-    logger.setLevel(logging.INFO)
-    if filename:
-        file_handler = logging.FileHandler(filename + ".log", mode="w")
-        file_handler.setLevel(logging.INFO)
-        formatter = logging.Formatter("%(levelname)s - %(message)s")
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+    logger = configure_logging()
+    return logger.getChild(name) if name else logger
 
-    return logger
+
+class RequestInterceptor(Protocol):
+    """Interface of objects which handle requests instead of the network, e.g. a cassette."""
+
+    def send(
+        self,
+        request: requests.PreparedRequest,
+        send_live: Callable[[], requests.Response],
+    ) -> requests.Response:
+        """Return the response to a request. send_live sends the request to the network."""
+
+
+class MonitoredHTTPAdapter(HTTPAdapter):
+    """
+    HTTP adapter of the process wide session, which is the single hook into HTTP traffic:
+    - requests are routed through the installed interceptor, if any, see src/cassette.py,
+    - requests and their payload sizes are counted for the traced run, see src/profiling.py,
+    - the API call in progress is marked as failed if a request raises or returns a failure
+      status, see observe_api_request.
+    """
+
+    interceptor: Optional[RequestInterceptor] = None
+
+    def send(
+        self, request: requests.PreparedRequest, *args: Any, **kwargs: Any
+    ) -> requests.Response:
+        send_live = partial(HTTPAdapter.send, self, request, *args, **kwargs)
+        interceptor = MonitoredHTTPAdapter.interceptor
+        try:
+            if interceptor is None:
+                response = send_live()
+            else:
+                response = interceptor.send(request, send_live)
+        except requests.RequestException:
+            record_failed_request()
+            raise
+        record_http_request(request, response)
+        if is_failure_status(response.status_code):
+            record_failed_request()
+        return response
+
+
+@lru_cache(maxsize=1)
+def get_session() -> requests.Session:
+    """
+    Get the process wide HTTP session. All API clients send requests through it, so that
+    connections are pooled across clients and chains.
+    """
+    session = requests.Session()
+    adapter = MonitoredHTTPAdapter(
+        pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@lru_cache(maxsize=1)
+def get_process_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Get the process wide pool for CPU bound tests. Its size is set by the environment variable
+    PROCESS_POOL_SIZE. The pool is opt-in, None is returned if the size is 0, which is the
+    default. Workers are started from a fork server, so that they do not inherit threads of the
+    daemon.
+    """
+    size = int(os.getenv("PROCESS_POOL_SIZE", "0"))
+    if size <= 0:
+        return None
+    return ProcessPoolExecutor(
+        size, mp_context=multiprocessing.get_context("forkserver")
+    )
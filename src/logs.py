@@ -0,0 +1,127 @@
+"""
+Logging of the daemon, configured once per process.
+
+All loggers are children of the logger `ebbo`, e.g. `ebbo.HighScoreTest` for a test, see
+get_logger. Log calls only put records into a bounded queue. Records are formatted and written
+by a background thread, so that slow terminals or files do not block tests. If the queue is
+full, records are dropped and counted in the metric LOG_RECORDS_DROPPED. Messages use %-style
+arguments. Immutable arguments, e.g. strings and numbers, are only formatted if the record is
+written. Messages with other arguments, e.g. lists, are formatted when logging, as the arguments
+could change before the record is written.
+
+Logging is configured via environment variables:
+- LOG_LEVEL: level of all loggers, default INFO.
+- LOG_LEVELS: comma separated levels of single loggers, e.g. `HighScoreTest=DEBUG,Web3API=ERROR`.
+- LOG_FORMAT: `text` (default) or `json`, which writes one JSON object per line.
+- LOG_FILE: file which records are written to in addition to the terminal.
+"""
+
+from __future__ import annotations
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+from datetime import datetime, timezone
+from fractions import Fraction
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any
+from src.metrics import LOG_RECORDS_DROPPED
+from src.constants import DEFAULT_LOG_LEVEL, LOG_QUEUE_SIZE
+
+ROOT_LOGGER = "ebbo"
+TEXT_FORMAT = "%(levelname)s - %(message)s"
+# arguments of these types can be formatted in the listener thread
+IMMUTABLE_TYPES = (str, bytes, int, float, Fraction, type(None))
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def is_immutable(value: Any) -> bool:
+    """Whether a log argument is immutable, including tuples of immutable values."""
+    if isinstance(value, tuple):
+        return all(is_immutable(item) for item in value)
+    return isinstance(value, IMMUTABLE_TYPES)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Queue handler which leaves formatting of immutable arguments to the listener thread and
+    drops records if the queue is full, instead of blocking or raising in the logging thread.
+    """
+
+    def __init__(self, log_queue: queue.Queue[logging.LogRecord]) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # unlike QueueHandler.prepare, messages with immutable arguments are not formatted here.
+        # Records stay in this process, so arguments do not need to be converted to strings.
+        record = copy.copy(record)
+        if record.args and not is_immutable(record.args):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            LOG_RECORDS_DROPPED.inc()
+
+
+def parse_levels(levels: str) -> dict[str, str]:
+    """Parse levels of single loggers of the form `name=LEVEL,name=LEVEL`."""
+    result = {}
+    for entry in levels.split(","):
+        if "=" in entry:
+            name, level = entry.split("=", maxsplit=1)
+            result[name.strip()] = level.strip().upper()
+    return result
+
+
+@lru_cache(maxsize=1)
+def configure_logging() -> logging.Logger:
+    """
+    Configure logging of the process from environment variables, see the module docstring.
+    Returns the root logger of the daemon. Configuration only happens on the first call.
+    """
+    formatter: logging.Formatter
+    if os.getenv("LOG_FORMAT", "text").lower() == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(TEXT_FORMAT)
+    handlers: list[logging.Handler] = [logging.StreamHandler()]
+    if os.getenv("LOG_FILE"):
+        handlers.append(logging.FileHandler(os.environ["LOG_FILE"]))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.Queue[logging.LogRecord] = queue.Queue(LOG_QUEUE_SIZE)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    logger = logging.getLogger(ROOT_LOGGER)
+    logger.handlers = [NonBlockingQueueHandler(log_queue)]
+    logger.propagate = False
+    logger.setLevel(os.getenv("LOG_LEVEL", DEFAULT_LOG_LEVEL).upper())
+    for name, level in parse_levels(os.getenv("LOG_LEVELS", "")).items():
+        logging.getLogger(f"{ROOT_LOGGER}.{name}").setLevel(level)
+    return logger
@@ -0,0 +1,363 @@
+"""
+Simulation of auction mechanisms on historical competitions.
+
+Mechanisms decide which solutions win which token pairs of a competition. They operate on the
+surplus matrix of src/combinatorial_batch.py, which aggregates the surplus of all solutions of
+many competitions on directed token pairs, and return the winning entries of the matrix. All
+mechanisms are evaluated on the same matrix in one pass, so that comparing designs does not
+require fetching or decoding competitions again.
+
+Competitions are cached as payloads of CombinatorialAuctionSurplusTest in a SQLite file, and are
+only fetched from the orderbook if they are not cached. To fetch competitions and simulate all
+mechanisms on the cache, run from the root directory
+
+    python3 -m src.mechanisms --cache competitions.sqlite [--chain mainnet] [tx_hash ...]
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Callable, Collection, Optional
+import numpy as np
+from src.combinatorial_batch import (
+    BoolArray,
+    FloatArray,
+    IntArray,
+    SurplusMatrix,
+    build_surplus_matrix,
+    combine_with_baseline,
+    compute_baseline,
+    filtered_solutions,
+    filtering_entries,
+    last_solutions,
+)
+from src.winner_determination import pack_solutions
+from src.constants import (
+    DEFAULT_COMPETITION_CACHE_PATH,
+    WINNER_DETERMINATION_TIME_BUDGET_IN_SEC,
+)
+
+
+class CompetitionCache:
+    """Payloads of competitions in a SQLite file, identified by their tx hash."""
+
+    def __init__(self, path: str) -> None:
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS competitions "
+            "(tx_hash TEXT PRIMARY KEY, payload TEXT)"
+        )
+        self.connection.commit()
+
+    def get(self, tx_hash: str) -> Optional[dict[str, Any]]:
+        """Payload of a competition, None if it is not cached."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT payload FROM competitions WHERE tx_hash = ?", (tx_hash,)
+            ).fetchone()
+        if row is None:
+            return None
+        payload: dict[str, Any] = json.loads(row[0])
+        return payload
+
+    def put(self, payload: dict[str, Any]) -> None:
+        """Cache the payload of a competition, replacing a cached payload of the same hash."""
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO competitions VALUES (?, ?)",
+                (payload["tx_hash"], json.dumps(payload, separators=(",", ":"))),
+            )
+            self.connection.commit()
+
+    def get_or_fetch(
+        self,
+        tx_hashes: list[str],
+        fetch: Callable[[str], Optional[dict[str, Any]]],
+    ) -> list[dict[str, Any]]:
+        """
+        Payloads of competitions, fetching and caching those which are not cached. Competitions
+        which cannot be fetched are skipped.
+        """
+        payloads = []
+        for tx_hash in tx_hashes:
+            payload = self.get(tx_hash)
+            if payload is None:
+                payload = fetch(tx_hash)
+                if payload is None:
+                    continue
+                self.put(payload)
+            payloads.append(payload)
+        return payloads
+
+    def payloads(self) -> list[dict[str, Any]]:
+        """Payloads of all cached competitions, ordered by tx hash."""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT payload FROM competitions ORDER BY tx_hash"
+            ).fetchall()
+        return [json.loads(payload) for (payload,) in rows]
+
+    def close(self) -> None:
+        """Close the file."""
+        with self.lock:
+            self.connection.close()
+
+
+class Mechanism(ABC):
+    """A rule for selecting the winning solutions of competitions."""
+
+    @abstractmethod
+    def allocate(self, matrix: SurplusMatrix) -> BoolArray:
+        """
+        Winning entries of the surplus matrix, i.e. for every solution the token pairs it wins.
+        Every token pair can be won by at most one solution.
+        """
+
+
+class SingleWinner(Mechanism):
+    """The current mechanism, where the winner of the competition wins all its token pairs."""
+
+    def allocate(self, matrix: SurplusMatrix) -> BoolArray:
+        winning: BoolArray = matrix.rows == matrix.winners[matrix.entry_competition]
+        return winning
+
+
+@dataclass
+class Combinatorial(Mechanism):
+    """
+    The combinatorial auction of CombinatorialAuctionSurplusTest. Solutions with less surplus
+    than the baseline on one of their token pairs are filtered out, the last remaining solution
+    wins its token pairs, and the remaining token pairs are won by their baseline solutions.
+    The baseline is computed from solutions of baseline_solvers only, if it is set.
+    """
+
+    baseline_solvers: Optional[Collection[str]] = None
+
+    def select_batch_winners(
+        self, matrix: SurplusMatrix, unfiltered: BoolArray
+    ) -> IntArray:
+        """Batch winner of every competition among the unfiltered solutions, -1 if none."""
+        return last_solutions(matrix, unfiltered)
+
+    def allocate(self, matrix: SurplusMatrix) -> BoolArray:
+        baseline, baseline_solution = compute_baseline(matrix, self.baseline_solvers)
+        filtering = filtering_entries(matrix, baseline, baseline_solution)
+        batch_winner = self.select_batch_winners(
+            matrix, ~filtered_solutions(matrix, filtering)
+        )
+        return combine_with_baseline(matrix, batch_winner, baseline_solution)
+
+
+@dataclass
+class FairBatch(Combinatorial):
+    """
+    Fair batch auction: like the combinatorial auction, but the batch winner is the remaining
+    solution with the largest total surplus instead of the last one. Ties are won by the later
+    solution.
+    """
+
+    def select_batch_winners(
+        self, matrix: SurplusMatrix, unfiltered: BoolArray
+    ) -> IntArray:
+        # bincount returns integers if there are no entries
+        solution_surplus = np.bincount(
+            matrix.rows, weights=matrix.surplus, minlength=matrix.num_solutions
+        ).astype(np.float64)
+        solution_surplus[~unfiltered] = -np.inf
+        best_surplus = np.full(matrix.num_competitions, -np.inf)
+        np.maximum.at(best_surplus, matrix.solution_competition, solution_surplus)
+        best = unfiltered & (
+            solution_surplus == best_surplus[matrix.solution_competition]
+        )
+        return last_solutions(matrix, best)
+
+
+def competition_token_pairs(matrix: SurplusMatrix) -> list[list[int]]:
+    """
+    Token pairs of every solution, as needed by pack_solutions. Token pairs are bit positions
+    there, so columns are numbered from 0 per competition. Columns of a competition are
+    contiguous.
+    """
+    first_columns = np.searchsorted(
+        matrix.column_competition, np.arange(matrix.num_competitions)
+    )
+    local_columns = matrix.columns - first_columns[matrix.entry_competition]
+    token_pairs: list[list[int]] = [[] for _ in range(matrix.num_solutions)]
+    for row, column in zip(matrix.rows.tolist(), local_columns.tolist()):
+        token_pairs[row].append(column)
+    return token_pairs
+
+
+@dataclass
+class OptimalPacking(Mechanism):
+    """
+    Surplus maximizing winners: the set of solutions with disjoint token pairs and maximal total
+    surplus, see src/winner_determination.py. If fair is set, only solutions which are not
+    filtered out by the baseline of the combinatorial auction can win. The search stops after
+    time_budget seconds per competition. Competitions of the last allocation where the packing
+    is not proven optimal are counted in not_optimal.
+    """
+
+    fair: bool = False
+    baseline_solvers: Optional[Collection[str]] = None
+    time_budget: float = WINNER_DETERMINATION_TIME_BUDGET_IN_SEC
+    not_optimal: int = field(default=0, init=False)
+
+    def selectable_solutions(self, matrix: SurplusMatrix) -> BoolArray:
+        """Solutions which can win, i.e. all or only those which are not filtered out."""
+        if not self.fair:
+            return np.ones(matrix.num_solutions, dtype=np.bool_)
+        baseline, baseline_solution = compute_baseline(matrix, self.baseline_solvers)
+        filtering = filtering_entries(matrix, baseline, baseline_solution)
+        return ~filtered_solutions(matrix, filtering)
+
+    def allocate(self, matrix: SurplusMatrix) -> BoolArray:
+        selectable = self.selectable_solutions(matrix)
+        solution_surplus = np.bincount(
+            matrix.rows, weights=matrix.surplus, minlength=matrix.num_solutions
+        )
+        token_pairs = competition_token_pairs(matrix)
+        winning_solutions = np.zeros(matrix.num_solutions, dtype=np.bool_)
+        self.not_optimal = 0
+        offsets = matrix.offsets.tolist()
+        for first, end in zip(offsets, offsets[1:]):
+            rows = [row for row in range(first, end) if selectable[row]]
+            packing = pack_solutions(
+                [token_pairs[row] for row in rows],
+                [float(solution_surplus[row]) for row in rows],
+                self.time_budget,
+            )
+            if not packing.optimal:
+                self.not_optimal += 1
+            winning_solutions[[rows[index] for index in packing.solutions]] = True
+        winning: BoolArray = winning_solutions[matrix.rows]
+        return winning
+
+
+def default_mechanisms() -> dict[str, Mechanism]:
+    """
+    Mechanisms compared by default. Instances are created on every call, as mechanisms can keep
+    state of their last allocation, e.g. OptimalPacking.not_optimal.
+    """
+    return {
+        "single_winner": SingleWinner(),
+        "combinatorial": Combinatorial(),
+        "combinatorial_reference_baseline": Combinatorial(
+            baseline_solvers={"baseline"}
+        ),
+        "fair_batch": FairBatch(),
+        "fair_batch_reference_baseline": FairBatch(baseline_solvers={"baseline"}),
+        "optimal": OptimalPacking(),
+        "optimal_fair": OptimalPacking(fair=True),
+    }
+
+
+@dataclass
+class Simulation:
+    """Outcome of a mechanism on all competitions of a surplus matrix."""
+
+    mechanism: str
+    duration: float
+    # per competition
+    surplus: FloatArray
+    winners: IntArray
+
+    def summary(self, reference: Optional[Simulation] = None) -> dict[str, Any]:
+        """
+        Summary of the outcome as JSON serializable dict. If a reference is given, e.g. the
+        current mechanism, surplus is also compared to it.
+        """
+        summary: dict[str, Any] = {
+            "mechanism": self.mechanism,
+            "duration_ms": self.duration * 1000,
+            "competitions": len(self.surplus),
+            "total_surplus_eth": float(self.surplus.sum()),
+            "mean_winners": float(self.winners.mean()) if len(self.winners) else 0.0,
+        }
+        if reference is not None:
+            difference = self.surplus - reference.surplus
+            summary["surplus_difference_eth"] = float(difference.sum())
+            summary["competitions_with_more_surplus"] = int((difference > 0).sum())
+            summary["competitions_with_less_surplus"] = int((difference < 0).sum())
+        return summary
+
+
+def simulate(
+    matrix: SurplusMatrix, mechanisms: Optional[dict[str, Mechanism]] = None
+) -> list[Simulation]:
+    """
+    Evaluate mechanisms, default_mechanisms by default, on all competitions of a surplus matrix.
+    """
+    if mechanisms is None:
+        mechanisms = default_mechanisms()
+    simulations = []
+    for name, mechanism in mechanisms.items():
+        start = time.perf_counter()
+        winning = mechanism.allocate(matrix)
+        surplus = matrix.competition_surplus(winning)
+        # number of distinct winning solutions per competition
+        winning_solutions = np.zeros(matrix.num_solutions, dtype=np.bool_)
+        winning_solutions[matrix.rows[winning]] = True
+        winners = np.bincount(
+            matrix.solution_competition[winning_solutions],
+            minlength=matrix.num_competitions,
+        )
+        simulations.append(
+            Simulation(name, time.perf_counter() - start, surplus, winners)
+        )
+    return simulations
+
+
+def main() -> None:
+    """Fetch competitions into the cache and simulate all mechanisms on the cache."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("tx_hashes", nargs="*", help="competitions to fetch if needed")
+    parser.add_argument("--cache", default=DEFAULT_COMPETITION_CACHE_PATH)
+    parser.add_argument("--chain", default="mainnet")
+    parser.add_argument("--output", help="output file, results are printed if not set")
+    args = parser.parse_args()
+
+    # pylint: disable=import-outside-toplevel
+    from src.apis.orderbookapi import OrderbookAPI
+    from src.monitoring_tests.combinatorial_auction_surplus_test import (
+        CombinatorialAuctionSurplusTest,
+    )
+
+    cache = CompetitionCache(args.cache)
+    if args.tx_hashes:
+        test = CombinatorialAuctionSurplusTest(
+            OrderbookAPI(args.chain), chain_name=args.chain
+        )
+        cache.get_or_fetch(args.tx_hashes, test.fetch)
+    payloads = cache.payloads()
+    cache.close()
+
+    start = time.perf_counter()
+    matrix = build_surplus_matrix(payloads)
+    build_duration = time.perf_counter() - start
+    simulations = simulate(matrix)
+    output = json.dumps(
+        {
+            "competitions": len(payloads),
+            "build_ms": build_duration * 1000,
+            "mechanisms": [
+                simulation.summary(simulations[0]) for simulation in simulations
+            ],
+        },
+        indent=2,
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Prometheus metrics for throughput of the daemon, latency of tests and APIs, and caches.
+
+Metrics are exported over HTTP by start_metrics_server.
+"""
+
+from contextvars import ContextVar
+from functools import wraps
+from os import getenv
+import time
+from typing import Callable, Optional, ParamSpec, TypeVar
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+from src.constants import METRICS_PORT
+from src.profiling import FETCH, stage
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+BLOCKS_PROCESSED = Counter(
+    "ebbo_blocks_processed", "Number of blocks scanned for settlements.", ["chain"]
+)
+SETTLEMENTS_PROCESSED = Counter(
+    "ebbo_settlements_processed",
+    "Number of settlements added to test queues.",
+    ["chain"],
+)
+BLOCK_LAG = Gauge(
+    "ebbo_block_lag",
+    "Number of blocks between the chain head and the last scanned block.",
+    ["chain"],
+)
+TEST_QUEUE_DEPTH = Gauge(
+    "ebbo_test_queue_depth",
+    "Number of hashes in the queue of a test.",
+    ["chain", "test"],
+)
+TEST_RETRIES = Counter(
+    "ebbo_test_retries",
+    "Number of test runs which need to be retried.",
+    ["chain", "test"],
+)
+TEST_RUN_LATENCY = Histogram(
+    "ebbo_test_run_seconds",
+    "Time for running a test on one hash.",
+    ["chain", "test"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 20, 40, 80),
+)
+API_REQUEST_LATENCY = Histogram(
+    "ebbo_api_request_seconds",
+    "Time for requests to external APIs.",
+    ["api", "method"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+API_ERRORS = Counter(
+    "ebbo_api_errors", "Number of failed requests to external APIs.", ["api", "method"]
+)
+CACHE_REQUESTS = Counter(
+    "ebbo_cache_requests", "Number of cache lookups by result.", ["cache", "result"]
+)
+LOG_RECORDS_DROPPED = Counter(
+    "ebbo_log_records_dropped",
+    "Number of log records dropped as the log queue was full.",
+)
+
+# whether an HTTP request of the API call in progress failed, see observe_api_request
+API_CALL_FAILED: ContextVar[Optional[list[bool]]] = ContextVar(
+    "api_call_failed", default=None
+)
+
+
+def is_failure_status(status_code: int) -> bool:
+    """
+    Whether an HTTP status is a failure. Not found is not, since APIs use it for data which is
+    not available yet, e.g. competition data of a recent settlement.
+    """
+    return status_code >= 400 and status_code != 404
+
+
+def record_failed_request() -> None:
+    """Mark the API call in progress as failed, e.g. if one of its HTTP requests failed."""
+    failed = API_CALL_FAILED.get()
+    if failed is not None:
+        failed[0] = True
+
+
+def observe_api_request(api: str) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """
+    Decorator for API methods which records their latency. Calls are counted as errors if they
+    raise, or if one of their HTTP requests raised or returned a failure status, see
+    record_failed_request. Returning None is not an error, since API methods also return None
+    for data which is not available yet. Calls are also recorded as fetch stage of profiled test
+    runs.
+    """
+
+    def decorator(function: Callable[P, R]) -> Callable[P, R]:
+        latency = API_REQUEST_LATENCY.labels(api, function.__name__)
+        errors = API_ERRORS.labels(api, function.__name__)
+
+        @wraps(function)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            start = time.perf_counter()
+            failed = [False]
+            token = API_CALL_FAILED.set(failed)
+            try:
+                with stage(FETCH, f"{api}.{function.__name__}"):
+                    result = function(*args, **kwargs)
+            except Exception:
+                failed[0] = True
+                raise
+            finally:
+                API_CALL_FAILED.reset(token)
+                latency.observe(time.perf_counter() - start)
+                if failed[0]:
+                    errors.inc()
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    """Count a cache lookup as hit or miss."""
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def start_metrics_server() -> None:
+    """
+    Serve metrics on the port METRICS_PORT, which can be overwritten by the environment variable
+    of the same name. Setting the port to 0 disables the server.
+    """
+    port = int(getenv("METRICS_PORT", str(METRICS_PORT)))
+    if port > 0:
+        start_http_server(port)
@@ -1,10 +1,11 @@
 """
-Definition of trades, orders, and executions.
+Definition of trades, orders, executions, and settlement events.
 """
 
 from __future__ import annotations
 from fractions import Fraction
-from dataclasses import dataclass
+from dataclasses import astuple, dataclass
+from typing import Any
 
 
 @dataclass
@@ -75,6 +76,17 @@ class Trade:
         """
         return trade.get_price() / self.get_price() - 1
 
+    def to_payload(self) -> list[Any]:
+        """Compact JSON serializable representation, e.g. for passing trades to other processes.
+        It contains all fields of the order data followed by all fields of the execution.
+        """
+        return [*astuple(self.data), *astuple(self.execution)]
+
+    @classmethod
+    def from_payload(cls, payload: list[Any]) -> Trade:
+        """Create Trade from its compact representation, see to_payload."""
+        return cls(OrderData(*payload[:7]), OrderExecution(*payload[7:]))
+
 
 @dataclass
 class OrderData:
@@ -124,6 +136,35 @@ class OrderExecution:
         self.fee_amount = fee_amount_adapted
 
 
+@dataclass
+class TradeEvent:
+    """Class for a Trade event emitted by the settlement contract.
+    The sell amount includes the fee amount.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    owner: str
+    sell_token: str
+    buy_token: str
+    sell_amount: int
+    buy_amount: int
+    fee_amount: int
+    order_uid: str
+    log_index: int
+
+
+@dataclass
+class SettlementEvent:
+    """Class for a settlement as observed from the logs of the settlement contract."""
+
+    tx_hash: str
+    block_number: int
+    block_hash: str
+    tx_index: int
+    trades: list[TradeEvent]
+
+
 def find_partially_fillable(trades: list[Trade]) -> list[int]:
     """
     Go through a list of trades and output a list of indices corresponding to all partially
@@ -3,12 +3,31 @@ In this file, we introduce the BaseTest class, whose purpose is to be used as th
 for all tests developed.
 """
 
-# pylint: disable=logging-fstring-interpolation
-
-import os
+from __future__ import annotations
+import json
+import time
 from abc import ABC, abstractmethod
-from slack_sdk import WebClient
-from src.helper_functions import get_logger
+from concurrent.futures import Future
+from typing import Any, Optional
+from src.aggregates import get_aggregator
+from src.alerts import AlertSuppressor, get_alert_dispatcher
+from src.helper_functions import get_logger, get_process_pool
+from src.metrics import TEST_QUEUE_DEPTH, TEST_RETRIES, TEST_RUN_LATENCY
+from src.models import SettlementEvent
+from src.profiling import ALERT, profile, stage
+from src.results import Result, get_results_store
+from src.constants import ALERT_SUPPRESSION_WINDOW_IN_SEC
+
+
+def evaluate_payload(test_class: type[CPUBoundTest], payload: str) -> tuple[str, float]:
+    """
+    Evaluate a serialized payload with the evaluate function of a test class. This is the entry
+    point of CPU bound tests in the process pool, payload and result are passed as JSON. The
+    time of the evaluation is returned with the result.
+    """
+    start = time.perf_counter()
+    result = json.dumps(test_class.evaluate(json.loads(payload)), separators=(",", ":"))
+    return result, time.perf_counter() - start
 
 
 class BaseTest(ABC):
@@ -18,13 +37,24 @@ class BaseTest(ABC):
     is a subclass of this class.
     """
 
-    def __init__(self) -> None:
-        self.tx_hashes: list[str] = []
-        self.logger = get_logger()
-        self.slack_client: WebClient | None = None
+    # pylint: disable=too-many-instance-attributes
+
+    # window in which repeated alerts with the same key are suppressed, can be set per test
+    alert_suppression_window: float = ALERT_SUPPRESSION_WINDOW_IN_SEC
 
-        if "SLACK_BOT_TOKEN" in os.environ:
-            self.slack_client = WebClient(token=os.environ["SLACK_BOT_TOKEN"])
+    def __init__(self, *, chain_name: str = "") -> None:
+        # chain of the settlements, used to label metrics, alerts, and results
+        self.chain_name = chain_name
+        self.tx_hashes: list[str] = []
+        # settlement events of hashes in the queue, if known from ingesting logs
+        self.settlement_events: dict[str, SettlementEvent] = {}
+        self.logger = get_logger(type(self).__name__)
+        self.alert_dispatcher = get_alert_dispatcher()
+        self.alert_suppressor = AlertSuppressor(self.alert_suppression_window)
+        self.results_store = get_results_store()
+        self.aggregator = get_aggregator()
+        # results of runs in progress, aggregated once a run is final
+        self.pending_results: dict[str, list[Result]] = {}
 
     @abstractmethod
     def run(self, tx_hash: str) -> bool:
@@ -38,34 +68,269 @@ class BaseTest(ABC):
         """
         Run the test for all hashes in the list tx_hashes.
         """
-        tx_hashes_fails: list[str] = []
-        for tx_hash in self.tx_hashes:
-            success = self.run(tx_hash)
-            if not success:
-                tx_hashes_fails.append(tx_hash)
+        name = type(self).__name__
+        successes = self.run_hashes()
+        tx_hashes_fails = [
+            tx_hash
+            for tx_hash, success in zip(self.tx_hashes, successes)
+            if not success
+        ]
+        TEST_RETRIES.labels(self.chain_name, name).inc(len(tx_hashes_fails))
         tx_hashes_success = [
             tx_hash for tx_hash in self.tx_hashes if tx_hash not in tx_hashes_fails
         ]
         self.logger.debug(
-            f"Test ran successefully for hashes {tx_hashes_success} and"
-            f"needs to be rerun for hashes {tx_hashes_fails}."
+            "Test ran successefully for hashes %s and"
+            "needs to be rerun for hashes %s.",
+            tx_hashes_success,
+            tx_hashes_fails,
         )
         self.tx_hashes = tx_hashes_fails
+        TEST_QUEUE_DEPTH.labels(self.chain_name, name).set(len(self.tx_hashes))
+        self.settlement_events = {
+            tx_hash: self.settlement_events[tx_hash]
+            for tx_hash in tx_hashes_fails
+            if tx_hash in self.settlement_events
+        }
+        self.flush_alert_summaries()
+        if self.results_store is not None:
+            self.results_store.flush()
+
+    def run_hashes(self) -> list[bool]:
+        """
+        Run the test for all hashes in the list tx_hashes, and return whether each run was
+        successful.
+        If profiling is enabled, each run is traced, see src/profiling.py.
+        """
+        name = type(self).__name__
+        latency = TEST_RUN_LATENCY.labels(self.chain_name, name)
+        successes = []
+        for tx_hash in self.tx_hashes:
+            with latency.time(), profile(name, tx_hash):
+                self.discard_results(tx_hash)
+                success = self.run(tx_hash)
+                self.finish_run(tx_hash, success)
+            successes.append(success)
+        return successes
+
+    def run_once(self, settlement_event: SettlementEvent) -> bool:
+        """
+        Run the test for one settlement outside of the queue, e.g. for a task leased from a work
+        queue. Returns `False` if the test should be run again for this settlement.
+        """
+        name = type(self).__name__
+        latency = TEST_RUN_LATENCY.labels(self.chain_name, name)
+        tx_hash = settlement_event.tx_hash
+        self.settlement_events[tx_hash] = settlement_event
+        try:
+            with latency.time(), profile(name, tx_hash):
+                self.discard_results(tx_hash)
+                success = self.run(tx_hash)
+                self.finish_run(tx_hash, success)
+        finally:
+            if tx_hash not in self.tx_hashes:
+                del self.settlement_events[tx_hash]
+        if not success:
+            TEST_RETRIES.labels(self.chain_name, name).inc()
+        self.flush_alert_summaries()
+        return success
 
     def add_hashes_to_queue(self, tx_hashes: list[str]) -> None:
         """
         Add a list of hashes to tx_hashes.
         """
         self.tx_hashes += tx_hashes
+        TEST_QUEUE_DEPTH.labels(self.chain_name, type(self).__name__).set(
+            len(self.tx_hashes)
+        )
+
+    def add_settlement_events_to_queue(
+        self, settlement_events: list[SettlementEvent]
+    ) -> None:
+        """
+        Add the hashes of a list of settlement events to tx_hashes. The events are kept until the
+        test ran successfully for the hash, so that tests can use them instead of fetching the
+        same data again.
+        """
+        for settlement_event in settlement_events:
+            self.settlement_events[settlement_event.tx_hash] = settlement_event
+        self.add_hashes_to_queue([event.tx_hash for event in settlement_events])
+
+    def get_settlement_event(self, tx_hash: str) -> Optional[SettlementEvent]:
+        """
+        Get the settlement event of a hash in the queue, if it is known.
+        """
+        return self.settlement_events.get(tx_hash)
+
+    def record_result(
+        self,
+        tx_hash: str,
+        values: dict[str, float],
+        *,
+        key: str = "",
+        solver: str = "",
+        alert: bool = False,
+    ) -> None:
+        """
+        Record numeric values of a result in the aggregates of the test, and in the results store
+        if it is enabled. The key identifies the result within the settlement, e.g. an order uid
+        or a token pair. Results are aggregated when the run is final, see finish_run.
+        """
+        result = Result(
+            type(self).__name__,
+            tx_hash,
+            key,
+            solver,
+            alert,
+            values,
+            chain=self.chain_name,
+        )
+        self.pending_results.setdefault(tx_hash, []).append(result)
+        if self.results_store is not None:
+            self.results_store.record(result)
+
+    def finish_run(self, tx_hash: str, success: bool) -> list[Result]:
+        """
+        Add the results of a run on a hash to the aggregates if the run was successful, and
+        return them. Results of runs which need to be run again are dropped, as they are
+        replaced by the results of the next run, so that each result is aggregated once.
+        """
+        results = self.pending_results.pop(tx_hash, [])
+        if not success:
+            return []
+        for result in results:
+            self.aggregator.record(result)
+        return results
+
+    def discard_results(self, tx_hash: str) -> None:
+        """
+        Discard stored results of previous runs on a hash, so that the results of a run replace
+        all of them.
+        """
+        if self.results_store is not None:
+            self.results_store.discard(self.chain_name, type(self).__name__, tx_hash)
 
-    def alert(self, msg: str) -> None:
+    def alert(self, msg: str, key: Optional[tuple[str, ...]] = None) -> None:
         """
         This function is called to create an alert for a failed test.
-        It must be implemented by all subclasses.
+        If a key is given, e.g. (solver, sell_token, buy_token), repeated alerts of this test with
+        the same key are suppressed within alert_suppression_window, and a summary is emitted
+        when the window closes.
+        """
+        with stage(ALERT):
+            self.flush_alert_summaries()
+            if key is not None and not self.alert_suppressor.check(key, msg):
+                self.logger.debug("Suppressed repeated alert for %s.", key)
+                return
+            self.emit_alert(msg)
+
+    def flush_alert_summaries(self) -> None:
         """
+        Emit summaries of suppressed alerts for all suppression windows that have closed.
+        """
+        for summary in self.alert_suppressor.expire():
+            self.emit_alert(f"{type(self).__name__}: {summary}")
+
+    def emit_alert(self, msg: str) -> None:
+        """
+        Log an alert and hand it to the Slack alert dispatcher, which delivers it in the
+        background. Alerts are prefixed with the chain, and coalesced per chain and test.
+        """
+        source = type(self).__name__
+        if self.chain_name:
+            msg = f"[{self.chain_name}] {msg}"
+            source = f"{self.chain_name}/{source}"
         self.logger.error(msg)
 
-        if self.slack_client:
-            self.slack_client.chat_postMessage(
-                channel=os.environ.get("SLACK_CHANNEL", "#alerts-ebbo"), text=msg
-            )
+        if self.alert_dispatcher:
+            self.alert_dispatcher.submit(source, msg)
+
+
+class CPUBoundTest(BaseTest):
+    """
+    Base class for CPU bound tests. Such tests are split into fetching data from APIs,
+    evaluating it without access to APIs, and reporting the result. When running the queue,
+    evaluation is done in the process pool, see get_process_pool, with payloads and results
+    passed as compact JSON.
+    """
+
+    @abstractmethod
+    def fetch(self, tx_hash: str) -> Optional[dict[str, Any]]:
+        """
+        Fetch all data the test needs for a hash, as JSON serializable payload. None is returned
+        if the test should be run again for this hash.
+        """
+
+    @staticmethod
+    @abstractmethod
+    def evaluate(payload: dict[str, Any]) -> dict[str, Any]:
+        """
+        Evaluate the payload of a hash. The result must be JSON serializable.
+        """
+
+    @abstractmethod
+    def report(self, tx_hash: str, result: dict[str, Any]) -> bool:
+        """
+        Log and alert the result of a hash. The function returns `False` if the test should be
+        run again for this hash and `True` otherwise.
+        """
+
+    def run(self, tx_hash: str) -> bool:
+        """
+        Run the test for one hash in this process.
+        """
+        payload = self.fetch(tx_hash)
+        if payload is None:
+            return False
+        return self.report(tx_hash, self.evaluate(payload))
+
+    def run_hashes(self) -> list[bool]:
+        """
+        Run the test for all hashes in tx_hashes. If the process pool is enabled, data of all
+        hashes is fetched first and evaluated in parallel in the pool, then results are reported
+        in order. Otherwise, hashes are run one by one in this process. The latency of a hash is
+        the time of fetching, evaluating, and reporting it, without waiting for other hashes.
+        """
+        process_pool = get_process_pool()
+        if process_pool is None:
+            return super().run_hashes()
+        name = type(self).__name__
+        fetch_times: dict[str, float] = {}
+        futures: dict[str, Future[tuple[str, float]]] = {}
+        for tx_hash in self.tx_hashes:
+            start = time.perf_counter()
+            with profile(name, tx_hash, "fetch"):
+                payload = self.fetch(tx_hash)
+            fetch_times[tx_hash] = time.perf_counter() - start
+            if payload is not None:
+                futures[tx_hash] = process_pool.submit(
+                    evaluate_payload,
+                    type(self),
+                    json.dumps(payload, separators=(",", ":")),
+                )
+
+        latency = TEST_RUN_LATENCY.labels(self.chain_name, name)
+        successes = []
+        for tx_hash in self.tx_hashes:
+            run_time = fetch_times[tx_hash]
+            success = False
+            if tx_hash in futures:
+                try:
+                    result, evaluation_time = futures[tx_hash].result()
+                    run_time += evaluation_time
+                    start = time.perf_counter()
+                    with profile(name, tx_hash, "report"):
+                        self.discard_results(tx_hash)
+                        success = self.report(tx_hash, json.loads(result))
+                        self.finish_run(tx_hash, success)
+                    run_time += time.perf_counter() - start
+                except Exception as err:  # pylint: disable=W0718
+                    self.logger.error(
+                        "Evaluation of %s failed with exception of type %s: %s",
+                        tx_hash,
+                        type(err),
+                        err,
+                    )
+            latency.observe(run_time)
+            successes.append(success)
+        return successes
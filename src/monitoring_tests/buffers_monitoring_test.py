@@ -1,100 +1,110 @@
 """
-Checks the value of buffers every 150 settlements by invoking
-the ehtplorer api, and in some cases, coingecko.
+Checks the value of buffers every BUFFER_INTERVAL settlements by reading token balances of the
+settlement contract on-chain and valuing them with native prices of the latest auction.
 """
 
-# pylint: disable=logging-fstring-interpolation
-import requests
+from typing import Optional
 from src.monitoring_tests.base_test import BaseTest
+from src.apis.web3api import Web3API
+from src.apis.orderbookapi import OrderbookAPI
 from src.apis.coingeckoapi import CoingeckoAPI
 from src.apis.tokenlistapi import TokenListAPI
 from src.constants import (
     BUFFER_INTERVAL,
-    header,
-    REQUEST_TIMEOUT,
     BUFFERS_VALUE_USD_THRESHOLD,
+    COINGECKO_PLATFORMS,
+    SETTLEMENT_CONTRACT_ADDRESS,
+    WRAPPED_NATIVE_TOKEN_ADDRESSES,
 )
 
 
 class BuffersMonitoringTest(BaseTest):
     """
     This test checks the value of the settlement contract buffers
-    every 150 settlements and generates an alert if it is higher than 200_000 USD.
-    Price feeds from ethplorer and coingecko (as backup) are used.
+    every BUFFER_INTERVAL settlements and generates an alert if it is higher than
+    BUFFERS_VALUE_USD_THRESHOLD.
+    Balances of tokens from a curated token list are read via batched multicalls at the block of
+    the settlement. Tokens are valued using native prices of the latest auction, and the price of
+    the native token of the chain in USD is taken from coingecko, via its wrapped token.
     """
 
-    def __init__(self) -> None:
-        super().__init__()
-        self.coingecko_api = CoingeckoAPI()
+    def __init__(
+        self, web3_api: Web3API, orderbook_api: OrderbookAPI, *, chain_name: str = ""
+    ) -> None:
+        super().__init__(chain_name=chain_name)
+        self.web3_api = web3_api
+        self.orderbook_api = orderbook_api
+        # tests without chain name monitor mainnet
+        chain = chain_name or "mainnet"
+        self.wrapped_native_token = WRAPPED_NATIVE_TOKEN_ADDRESSES[chain]
+        self.coingecko_api = CoingeckoAPI(COINGECKO_PLATFORMS[chain])
         self.tokenlist_api = TokenListAPI()
+        self.token_list: Optional[list[str]] = None
         self.counter: int = 0
 
-    def compute_buffers_value(self) -> bool:
+    def compute_buffers_value(self, block_number: int, tx_hash: str = "") -> bool:
         """
-        Evaluates current state of buffers.
+        Evaluates the state of buffers at a given block, the block of settlement tx_hash.
         """
-        # get all token balances of the smart contract
-        try:
-            ethplorer_data = requests.get(
-                "https://api.ethplorer.io/getAddressInfo/"
-                + "0x9008D19f58AAbD9eD0D60971565AA8510560ab41?apiKey=freekey",
-                headers=header,
-                timeout=REQUEST_TIMEOUT,
-            )
-            ethplorer_rsp = ethplorer_data.json()
-            if "tokens" not in ethplorer_rsp:
-                return False
-            token_list = self.tokenlist_api.get_token_list()
-            if token_list is None:
+        if self.token_list is None:
+            self.token_list = self.tokenlist_api.get_token_list()
+            if self.token_list is None:
                 return False
 
-            value_in_usd = 0.0
-            for token in ethplorer_rsp["tokens"]:
-                if token["tokenInfo"]["address"] not in token_list:
-                    continue
-                balance = token["balance"]
-                decimals = int(token["tokenInfo"]["decimals"])
-                if token["tokenInfo"]["price"] is not False:
-                    price_in_usd = token["tokenInfo"]["price"]["rate"]
-                    token_buffer_value_in_usd = (balance / 10**decimals) * price_in_usd
-                    # in case some price is way off and it blows a lot the total value held in the
-                    # smart contract we use a second price feed, from coingecko, to correct in case
-                    # the initial price is indeed off
-                    if token_buffer_value_in_usd > 10000:
-                        coingecko_price_in_usd = (
-                            self.coingecko_api.get_token_price_in_usd(
-                                token["tokenInfo"]["address"]
-                            )
-                        )
-                        coingecko_value_in_usd = (
-                            balance / 10**decimals
-                        ) * coingecko_price_in_usd
-                        token_buffer_value_in_usd = min(
-                            token_buffer_value_in_usd, coingecko_value_in_usd
-                        )
-                    value_in_usd += token_buffer_value_in_usd
-            log_output = f"Buffer value is {value_in_usd} USD"
-            if value_in_usd > BUFFERS_VALUE_USD_THRESHOLD:
-                self.alert(log_output)
-            else:
-                self.logger.info(log_output)
+        native_prices = self.orderbook_api.get_native_prices()
+        if native_prices is None:
+            return False
+        native_price_in_usd = self.coingecko_api.get_token_price_in_usd(
+            self.wrapped_native_token
+        )
+        if native_price_in_usd is None:
+            return False
 
-        except requests.RequestException as err:
-            self.logger.warning(
-                f"Connection Error while fetching buffer tokens and prices, error: {err}"
-            )
+        # only tokens from the curated list with a native price are considered
+        tokens = [token for token in set(self.token_list) if token in native_prices]
+        balances = self.web3_api.get_token_balances(
+            tokens, SETTLEMENT_CONTRACT_ADDRESS, block_number
+        )
+        if balances is None:
             return False
+
+        value_in_eth = (
+            sum(balance * native_prices[token] for token, balance in balances.items())
+            / 10**36
+        )
+        value_in_usd = value_in_eth * native_price_in_usd
+
+        log_output = (
+            f"Buffer value at block {block_number} is {value_in_usd} USD "
+            f"({len(balances)} tokens)"
+        )
+        self.record_result(
+            tx_hash,
+            {
+                "value_eth": value_in_eth,
+                "value_usd": value_in_usd,
+                "tokens": len(balances),
+            },
+            alert=value_in_usd > BUFFERS_VALUE_USD_THRESHOLD,
+        )
+        if value_in_usd > BUFFERS_VALUE_USD_THRESHOLD:
+            self.alert(log_output)
+        else:
+            self.logger.info(log_output)
         return True
 
     def run(self, tx_hash: str) -> bool:
         """
         Wrapper function for the whole test. Checks if BUFFER_INTERVAL many settlements have
-        been observed, in which case it invokes the main function that checks the current
-        value of buffers.
+        been observed, in which case it invokes the main function that checks the value of
+        buffers at the block of the settlement.
         """
         self.counter += 1
         if self.counter > BUFFER_INTERVAL:
-            success = self.compute_buffers_value()
+            block_number = self.web3_api.get_tx_block_number(tx_hash)
+            if block_number is None:
+                return True
+            success = self.compute_buffers_value(block_number, tx_hash)
             if success:
                 self.counter = 0
         return True
@@ -2,20 +2,20 @@
 Comparing order surplus per token pair to a reference solver in the competition.
 """
 
-# pylint: disable=logging-fstring-interpolation
 # pylint: disable=duplicate-code
 
-from typing import Any
+from typing import Any, Optional
 from fractions import Fraction
-from src.monitoring_tests.base_test import BaseTest
+from src.monitoring_tests.base_test import CPUBoundTest
 from src.apis.orderbookapi import OrderbookAPI
+from src.models import Trade
 from src.constants import (
     SURPLUS_ABSOLUTE_DEVIATION_ETH,
     COMBINATORIAL_AUCTION_ABSOLUTE_DEVIATION_ETH,
 )
 
 
-class CombinatorialAuctionSurplusTest(BaseTest):
+class CombinatorialAuctionSurplusTest(CPUBoundTest):
     """Test how a combinatorial auction would have settled the auction.
     This test implements a logic for a combinatorial auction and compares the result to what
     actually happened.
@@ -35,12 +35,63 @@ class CombinatorialAuctionSurplusTest(BaseTest):
       with our current mechanism.
     """
 
-    def __init__(self, orderbook_api: OrderbookAPI) -> None:
-        super().__init__()
+    def __init__(self, orderbook_api: OrderbookAPI, *, chain_name: str = "") -> None:
+        super().__init__(chain_name=chain_name)
         self.orderbook_api = orderbook_api
 
+    def create_payload(
+        self, competition_data: dict[str, Any]
+    ) -> Optional[dict[str, Any]]:
+        """Create the payload for evaluate from competition data.
+        The trades of all solutions are fetched from the orderbook and stored in their compact
+        representation, together with the native prices of all traded tokens. None is returned
+        if order data is not available.
+        """
+        solutions: list[dict[str, Any]] = []
+        for solution in competition_data["solutions"]:
+            trades_dict = self.orderbook_api.get_uid_trades(solution)
+            if trades_dict is None:
+                return None
+            solutions.append(
+                {
+                    "solver": solution["solver"],
+                    "trades": [trade.to_payload() for trade in trades_dict.values()],
+                }
+            )
+        prices = competition_data["auction"]["prices"]
+        tokens = {
+            token.lower()
+            for solution in solutions
+            for trade in solution["trades"]
+            for token in (trade[3], trade[4])
+        }
+        return {
+            "tx_hash": competition_data["transactionHashes"][0],
+            "prices": {token: prices[token] for token in tokens if token in prices},
+            "solutions": solutions,
+        }
+
     def run_combinatorial_auction(self, competition_data: dict[str, Any]) -> bool:
-        """Run combinatorial auction on competition data.
+        """Run combinatorial auction on competition data and report the result.
+        Returns False if order data for the competition is not available.
+        """
+        payload = self.create_payload(competition_data)
+        if payload is None:
+            return False
+        return self.report(payload["tx_hash"], self.evaluate(payload))
+
+    def fetch(self, tx_hash: str) -> Optional[dict[str, Any]]:
+        """Fetch competition data and orders of a settlement, see create_payload."""
+        solver_competition_data = self.orderbook_api.get_solver_competition_data(
+            tx_hash
+        )
+        if solver_competition_data is None:
+            return None
+        return self.create_payload(solver_competition_data)
+
+    @staticmethod
+    def evaluate(payload: dict[str, Any]) -> dict[str, Any]:
+        """Run combinatorial auction on the payload of a competition, see create_payload.
 
         The combinatorial auction consists of 4 steps:
         1. Aggregate surplus on the different directed sell token-buy token pairs for all solutions
@@ -49,25 +100,27 @@ class CombinatorialAuctionSurplusTest(BaseTest):
         3. Filter solutions which to not provide at least as much surplus as the baseline on all
            token pairs.
         4. Choose one batch winner and multiple single order winners.
-        """
 
-        solutions = competition_data["solutions"]
+        The result contains the winning solver, the log output, its level, and the values to
+        record in the results store.
+        """
+        test = CombinatorialAuctionSurplusTest
+        solutions = payload["solutions"]
 
-        aggregate_solutions: list[dict[tuple[str, str], Fraction]] = []
-        for solution in solutions:
-            aggregate_solution = self.get_token_pairs_surplus(
-                solution, competition_data["auction"]["prices"]
+        aggregate_solutions: list[dict[tuple[str, str], Fraction]] = [
+            test.get_token_pairs_surplus(
+                [Trade.from_payload(trade) for trade in solution["trades"]],
+                payload["prices"],
             )
-            if aggregate_solution is None:
-                return False
-            aggregate_solutions.append(aggregate_solution)
+            for solution in solutions
+        ]
 
-        baseline_surplus = self.compute_baseline_surplus(aggregate_solutions)
-        filter_mask = self.filter_solutions(aggregate_solutions, baseline_surplus)
-        winning_solutions = self.determine_winning_solutions(
+        baseline_surplus = test.compute_baseline_surplus(aggregate_solutions)
+        filter_mask = test.filter_solutions(aggregate_solutions, baseline_surplus)
+        winning_solutions = test.determine_winning_solutions(
             aggregate_solutions, baseline_surplus, filter_mask
         )
-        winning_solvers = self.determine_winning_solvers(
+        winning_solvers = test.determine_winning_solvers(
             solutions, aggregate_solutions, winning_solutions
         )
 
@@ -88,13 +141,13 @@ class CombinatorialAuctionSurplusTest(BaseTest):
         log_output = "\t".join(
             [
                 "Combinatorial auction surplus test:",
-                f"Tx Hash: {competition_data['transactionHashes'][0]}",
-                f"Winning Solver: {competition_data['solutions'][-1]['solver']}",
-                f"Winning surplus: {self.convert_fractions_to_floats(aggregate_solutions[-1])}",
-                f"Baseline surplus: {self.convert_fractions_to_floats(baseline_surplus)}",
-                f"Solutions filtering winner: {self.convert_fractions_to_floats(filter_mask[-1])}",
+                f"Tx Hash: {payload['tx_hash']}",
+                f"Winning Solver: {solutions[-1]['solver']}",
+                f"Winning surplus: {test.convert_fractions_to_floats(aggregate_solutions[-1])}",
+                f"Baseline surplus: {test.convert_fractions_to_floats(baseline_surplus)}",
+                f"Solutions filtering winner: {test.convert_fractions_to_floats(filter_mask[-1])}",
                 f"Solvers filtering winner: {solutions_filtering_winner}",
-                f"Combinatorial winners: {self.convert_fractions_to_floats(winning_solvers)}",
+                f"Combinatorial winners: {test.convert_fractions_to_floats(winning_solvers)}",
                 f"Total surplus: {float(total_surplus):.5f} ETH",
                 f"Combinatorial surplus: {float(total_combinatorial_surplus):.5f} ETH",
                 f"Absolute difference: {float(a_abs_eth):.5f}ETH",
@@ -106,30 +159,52 @@ class CombinatorialAuctionSurplusTest(BaseTest):
             and surplus_difference > COMBINATORIAL_AUCTION_ABSOLUTE_DEVIATION_ETH
             for ind, surplus_difference in filter_mask[-1]
         ):
-            self.alert(log_output)
+            level = "alert"
         elif (
             a_abs_eth > SURPLUS_ABSOLUTE_DEVIATION_ETH / 10
             or not len(filter_mask[-1]) == 0
         ):
-            self.logger.info(log_output)
+            level = "info"
         else:
-            self.logger.debug(log_output)
-
+            level = "debug"
+
+        return {
+            "winner": solutions[-1]["solver"],
+            "log_output": log_output,
+            "level": level,
+            "values": {
+                "total_surplus_eth": float(total_surplus),
+                "combinatorial_surplus_eth": float(total_combinatorial_surplus),
+                "absolute_difference_eth": float(a_abs_eth),
+                "filtering_solutions": len(filter_mask[-1]),
+            },
+        }
+
+    def report(self, tx_hash: str, result: dict[str, Any]) -> bool:
+        """Alert or log the result of the combinatorial auction."""
+        self.record_result(
+            tx_hash,
+            result["values"],
+            solver=result["winner"],
+            alert=result["level"] == "alert",
+        )
+        if result["level"] == "alert":
+            self.alert(result["log_output"], key=(result["winner"],))
+        elif result["level"] == "info":
+            self.logger.info(result["log_output"])
+        else:
+            self.logger.debug(result["log_output"])
         return True
 
+    @staticmethod
     def get_token_pairs_surplus(
-        self, solution: dict[str, Any], prices: dict[str, float]
-    ) -> dict[tuple[str, str], Fraction] | None:
-        """Aggregate surplus of a solution on the different token pairs.
+        trades: list[Trade], prices: dict[str, Any]
+    ) -> dict[tuple[str, str], Fraction]:
+        """Aggregate surplus of the trades of a solution on the different token pairs.
         The result is a dict containing directed token pairs and the aggregated surplus on them.
         """
-        trades_dict = self.orderbook_api.get_uid_trades(solution)
-        if trades_dict is None:
-            return None
-
         surplus_dict: dict[tuple[str, str], Fraction] = {}
-        for uid in trades_dict:
-            trade = trades_dict[uid]
+        for trade in trades:
             token_pair = (trade.data.sell_token.lower(), trade.data.buy_token.lower())
 
             # compute the conversion rate of the surplus token to ETH
@@ -151,8 +226,9 @@ class CombinatorialAuctionSurplusTest(BaseTest):
 
         return surplus_dict
 
+    @staticmethod
     def compute_baseline_surplus(
-        self, aggregate_solutions: list[dict[tuple[str, str], Fraction]]
+        aggregate_solutions: list[dict[tuple[str, str], Fraction]],
     ) -> dict[tuple[str, str], tuple[Fraction, int]]:
         """Computes baseline surplus for all token pairs.
         The baseline is computed from those solutions which only contain orders for a single token
@@ -172,8 +248,8 @@ class CombinatorialAuctionSurplusTest(BaseTest):
                     result[token_pair] = (surplus, i)
         return result
 
+    @staticmethod
     def filter_solutions(
-        self,
         aggregate_solutions: list[dict[tuple[str, str], Fraction]],
         baseline_surplus: dict[tuple[str, str], tuple[Fraction, int]],
     ) -> list[list[tuple[int, Fraction]]]:
@@ -199,8 +275,8 @@ class CombinatorialAuctionSurplusTest(BaseTest):
 
         return result
 
+    @staticmethod
     def determine_winning_solutions(
-        self,
         aggregate_solutions: list[dict[tuple[str, str], Fraction]],
         baseline_surplus: dict[tuple[str, str], tuple[Fraction, int]],
         filter_mask: list[list[tuple[int, Fraction]]],
@@ -223,8 +299,8 @@ class CombinatorialAuctionSurplusTest(BaseTest):
                 result[token_pair] = surplus_and_index[1]
         return result
 
+    @staticmethod
     def determine_winning_solvers(
-        self,
         solutions: list[dict[str, Any]],
         aggregate_solutions: list[dict[tuple[str, str], Fraction]],
         winning_solutions: dict[tuple[str, str], int],
@@ -242,35 +318,32 @@ class CombinatorialAuctionSurplusTest(BaseTest):
             result[solver][token_pair] = aggregate_solutions[solution_index][token_pair]
         return result
 
-    def convert_fractions_to_floats(self, obj: Any, precision: int = 4) -> Any:
+    @staticmethod
+    def convert_fractions_to_floats(obj: Any, precision: int = 4) -> Any:
         """Convert fractions in nested object to rounded floats.
         This function is only used for logging.
         """
         if isinstance(obj, dict):
             return {
-                k: self.convert_fractions_to_floats(v, precision)
+                k: CombinatorialAuctionSurplusTest.convert_fractions_to_floats(
+                    v, precision
+                )
                 for k, v in obj.items()
             }
         if isinstance(obj, list):
-            return [self.convert_fractions_to_floats(v, precision) for v in obj]
+            return [
+                CombinatorialAuctionSurplusTest.convert_fractions_to_floats(
+                    v, precision
+                )
+                for v in obj
+            ]
         if isinstance(obj, tuple):
-            return tuple(self.convert_fractions_to_floats(x, precision) for x in obj)
+            return tuple(
+                CombinatorialAuctionSurplusTest.convert_fractions_to_floats(
+                    x, precision
+                )
+                for x in obj
+            )
         if isinstance(obj, Fraction):
             return round(float(obj), precision)
         return obj
-
-    def run(self, tx_hash: str) -> bool:
-        """Runs the combinatoral auction surplus test
-        Wrapper function for the whole test. Checks if solver competition data is retrievable
-        and runs the test, else returns False to add to list of unchecked hashes.
-        """
-
-        solver_competition_data = self.orderbook_api.get_solver_competition_data(
-            tx_hash
-        )
-        if solver_competition_data is None:
-            return False
-
-        success = self.run_combinatorial_auction(solver_competition_data)
-
-        return success
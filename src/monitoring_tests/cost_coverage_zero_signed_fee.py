@@ -2,10 +2,9 @@
 Computing cost coverage per solver.
 """
 
-# pylint: disable=logging-fstring-interpolation
-
 from typing import Any, Dict
 from src.monitoring_tests.base_test import BaseTest
+from src.results import Result
 from src.apis.web3api import Web3API
 from src.apis.orderbookapi import OrderbookAPI
 
@@ -16,8 +15,10 @@ class CostCoverageForZeroSignedFee(BaseTest):
     sent as zero-signed fee orders from CoW Swap.
     """
 
-    def __init__(self, web3_api: Web3API, orderbook_api: OrderbookAPI) -> None:
-        super().__init__()
+    def __init__(
+        self, web3_api: Web3API, orderbook_api: OrderbookAPI, *, chain_name: str = ""
+    ) -> None:
+        super().__init__(chain_name=chain_name)
         self.web3_api = web3_api
         self.orderbook_api = orderbook_api
         self.cost_coverage_per_solver: Dict[str, float] = {}
@@ -55,6 +56,16 @@ class CostCoverageForZeroSignedFee(BaseTest):
                 / 10**36
             )
             total_fee += fee
+        self.record_result(
+            competition_data["transactionHash"],
+            {
+                "fee_eth": total_fee,
+                "gas_cost_eth": gas_cost,
+                "difference_eth": total_fee - gas_cost,
+            },
+            solver=solution["solver"],
+            alert=total_fee - gas_cost > 0.02,
+        )
         if total_fee - gas_cost > 0.02:
             self.alert(
                 f'"Fees - gasCost" is {total_fee - gas_cost} \
@@ -62,11 +73,37 @@ class CostCoverageForZeroSignedFee(BaseTest):
             )
         elif total_fee - gas_cost < -0.04:
             self.logger.info(
-                f'"Fees - gasCost" is {total_fee - gas_cost} \
-                for {competition_data["transactionHash"]}.'
+                '"Fees - gasCost" is %s for %s.',
+                total_fee - gas_cost,
+                competition_data["transactionHash"],
             )
         return True
 
+    def finish_run(self, tx_hash: str, success: bool) -> list[Result]:
+        """
+        Aggregate the results of a run, and update the cost coverage of their solvers.
+        """
+        results = super().finish_run(tx_hash, success)
+        for solver in {result.solver for result in results}:
+            self.update_coverage(solver)
+        return results
+
+    def update_coverage(self, solver: str) -> None:
+        """
+        Update mean and total cost coverage of a solver from the aggregates of this test.
+        """
+        coverage = self.aggregator.get(type(self).__name__, solver, "difference_eth")
+        if coverage is not None:
+            self.cost_coverage_per_solver[solver] = coverage["mean"]
+            self.total_coverage_per_solver[solver] = coverage["total"]
+            self.logger.debug(
+                "Cost coverage of %s: mean %s, total %s over %s settlements.",
+                solver,
+                coverage["mean"],
+                coverage["total"],
+                coverage["count"],
+            )
+
     def run(self, tx_hash: str) -> bool:
         """
         Wrapper function for the whole test. Checks if solver competition data is retrievable
@@ -3,16 +3,24 @@ Checks that commitments for custom CoW AMM of CoW AMM orders are reset.
 """
 
 # pylint: disable=duplicate-code
-from typing import Any
+# pylint: disable=import-outside-toplevel
+from __future__ import annotations
+from functools import cached_property
+from typing import TYPE_CHECKING, Any, Optional
 
 from eth_typing import Address
 from hexbytes import HexBytes
 
 from src.monitoring_tests.base_test import BaseTest
 from src.apis.web3api import Web3API
+from src.metrics import record_cache_lookup
+from src.settlement import Interaction
 
 from contracts.cowamm_constantproduct import cowamm_constantproduct
 
+if TYPE_CHECKING:
+    from web3.contract import Contract
+
 EMPTY_COMMITMENT = "0x0000000000000000000000000000000000000000000000000000000000000000"
 COWAMM_CONSTANT_PRODUCT_ADDRESS = "0x34323B933096534e43958F6c7Bf44F2Bb59424DA".lower()
 
@@ -23,38 +31,47 @@ class CoWAMMCommitmentTest(BaseTest):
     Whenever a preinteraction calling the commit functinon of the (old) CoW AMM smart contract is
     called, the currently commit order on the corresponding CoW AMM is checked. If the commited
     order is not equal to the default order, the commitment was not reset.
-    """
 
-    def __init__(self) -> None:
-        super().__init__()
-        self.web3_api = Web3API()
-        self.contract = self.web3_api.web_3.eth.contract(
-            address=Address(HexBytes(COWAMM_CONSTANT_PRODUCT_ADDRESS)),
-            abi=cowamm_constantproduct,
-        )
+    The test shares the Web3API of its chain if one is given.
+    """
 
-    def check_commitments(self, settlement: dict[str, Any]) -> bool:
+    def __init__(
+        self, web3_api: Optional[Web3API] = None, *, chain_name: str = ""
+    ) -> None:
+        super().__init__(chain_name=chain_name)
+        self.web3_api = web3_api or Web3API()
+        # input names and types of contract functions, keyed by selector
+        self.decoders: dict[bytes, Optional[tuple[list[str], list[str]]]] = {}
+
+    def check_commitments(
+        self, pre_interactions: list[Interaction], block_number: int, tx_hash: str = ""
+    ) -> bool:
         """Checks the commitment of CoW AMM orders.
 
-        If there is a preinteraction with a call to the commit function of the CoW AMM contant
-        product smart contract, the commitment of that AMM is checked at the current point in
-        time.
+        If there are preinteractions with a call to the commit function of the CoW AMM contant
+        product smart contract, the commitments of those AMMs are checked at the block of the
+        settlement. All commitments are read in one batched call.
 
         This is not a check for including a commit in post interactions or within interactions.
         It also does not check if the uncommit happened immediately, but just checks if the
-        current commitment is to the default order.
+        commitment at the end of the settlement block is the default order.
         """
-        # iterate over pre-interactions
-        for interaction in settlement["interactions"][0]:
-            if interaction["target"] != COWAMM_CONSTANT_PRODUCT_ADDRESS:
+        cowamm_addresses: list[str] = []
+        for interaction in pre_interactions:
+            if interaction.target.lower() != COWAMM_CONSTANT_PRODUCT_ADDRESS:
                 continue
-
             cowamm_address = self.get_cowamm_address(interaction)
+            if cowamm_address is not None:
+                cowamm_addresses.append(cowamm_address)
 
-            commitment = self.get_commitment(cowamm_address)
-            if commitment is None:
-                return False
+        if not cowamm_addresses:
+            return True
+
+        commitments = self.get_commitments(cowamm_addresses, block_number)
+        if commitments is None:
+            return False
 
+        for cowamm_address, commitment in zip(cowamm_addresses, commitments):
             commitment_is_reset = commitment == EMPTY_COMMITMENT
 
             log_output = "\t".join(
@@ -62,30 +79,85 @@ class CoWAMMCommitmentTest(BaseTest):
                     "CoW AMM Commitment test",
                     f"Commitment reset: {commitment_is_reset}",
                     f"CoW AMM: {cowamm_address}",
+                    f"Block: {block_number}",
                     f"Commitment: {commitment}",
                 ]
             )
+            self.record_result(
+                tx_hash,
+                {"commitment_reset": int(commitment_is_reset)},
+                key=cowamm_address,
+                alert=not commitment_is_reset,
+            )
             if not commitment_is_reset:
-                self.alert(log_output)
+                self.alert(log_output, key=(cowamm_address,))
             else:
                 self.logger.info(log_output)
 
         return True
 
-    def get_cowamm_address(self, interaction: dict[str, Any]) -> str:
+    @cached_property
+    def contract(self) -> Contract:
+        """The CoW AMM constant product contract, created on first use."""
+        return self.web3_api.web_3.eth.contract(
+            address=Address(HexBytes(COWAMM_CONSTANT_PRODUCT_ADDRESS)),
+            abi=cowamm_constantproduct,
+        )
+
+    def decode_interaction(self, call_data: bytes) -> Optional[dict[str, Any]]:
+        """Decode the calldata of an interaction with the CoW AMM contract.
+        Input names and types are looked up in the ABI once per function selector and cached.
+        None is returned if the selector does not correspond to a function of the contract.
+        """
+        from eth_abi.abi import decode
+        from eth_utils.abi import collapse_if_tuple
+
+        selector = bytes(call_data[:4])
+        record_cache_lookup("cowamm_decoders", selector in self.decoders)
+        if selector not in self.decoders:
+            try:
+                function_abi = self.contract.get_function_by_selector(selector).abi
+            except ValueError:
+                self.decoders[selector] = None
+            else:
+                self.decoders[selector] = (
+                    [str(abi_input["name"]) for abi_input in function_abi["inputs"]],
+                    [
+                        collapse_if_tuple(abi_input)
+                        for abi_input in function_abi["inputs"]
+                    ],
+                )
+        decoder = self.decoders[selector]
+        if decoder is None:
+            return None
+        names, types = decoder
+        return dict(zip(names, decode(types, call_data[4:])))
+
+    def get_cowamm_address(self, interaction: Interaction) -> Optional[str]:
         """Get the address of the CoW AMM from the commit interaction"""
-        decoded_interaction = self.contract.decode_function_input(
-            interaction["callData"]
-        )[1]
+        decoded_interaction = self.decode_interaction(interaction.call_data)
+        if decoded_interaction is None or "owner" not in decoded_interaction:
+            return None
         cowamm_address = str(decoded_interaction["owner"])
         return cowamm_address
 
-    def get_commitment(self, cowamm: str) -> str | None:
-        """Get the commited order for a given CoW AMM
-        It calls the commitment function in the smart contract for a given address and returns a
-        string of the format "0x...".
+    def get_commitments(
+        self, cowamms: list[str], block_number: int
+    ) -> Optional[list[str]]:
+        """Get the commited orders for a list of CoW AMMs at a given block
+        It calls the commitment function in the smart contract for all addresses in one batched
+        multicall and returns strings of the format "0x...".
         """
-        return "0x" + str(self.contract.functions.commitment(cowamm).call().hex())
+        calls = []
+        for cowamm in cowamms:
+            calldata = self.contract.encode_abi(
+                "commitment", [self.web3_api.web_3.to_checksum_address(cowamm)]
+            )
+            calls.append((COWAMM_CONSTANT_PRODUCT_ADDRESS, bytes(HexBytes(calldata))))
+        results = self.web3_api.multicall(calls, block_number)
+        if results is None or any(result is None for result in results):
+            return None
+        return ["0x" + bytes(result).hex() for result in results if result is not None]
 
     def run(self, tx_hash: str) -> bool:
         """
@@ -98,6 +170,8 @@ class CoWAMMCommitmentTest(BaseTest):
             return False
         settlement = self.web3_api.get_settlement(transaction)
 
-        success = self.check_commitments(settlement)
+        success = self.check_commitments(
+            settlement.pre_interactions, transaction["blockNumber"], tx_hash
+        )
 
         return success
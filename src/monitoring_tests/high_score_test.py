@@ -2,8 +2,6 @@
 Checking winner's score and generating an alert if score is very large
 """
 
-# pylint: disable=logging-fstring-interpolation
-
 from typing import Any
 from src.monitoring_tests.base_test import BaseTest
 from src.apis.orderbookapi import OrderbookAPI
@@ -16,8 +14,8 @@ class HighScoreTest(BaseTest):
     is above certain threshold
     """
 
-    def __init__(self, orderbook_api: OrderbookAPI) -> None:
-        super().__init__()
+    def __init__(self, orderbook_api: OrderbookAPI, *, chain_name: str = "") -> None:
+        super().__init__(chain_name=chain_name)
         self.orderbook_api = orderbook_api
 
     def compute_winning_score(self, competition_data: dict[str, Any]) -> bool:
@@ -34,6 +32,12 @@ class HighScoreTest(BaseTest):
                 f"Score in ETH: {score}",
             ]
         )
+        self.record_result(
+            competition_data["transactionHashes"][0],
+            {"score_eth": score},
+            solver=solution["solver"],
+            alert=score > HIGH_SCORE_THRESHOLD_ETH,
+        )
         if score > HIGH_SCORE_THRESHOLD_ETH:
             self.alert(log_output)
         return True
@@ -4,43 +4,104 @@ It generates an alert when kickbacks due to a specific settlement are
 more than KICKBACKS_ALERT_THRESHOLD
 """
 
-# pylint: disable=logging-fstring-interpolation
+from typing import Optional
 from src.monitoring_tests.base_test import BaseTest
 from src.apis.web3api import Web3API
 from src.constants import (
     MEV_BLOCKER_KICKBACKS_ADDRESSES,
     KICKBACKS_ALERT_THRESHOLD,
+    KICKBACKS_MAX_BLOCK_RANGE,
 )
 
 
+def block_windows(
+    block_numbers: list[int], max_range: int = KICKBACKS_MAX_BLOCK_RANGE
+) -> list[range]:
+    """
+    Group block numbers into block ranges of at most max_range blocks. Ranges start and end at
+    one of the block numbers, so that blocks far apart, e.g. of a retried old hash, do not widen
+    the range of a query.
+    """
+    windows: list[range] = []
+    for block_number in sorted(set(block_numbers)):
+        if windows and block_number - windows[-1].start < max_range:
+            windows[-1] = range(windows[-1].start, block_number + 1)
+        else:
+            windows.append(range(block_number, block_number + 1))
+    return windows
+
+
 class MEVBlockerRefundsMonitoringTest(BaseTest):
     """
     This test checks whether there was any MEV Blocker kicback, and
     generates a log/alert if this is the case.
+
+    Kickbacks to all kickback addresses are fetched with one log query per window of nearby
+    blocks of the hashes in the queue, and are joined to settlements by block number.
     """
 
-    def __init__(self, web3_api: Web3API) -> None:
-        super().__init__()
+    def __init__(self, web3_api: Web3API, *, chain_name: str = "") -> None:
+        super().__init__(chain_name=chain_name)
         self.web3_api = web3_api
+        # kickbacks per block for the block ranges fetched for the current queue
+        self.kickbacks_by_block: dict[int, float] = {}
+        self.kickbacks_block_ranges: list[range] = []
+
+    def get_block_number(self, tx_hash: str) -> Optional[int]:
+        """
+        Get the block number of a settlement, using the settlement event from ingesting logs if
+        available.
+        """
+        settlement_event = self.get_settlement_event(tx_hash)
+        if settlement_event is not None:
+            return settlement_event.block_number
+        return self.web3_api.get_tx_block_number(tx_hash)
+
+    def get_kickbacks(self, block_number: int) -> Optional[float]:
+        """
+        Get the total kickbacks to all kickback addresses in a block.
+        """
+        if not any(block_number in window for window in self.kickbacks_block_ranges):
+            kickbacks_by_block = self.web3_api.get_eth_transfers_by_block(
+                block_number, block_number, MEV_BLOCKER_KICKBACKS_ADDRESSES
+            )
+            if kickbacks_by_block is None:
+                return None
+            return kickbacks_by_block.get(block_number, 0.0)
+        return self.kickbacks_by_block.get(block_number, 0.0)
+
+    def run_queue(self) -> None:
+        """
+        Fetch kickbacks for the blocks of all hashes in the queue with one query per window of
+        nearby blocks, and then run the test for all hashes. Blocks of windows whose query
+        failed are fetched again per hash.
+        """
+        block_numbers = [
+            block_number
+            for block_number in map(self.get_block_number, self.tx_hashes)
+            if block_number is not None
+        ]
+        self.kickbacks_by_block = {}
+        self.kickbacks_block_ranges = []
+        for window in block_windows(block_numbers):
+            kickbacks_by_block = self.web3_api.get_eth_transfers_by_block(
+                window.start, window.stop - 1, MEV_BLOCKER_KICKBACKS_ADDRESSES
+            )
+            if kickbacks_by_block is not None:
+                self.kickbacks_by_block.update(kickbacks_by_block)
+                self.kickbacks_block_ranges.append(window)
+        super().run_queue()
 
     def run(self, tx_hash: str) -> bool:
         """
         Wrapper function for the whole test. Checks if kickback is more than
         KICKBACK_ETH_THRESHOLD, in which case it generates an alert.
         """
-        block_number = self.web3_api.get_tx_block_number(tx_hash)
+        block_number = self.get_block_number(tx_hash)
         if block_number is None:
             return False
 
-        eth_kickbacks = None
-        for address in MEV_BLOCKER_KICKBACKS_ADDRESSES:
-            kickback = self.web3_api.get_eth_transfers_by_block_range(
-                block_number, block_number, address
-            )
-            if kickback is not None:
-                eth_kickbacks = kickback
-                break
-
+        eth_kickbacks = self.get_kickbacks(block_number)
         if eth_kickbacks is None:
             return False
         log_output = "\t".join(
@@ -50,6 +111,11 @@ class MEVBlockerRefundsMonitoringTest(BaseTest):
                 f"Kickback: {eth_kickbacks:.5f}ETH",
             ]
         )
+        self.record_result(
+            tx_hash,
+            {"kickback_eth": eth_kickbacks},
+            alert=eth_kickbacks >= KICKBACKS_ALERT_THRESHOLD,
+        )
         if eth_kickbacks >= KICKBACKS_ALERT_THRESHOLD:
             self.alert(log_output)
         else:
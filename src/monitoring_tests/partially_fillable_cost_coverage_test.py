@@ -2,9 +2,8 @@
 Cost coverage test for partially fillable orders.
 """
 
-# pylint: disable=logging-fstring-interpolation
-
-from web3.types import TxData, TxReceipt
+from __future__ import annotations
+from typing import TYPE_CHECKING
 from src.monitoring_tests.base_test import BaseTest
 from src.apis.web3api import Web3API
 from src.apis.orderbookapi import OrderbookAPI
@@ -14,14 +13,19 @@ from src.constants import (
     COST_COVERAGE_RELATIVE_DEVIATION,
 )
 
+if TYPE_CHECKING:
+    from web3.types import TxData, TxReceipt
+
 
 class PartialFillCostCoverageTest(BaseTest):
     """
     Class for testing fees.
     """
 
-    def __init__(self, web3_api: Web3API, orderbook_api: OrderbookAPI) -> None:
-        super().__init__()
+    def __init__(
+        self, web3_api: Web3API, orderbook_api: OrderbookAPI, *, chain_name: str = ""
+    ) -> None:
+        super().__init__(chain_name=chain_name)
         self.web3_api = web3_api
         self.orderbook_api = orderbook_api
 
@@ -39,7 +43,7 @@ class PartialFillCostCoverageTest(BaseTest):
 
         partially_fillable_indices = find_partially_fillable(trades)
         self.logger.debug(
-            f"Number of partially fillable orders: {len(partially_fillable_indices)}."
+            "Number of partially fillable orders: %s.", len(partially_fillable_indices)
         )
 
         # Only run test if at least one partially fillable order is in the batch.
@@ -88,11 +92,24 @@ class PartialFillCostCoverageTest(BaseTest):
             ]
         )
 
-        if (
+        is_alert = (
             abs(a_abs) > 1e18 * COST_COVERAGE_ABSOLUTE_DEVIATION_ETH
             and abs(a_rel) > COST_COVERAGE_RELATIVE_DEVIATION
-        ):
-            self.alert(log_output)
+        )
+        self.record_result(
+            tx_hash,
+            {
+                "fee_eth": batch_fee * 1e-18,
+                "cost_eth": batch_cost * 1e-18,
+                "absolute_difference_eth": a_abs * 1e-18,
+                "relative_difference": a_rel,
+            },
+            solver=str(transaction["from"]),
+            alert=is_alert,
+        )
+
+        if is_alert:
+            self.alert(log_output, key=(str(transaction["from"]),))
         elif (
             abs(a_abs) > 1e18 * COST_COVERAGE_ABSOLUTE_DEVIATION_ETH / 10
             and abs(a_rel) > COST_COVERAGE_RELATIVE_DEVIATION / 10
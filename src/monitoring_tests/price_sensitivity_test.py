@@ -19,8 +19,8 @@ class PriceSensitivityTest(BaseTest):
     is far from exchange rate implied by UCP
     """
 
-    def __init__(self, orderbook_api: OrderbookAPI) -> None:
-        super().__init__()
+    def __init__(self, orderbook_api: OrderbookAPI, *, chain_name: str = "") -> None:
+        super().__init__(chain_name=chain_name)
         self.orderbook_api = orderbook_api
 
     def check_prices(self, competition_data: dict[str, Any]) -> bool:
@@ -53,7 +53,16 @@ class PriceSensitivityTest(BaseTest):
             max_rate = max(ucp_rate, native_price_rate)
             min_rate = min(ucp_rate, native_price_rate)
 
-            if max_rate > (1 + UCP_VS_NATIVE_SENSITIVITY_THRESHOLD) * min_rate:
+            is_alert = max_rate > (1 + UCP_VS_NATIVE_SENSITIVITY_THRESHOLD) * min_rate
+            self.record_result(
+                competition_data["transactionHashes"][0],
+                {"gap": float(max_rate / min_rate)},
+                key=uid,
+                solver=winning_solution["solver"],
+                alert=is_alert,
+            )
+
+            if is_alert:
                 log_output = "\t".join(
                     [
                         "Price sensitivity test:",
@@ -63,7 +72,10 @@ class PriceSensitivityTest(BaseTest):
                         f"Gap: {float(max_rate / min_rate)}",
                     ]
                 )
-                self.alert(log_output)
+                self.alert(
+                    log_output,
+                    key=(winning_solution["solver"], sell_token, buy_token),
+                )
 
         return True
 
@@ -2,7 +2,6 @@
 Comparing order surplus to a reference solution.
 """
 
-# pylint: disable=logging-fstring-interpolation
 # pylint: disable=duplicate-code
 
 from typing import Any, Optional
@@ -22,8 +21,10 @@ class ReferenceSolverSurplusTest(BaseTest):
     the executions of these orders by a reference solver.
     """
 
-    def __init__(self, web3_api: Web3API, orderbook_api: OrderbookAPI) -> None:
-        super().__init__()
+    def __init__(
+        self, web3_api: Web3API, orderbook_api: OrderbookAPI, *, chain_name: str = ""
+    ) -> None:
+        super().__init__(chain_name=chain_name)
         self.web3_api = web3_api
         self.orderbook_api = orderbook_api
         self.auction_instance_api = AuctionInstanceAPI()
@@ -58,8 +59,9 @@ class ReferenceSolverSurplusTest(BaseTest):
             )
             if ref_solver_response is None:
                 self.logger.debug(
-                    f"No reference solution for uid {uid} and "
-                    f"auction id {auction_instance['metadata']['auction_id']}"
+                    "No reference solution for uid %s and auction id %s",
+                    uid,
+                    auction_instance["metadata"]["auction_id"],
                 )
                 return True
             trade_alt = self.get_trade_information(
@@ -83,12 +85,14 @@ class ReferenceSolverSurplusTest(BaseTest):
                     f"Absolute difference: {float(a_abs_eth):.5f}ETH ({a_abs} atoms)",
                 ]
             )
-            ref_solver_log = "\t".join(
-                [
-                    f"Tx Hash: {competition_data['transactionHashes'][0]}",
-                    f"Order UID: {uid}",
-                    f"Solution providing more surplus: {ref_solver_response}",
-                ]
+            self.record_result(
+                competition_data["transactionHashes"][0],
+                {
+                    "absolute_difference_eth": float(a_abs_eth),
+                    "relative_deviation": float(a_rel),
+                },
+                key=uid,
+                solver=solution["solver"],
             )
 
             if (
@@ -96,7 +100,13 @@ class ReferenceSolverSurplusTest(BaseTest):
                 and a_rel > SURPLUS_REL_DEVIATION
             ):
                 self.logger.info(log_output)
-                self.logger.info(ref_solver_log)
+                # the solution is large, it is only formatted if the message is logged
+                self.logger.info(
+                    "Tx Hash: %s\tOrder UID: %s\tSolution providing more surplus: %s",
+                    competition_data["transactionHashes"][0],
+                    uid,
+                    ref_solver_response,
+                )
             elif (
                 a_abs_eth > SURPLUS_ABSOLUTE_DEVIATION_ETH / 10
                 and a_rel > SURPLUS_REL_DEVIATION / 10
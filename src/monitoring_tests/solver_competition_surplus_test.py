@@ -2,8 +2,7 @@
 Comparing order surplus accross different solutions.
 """
 
-# pylint: disable=logging-fstring-interpolation
-
+import logging
 from typing import Any
 from fractions import Fraction
 from src.monitoring_tests.base_test import BaseTest
@@ -18,11 +17,12 @@ class SolverCompetitionSurplusTest(BaseTest):
     the different executions of these orders by other solvers in the competition.
     """
 
-    def __init__(self, orderbook_api: OrderbookAPI) -> None:
-        super().__init__()
+    def __init__(self, orderbook_api: OrderbookAPI, *, chain_name: str = "") -> None:
+        super().__init__(chain_name=chain_name)
         self.orderbook_api = orderbook_api
 
     def compare_orders_surplus(self, competition_data: dict[str, Any]) -> bool:
+        # pylint: disable=too-many-locals
         """
         This function goes through each order that the winning solution executed
         and finds non-winning solutions that executed the same order and
@@ -55,6 +55,31 @@ class SolverCompetitionSurplusTest(BaseTest):
                 a_abs_eth = a_abs * token_to_eth
                 a_rel = trade_alt.compare_price(trade)
 
+                is_alert = (
+                    a_abs_eth > SURPLUS_ABSOLUTE_DEVIATION_ETH
+                    and a_rel > SURPLUS_REL_DEVIATION
+                )
+                self.record_result(
+                    competition_data["transactionHashes"][0],
+                    {
+                        "absolute_difference_eth": float(a_abs_eth),
+                        "relative_deviation": float(a_rel),
+                    },
+                    key=f"{uid}:{solver_alt}",
+                    solver=solution["solver"],
+                    alert=is_alert,
+                )
+                if (
+                    a_abs_eth > SURPLUS_ABSOLUTE_DEVIATION_ETH / 100
+                    and a_rel > SURPLUS_REL_DEVIATION / 10
+                ):
+                    level = logging.INFO
+                else:
+                    level = logging.DEBUG
+                # most comparisons are only logged at debug level, skip formatting them
+                if not is_alert and not self.logger.isEnabledFor(level):
+                    continue
+
                 log_output = "\t".join(
                     [
                         "Solver competition surplus test:",
@@ -66,19 +91,17 @@ class SolverCompetitionSurplusTest(BaseTest):
                         f"Absolute difference: {float(a_abs_eth):.5f}ETH ({a_abs} atoms)",
                     ]
                 )
-
-                if (
-                    a_abs_eth > SURPLUS_ABSOLUTE_DEVIATION_ETH
-                    and a_rel > SURPLUS_REL_DEVIATION
-                ):
-                    self.alert(log_output)
-                elif (
-                    a_abs_eth > SURPLUS_ABSOLUTE_DEVIATION_ETH / 100
-                    and a_rel > SURPLUS_REL_DEVIATION / 10
-                ):
-                    self.logger.info(log_output)
+                if is_alert:
+                    self.alert(
+                        log_output,
+                        key=(
+                            solution["solver"],
+                            trade.data.sell_token.lower(),
+                            trade.data.buy_token.lower(),
+                        ),
+                    )
                 else:
-                    self.logger.debug(log_output)
+                    self.logger.log(level, log_output)
 
         return True
 
@@ -18,8 +18,8 @@ class UniformDirectedPricesTest(BaseTest):
     as introduced in CIP-38, is satisfied.
     """
 
-    def __init__(self, orderbook_api: OrderbookAPI) -> None:
-        super().__init__()
+    def __init__(self, orderbook_api: OrderbookAPI, *, chain_name: str = "") -> None:
+        super().__init__(chain_name=chain_name)
         self.orderbook_api = orderbook_api
 
     def check_udp(self, competition_data: dict[str, Any]) -> bool:
@@ -61,8 +61,16 @@ class UniformDirectedPricesTest(BaseTest):
                     f"Directional prices: {[float(p) for p in prices_list]}",
                 ]
             )
-            if max_rate > min_rate * (1 + UDP_SENSITIVITY_THRESHOLD):
-                self.alert(log_output)
+            is_alert = max_rate > min_rate * (1 + UDP_SENSITIVITY_THRESHOLD)
+            self.record_result(
+                competition_data["transactionHashes"][0],
+                {"gap": float(max_rate / min_rate)},
+                key=":".join(pair),
+                solver=solution["solver"],
+                alert=is_alert,
+            )
+            if is_alert:
+                self.alert(log_output, key=(solution["solver"], *pair))
             elif max_rate > min_rate * (1 + UDP_SENSITIVITY_THRESHOLD / 10):
                 self.logger.info(log_output)
 
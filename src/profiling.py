@@ -0,0 +1,226 @@
+"""
+Opt-in profiling of test runs.
+
+If the environment variable PROFILING_DIR is set, every run of a test on a settlement is traced.
+Code paths mark stages with `stage`: fetching data from APIs, decoding calldata, computing, and
+alerting. For every stage, wall time, CPU time, the number of HTTP requests, and the bytes sent
+and received are recorded. Time of a run which is not spent in any stage is attributed to
+compute. The trace of each run is written to PROFILING_DIR as a file in the Chrome trace event
+format, which can be opened in chrome://tracing, Perfetto, or speedscope.
+
+If profiling is disabled, stages only cost a lookup of a thread local.
+"""
+
+from __future__ import annotations
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Optional
+from requests import PreparedRequest, Response
+
+# stages of a test run
+FETCH = "fetch"
+DECODE = "decode"
+COMPUTE = "compute"
+ALERT = "alert"
+
+
+@dataclass
+class StageTotals:
+    """Class for the totals of all top level events of one stage in a trace."""
+
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    http_requests: int = 0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+
+
+@dataclass
+class Trace:
+    """
+    Class for the trace of one test run. Events are stored in the Chrome trace event format, with
+    timestamps in microseconds.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    name: str
+    start: float = field(default_factory=time.perf_counter)
+    cpu_start: float = field(default_factory=time.thread_time)
+    events: list[dict[str, Any]] = field(default_factory=list)
+    totals: dict[str, StageTotals] = field(default_factory=dict)
+    depth: int = 0
+    http_requests: int = 0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+
+    def counters(self) -> tuple[int, int, int]:
+        """Current values of the HTTP counters."""
+        return self.http_requests, self.bytes_sent, self.bytes_received
+
+    def add_event(
+        self,
+        *,
+        category: str,
+        name: str,
+        start: float,
+        cpu_start: float,
+        counters: tuple[int, int, int],
+        args: dict[str, Any],
+    ) -> None:
+        """Add a complete event which started at start, with the given counters at its start."""
+        wall_time = time.perf_counter() - start
+        cpu_time = time.thread_time() - cpu_start
+        http_requests, bytes_sent, bytes_received = (
+            now - before for now, before in zip(self.counters(), counters)
+        )
+        self.events.append(
+            {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": (start - self.start) * 1e6,
+                "dur": wall_time * 1e6,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": {
+                    **args,
+                    "cpu_time_ms": cpu_time * 1e3,
+                    "http_requests": http_requests,
+                    "bytes_sent": bytes_sent,
+                    "bytes_received": bytes_received,
+                },
+            }
+        )
+        # nested events are already included in the totals of the enclosing event
+        if self.depth == 0:
+            totals = self.totals.setdefault(category, StageTotals())
+            totals.wall_time += wall_time
+            totals.cpu_time += cpu_time
+            totals.http_requests += http_requests
+            totals.bytes_sent += bytes_sent
+            totals.bytes_received += bytes_received
+
+    def summary(self) -> dict[str, dict[str, Any]]:
+        """
+        Totals per stage. Time which is not spent in any other stage is attributed to compute.
+        """
+        wall_time = time.perf_counter() - self.start
+        cpu_time = time.thread_time() - self.cpu_start
+        compute = self.totals.setdefault(COMPUTE, StageTotals())
+        compute.wall_time += wall_time - sum(t.wall_time for t in self.totals.values())
+        compute.cpu_time += cpu_time - sum(t.cpu_time for t in self.totals.values())
+        return {
+            category: {
+                "wall_time_ms": totals.wall_time * 1e3,
+                "cpu_time_ms": totals.cpu_time * 1e3,
+                "http_requests": totals.http_requests,
+                "bytes_sent": totals.bytes_sent,
+                "bytes_received": totals.bytes_received,
+            }
+            for category, totals in self.totals.items()
+        }
+
+
+local = threading.local()
+
+
+def get_profiling_dir() -> Optional[str]:
+    """Directory for traces, or None if profiling is disabled."""
+    return os.getenv("PROFILING_DIR") or None
+
+
+def current_trace() -> Optional[Trace]:
+    """Trace of the test run on the current thread, if profiling is enabled."""
+    trace: Optional[Trace] = getattr(local, "trace", None)
+    return trace
+
+
+@contextmanager
+def stage(category: str, name: Optional[str] = None, **args: Any) -> Iterator[None]:
+    """
+    Record the enclosed code as event of a stage, e.g. `with stage(FETCH, "get_receipt")`.
+    Stages can be nested. Nothing is recorded if no test run is traced on the current thread.
+    """
+    trace = current_trace()
+    if trace is None:
+        yield
+        return
+    start, cpu_start, counters = (
+        time.perf_counter(),
+        time.thread_time(),
+        trace.counters(),
+    )
+    trace.depth += 1
+    try:
+        yield
+    finally:
+        trace.depth -= 1
+        trace.add_event(
+            category=category,
+            name=name or category,
+            start=start,
+            cpu_start=cpu_start,
+            counters=counters,
+            args=args,
+        )
+
+
+@contextmanager
+def profile(test_name: str, tx_hash: str, phase: str = "") -> Iterator[None]:
+    """
+    Trace a run of a test on a settlement and write the trace to PROFILING_DIR. If a run is split
+    into phases, e.g. fetching and reporting of CPU bound tests, every phase is traced
+    separately. Does nothing if profiling is disabled.
+    """
+    profiling_dir = get_profiling_dir()
+    if profiling_dir is None:
+        yield
+        return
+    name = " ".join(filter(None, (test_name, tx_hash, phase)))
+    trace = Trace(name)
+    local.trace = trace
+    try:
+        yield
+    finally:
+        local.trace = None
+        file_name = "_".join(filter(None, (test_name, tx_hash, phase)))
+        write_trace(trace, os.path.join(profiling_dir, f"{file_name}.json"))
+
+
+def write_trace(trace: Trace, path: str) -> None:
+    """
+    Write a trace in the Chrome trace event format. The run itself is the root event, with the
+    totals per stage as arguments.
+    """
+    root = {
+        "name": trace.name,
+        "cat": "run",
+        "ph": "X",
+        "ts": 0.0,
+        "dur": (time.perf_counter() - trace.start) * 1e6,
+        "pid": os.getpid(),
+        "tid": threading.get_ident(),
+        "args": trace.summary(),
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump({"traceEvents": [root, *trace.events], "displayTimeUnit": "ms"}, file)
+
+
+def record_http_request(request: PreparedRequest, response: Response) -> None:
+    """
+    Count an HTTP request and its payload sizes for the trace on the current thread. Called for
+    all requests of the process wide session, see MonitoredHTTPAdapter.
+    """
+    trace = current_trace()
+    if trace is None:
+        return
+    body = request.body or b""
+    trace.http_requests += 1
+    trace.bytes_sent += len(body.encode() if isinstance(body, str) else body)
+    trace.bytes_received += len(response.content or b"")
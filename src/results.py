@@ -0,0 +1,265 @@
+"""
+Structured store of test results.
+
+Tests record one row per chain, test, tx hash, and key, where the key is e.g. an order uid or a
+token pair, and is empty for results on the whole settlement. Rows contain the solver, whether an
+alert was raised, and all numeric values of the result. Rows are buffered and written to SQLite
+in batches. When a test is run again on a settlement, its previous rows are discarded, so that no
+stale keys remain.
+
+Optionally, new rows are exported periodically to Parquet files, with one directory per test and
+one column per value, for analysis with columnar tools. Every export appends one part per test
+with the rows recorded since the previous export. Rows recorded again appear again in a later
+part, so readers keep the last row per chain, tx hash, and key.
+
+The daemon stores results if the environment variable RESULTS_PATH is set. Parquet files are
+written to RESULTS_PARQUET_DIR if it is set, which requires pyarrow.
+"""
+
+from __future__ import annotations
+import atexit
+import importlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Optional
+from src.helper_functions import get_logger
+from src.constants import RESULTS_BATCH_SIZE, RESULTS_EXPORT_INTERVAL_IN_SEC
+
+
+@dataclass
+class Result:
+    """Result of a test on a settlement, an order, or a token pair of a settlement."""
+
+    # pylint: disable=too-many-instance-attributes
+
+    test: str
+    tx_hash: str
+    key: str
+    solver: str
+    alert: bool
+    values: dict[str, float]
+    recorded_at: float = field(default_factory=time.time)
+    chain: str = ""
+
+
+def result_from_row(row: tuple[Any, ...]) -> Result:
+    """
+    Result of a row with the columns test, tx_hash, key, solver, alert, result_values,
+    recorded_at, and chain.
+    """
+    test, tx_hash, key, solver, alert, values, recorded_at, chain = row
+    return Result(
+        test, tx_hash, key, solver, bool(alert), json.loads(values), recorded_at, chain
+    )
+
+
+def parquet_columns(results: list[Result]) -> dict[str, list[Any]]:
+    """Columns of results of one test for the Parquet export, with one column per value."""
+    columns: dict[str, list[Any]] = {
+        "chain": [result.chain for result in results],
+        "tx_hash": [result.tx_hash for result in results],
+        "key": [result.key for result in results],
+        "solver": [result.solver for result in results],
+        "alert": [result.alert for result in results],
+        "recorded_at": [result.recorded_at for result in results],
+    }
+    value_names = sorted({name for result in results for name in result.values})
+    for name in value_names:
+        columns[name] = [result.values.get(name) for result in results]
+    return columns
+
+
+class ResultsStore:
+    """
+    Store of results in a SQLite file. Rows are identified by chain, test, hash, and key, so
+    that recording a result again, e.g. when a settlement is processed again, replaces the row.
+    Rows of a run which records fewer keys are removed by discarding the previous run first.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = RESULTS_BATCH_SIZE,
+        parquet_dir: Optional[str] = None,
+        export_interval: float = RESULTS_EXPORT_INTERVAL_IN_SEC,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.parquet_dir = parquet_dir
+        self.export_interval = export_interval
+        self.clock = clock
+        self.logger = get_logger(type(self).__name__)
+        self.lock = threading.Lock()
+        self.buffer: list[Result] = []
+        # chain, test, and hash of runs whose stored rows are deleted on the next flush
+        self.discarded: set[tuple[str, str, str]] = set()
+        self.last_export = clock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS results (test TEXT, tx_hash TEXT, key TEXT, "
+            "solver TEXT, alert INTEGER, recorded_at REAL, result_values TEXT, "
+            "chain TEXT NOT NULL DEFAULT '', PRIMARY KEY (chain, test, tx_hash, key))"
+        )
+        columns = [
+            row[1] for row in self.connection.execute("PRAGMA table_info(results)")
+        ]
+        if "chain" not in columns:
+            # stores written before results were labelled by chain
+            self.connection.execute(
+                "ALTER TABLE results ADD COLUMN chain TEXT NOT NULL DEFAULT ''"
+            )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS results_by_time ON results (recorded_at)"
+        )
+        # time of the last row exported to a Parquet directory
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS exports (directory TEXT PRIMARY KEY, "
+            "recorded_at REAL)"
+        )
+        self.connection.commit()
+
+    def record(self, result: Result) -> None:
+        """Add a result. Results are written once batch_size results are buffered."""
+        with self.lock:
+            self.buffer.append(result)
+            full = len(self.buffer) >= self.batch_size
+        if full:
+            self.flush()
+
+    def discard(self, chain: str, test: str, tx_hash: str) -> None:
+        """
+        Discard all results of a test on a settlement, before the test is run on it again.
+        Results recorded afterwards are kept.
+        """
+        run = (chain, test, tx_hash)
+        with self.lock:
+            self.buffer = [
+                result
+                for result in self.buffer
+                if (result.chain, result.test, result.tx_hash) != run
+            ]
+            self.discarded.add(run)
+
+    def flush(self) -> None:
+        """Write all buffered results, and export to Parquet if the export is due."""
+        self.write_buffer()
+        if (
+            self.parquet_dir is not None
+            and self.clock() - self.last_export >= self.export_interval
+        ):
+            self.last_export = self.clock()
+            try:
+                self.export_parquet(self.parquet_dir)
+            except Exception as err:  # pylint: disable=W0718
+                self.logger.warning(
+                    "Exception of type %s while exporting results: %s", type(err), err
+                )
+
+    def write_buffer(self) -> None:
+        """Delete rows of discarded runs and write all buffered results."""
+        with self.lock:
+            buffer, self.buffer = self.buffer, []
+            discarded, self.discarded = self.discarded, set()
+            if discarded:
+                self.connection.executemany(
+                    "DELETE FROM results WHERE chain = ? AND test = ? AND tx_hash = ?",
+                    sorted(discarded),
+                )
+            if buffer:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO results (test, tx_hash, key, solver, alert, "
+                    "recorded_at, result_values, chain) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            result.test,
+                            result.tx_hash,
+                            result.key,
+                            result.solver,
+                            int(result.alert),
+                            result.recorded_at,
+                            json.dumps(result.values),
+                            result.chain,
+                        )
+                        for result in buffer
+                    ],
+                )
+            self.connection.commit()
+
+    def query(self, test: Optional[str] = None) -> list[Result]:
+        """All stored results, optionally of one test only."""
+        self.flush()
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT test, tx_hash, key, solver, alert, result_values, recorded_at, "
+                "chain FROM results WHERE ? IS NULL OR test = ? ORDER BY recorded_at",
+                (test, test),
+            ).fetchall()
+        return [result_from_row(row) for row in rows]
+
+    def export_parquet(self, directory: str) -> list[str]:
+        """
+        Write the results recorded since the previous export to directory, as one new Parquet
+        part per test in the subdirectory of the test, with one column per value. Returns the
+        paths of the new parts.
+        """
+        pyarrow = importlib.import_module("pyarrow")
+        parquet = importlib.import_module("pyarrow.parquet")
+        self.write_buffer()
+        with self.lock:
+            exported = self.connection.execute(
+                "SELECT recorded_at FROM exports WHERE directory = ?", (directory,)
+            ).fetchone()
+            rows = self.connection.execute(
+                "SELECT test, tx_hash, key, solver, alert, result_values, recorded_at, "
+                "chain FROM results WHERE recorded_at > ? ORDER BY recorded_at",
+                (exported[0] if exported else float("-inf"),),
+            ).fetchall()
+        if not rows:
+            return []
+        results_by_test: dict[str, list[Result]] = {}
+        for row in rows:
+            result = result_from_row(row)
+            results_by_test.setdefault(result.test, []).append(result)
+
+        # parts are named by the time of their last row, which increases with every export
+        until = rows[-1][6]
+        paths = []
+        for test, results in results_by_test.items():
+            os.makedirs(os.path.join(directory, test), exist_ok=True)
+            path = os.path.join(directory, test, f"part-{round(until * 1e6)}.parquet")
+            parquet.write_table(pyarrow.table(parquet_columns(results)), path)
+            paths.append(path)
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO exports VALUES (?, ?)", (directory, until)
+            )
+            self.connection.commit()
+        return paths
+
+    def close(self) -> None:
+        """Write all buffered results and close the file."""
+        self.flush()
+        with self.lock:
+            self.connection.close()
+
+
+@lru_cache(maxsize=1)
+def get_results_store() -> Optional[ResultsStore]:
+    """
+    Get the process wide results store. It is created on first use if RESULTS_PATH is set, and
+    None is returned otherwise.
+    """
+    path = os.getenv("RESULTS_PATH")
+    if not path:
+        return None
+    store = ResultsStore(path, parquet_dir=os.getenv("RESULTS_PARQUET_DIR") or None)
+    atexit.register(store.close)
+    return store
@@ -0,0 +1,370 @@
+"""
+Fast decoding of calldata of the settle function of the settlement contract.
+
+The decoder is compiled once at import from the settle ABI in contracts/gpv2_settlement.py. It
+reads ABI words directly from the calldata and builds typed structures for trades and
+interactions, without going through the generic web3 decoder. Sections of the calldata are only
+decoded when they are accessed.
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass, fields
+from functools import cached_property, lru_cache
+from typing import Any, Callable, cast
+from eth_hash.auto import keccak
+from hexbytes import HexBytes
+from contracts.gpv2_settlement import gpv2_settlement
+from src.profiling import DECODE, stage
+
+# bits of the flags of a trade, see GPv2Trade.extractFlags
+BUY_ORDER_FLAG = 0x01
+PARTIALLY_FILLABLE_FLAG = 0x02
+
+
+@dataclass
+class SettlementTrade:
+    """
+    Class for a trade as encoded in the calldata of a settlement (GPv2Trade.Data).
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    sell_token_index: int
+    buy_token_index: int
+    receiver: str
+    sell_amount: int
+    buy_amount: int
+    valid_to: int
+    app_data: bytes
+    fee_amount: int
+    flags: int
+    executed_amount: int
+    signature: bytes
+
+    @property
+    def is_sell_order(self) -> bool:
+        """Check if the order of the trade is a sell order."""
+        return not self.flags & BUY_ORDER_FLAG
+
+    @property
+    def is_partially_fillable(self) -> bool:
+        """Check if the order of the trade is partially fillable."""
+        return bool(self.flags & PARTIALLY_FILLABLE_FLAG)
+
+
+@dataclass
+class Interaction:
+    """
+    Class for an interaction as encoded in the calldata of a settlement (GPv2Interaction.Data).
+    """
+
+    target: str
+    value: int
+    call_data: bytes
+
+
+# decoders are called with calldata, the start of the enclosing frame, and the position of the
+# head of the value
+Decoder = Callable[[bytes, int, int], Any]
+
+STRUCTS: dict[str, Callable[..., Any]] = {
+    "struct GPv2Trade.Data": SettlementTrade,
+    "struct GPv2Interaction.Data": Interaction,
+}
+
+
+def make_tuple(*args: Any) -> tuple[Any, ...]:
+    """Fallback constructor for tuples which do not correspond to a known struct."""
+    return args
+
+
+def read_word(data: bytes, position: int) -> int:
+    """Read the ABI word at position as unsigned integer."""
+    return int.from_bytes(data[position : position + 32], "big")
+
+
+@lru_cache(maxsize=4096)
+def checksum_address(address: bytes) -> str:
+    """Convert 20 address bytes to a checksummed address. Addresses repeat a lot across
+    settlements, so results are cached."""
+    # eth_utils is slow to import and only needed once settlements are decoded
+    from eth_utils.address import (  # pylint: disable=import-outside-toplevel
+        to_checksum_address,
+    )
+
+    return to_checksum_address(address)
+
+
+def decode_address(data: bytes, _: int, head: int) -> str:
+    """Decode a static address value."""
+    return checksum_address(data[head + 12 : head + 32])
+
+
+def decode_uint(data: bytes, _: int, head: int) -> int:
+    """Decode a static unsigned integer value."""
+    return read_word(data, head)
+
+
+def decode_bytes32(data: bytes, _: int, head: int) -> bytes:
+    """Decode a static bytes32 value."""
+    return data[head : head + 32]
+
+
+def decode_bytes(data: bytes, frame: int, head: int) -> bytes:
+    """Decode a dynamic bytes value."""
+    position = frame + read_word(data, head)
+    length = read_word(data, position)
+    return data[position + 32 : position + 32 + length]
+
+
+def compile_decoder(abi_input: dict[str, Any]) -> tuple[Decoder, int, bool]:
+    """Compile a decoder for an ABI input.
+    Returns the decoder, the size of the head of the encoded value in bytes, and whether the
+    value is dynamically encoded. Only the types used by the settle function are supported.
+    """
+    abi_type: str = abi_input["type"]
+    if abi_type.endswith("]"):
+        return compile_array_decoder(abi_input)
+    if abi_type == "tuple":
+        return compile_tuple_decoder(abi_input)
+    if abi_type == "address":
+        return decode_address, 32, False
+    if abi_type.startswith("uint"):
+        return decode_uint, 32, False
+    if abi_type == "bytes32":
+        return decode_bytes32, 32, False
+    if abi_type == "bytes":
+        return decode_bytes, 32, True
+    raise NotImplementedError(f"Decoding of type {abi_type} is not supported.")
+
+
+def compile_array_decoder(abi_input: dict[str, Any]) -> tuple[Decoder, int, bool]:
+    """Compile a decoder for dynamic (T[]) and fixed size (T[k]) arrays."""
+    length = abi_input["type"][:-1].rpartition("[")[2]
+    element_decoder, element_size, element_dynamic = compile_decoder(
+        element_abi(abi_input)
+    )
+
+    if length == "":
+
+        def decode_dynamic_array(data: bytes, frame: int, head: int) -> list[Any]:
+            position = frame + read_word(data, head)
+            start = position + 32
+            return [
+                element_decoder(data, start, start + i * element_size)
+                for i in range(read_word(data, position))
+            ]
+
+        return decode_dynamic_array, 32, True
+
+    size = int(length)
+    if element_dynamic:
+
+        def decode_fixed_array(data: bytes, frame: int, head: int) -> list[Any]:
+            start = frame + read_word(data, head)
+            return [
+                element_decoder(data, start, start + i * element_size)
+                for i in range(size)
+            ]
+
+        return decode_fixed_array, 32, True
+
+    def decode_static_array(data: bytes, frame: int, head: int) -> list[Any]:
+        return [
+            element_decoder(data, frame, head + i * element_size) for i in range(size)
+        ]
+
+    return decode_static_array, size * element_size, False
+
+
+def element_abi(abi_input: dict[str, Any]) -> dict[str, Any]:
+    """ABI of the elements of an array input."""
+    return {
+        **abi_input,
+        "type": abi_input["type"].rpartition("[")[0],
+        "internalType": abi_input.get("internalType", "").rpartition("[")[0],
+    }
+
+
+def compile_tuple_decoder(abi_input: dict[str, Any]) -> tuple[Decoder, int, bool]:
+    """Compile a decoder for a tuple. Known structs are decoded into their dataclasses."""
+    construct: Callable[..., Any] = STRUCTS.get(
+        abi_input.get("internalType", ""), make_tuple
+    )
+    if isinstance(construct, type):
+        check_struct_fields(construct, abi_input["components"])
+    component_decoders: list[tuple[Decoder, int]] = []
+    offset = 0
+    dynamic = False
+    for component in abi_input["components"]:
+        component_decoder, component_size, component_dynamic = compile_decoder(
+            component
+        )
+        component_decoders.append((component_decoder, offset))
+        offset += component_size
+        dynamic = dynamic or component_dynamic
+
+    if dynamic:
+
+        def decode_dynamic_tuple(data: bytes, frame: int, head: int) -> Any:
+            start = frame + read_word(data, head)
+            return construct(
+                *(
+                    component_decoder(data, start, start + component_offset)
+                    for component_decoder, component_offset in component_decoders
+                )
+            )
+
+        return decode_dynamic_tuple, 32, True
+
+    def decode_static_tuple(data: bytes, frame: int, head: int) -> Any:
+        return construct(
+            *(
+                component_decoder(data, frame, head + component_offset)
+                for component_decoder, component_offset in component_decoders
+            )
+        )
+
+    return decode_static_tuple, offset, False
+
+
+def check_struct_fields(struct: type, components: list[dict[str, Any]]) -> None:
+    """Check that the fields of a dataclass correspond to the components of a struct."""
+    field_names = [field.name.replace("_", "") for field in fields(struct)]
+    component_names = [component["name"].lower() for component in components]
+    if field_names != component_names:
+        raise ValueError(
+            f"Fields of {struct.__name__} do not match struct components {component_names}."
+        )
+
+
+def get_function_abi(name: str) -> dict[str, Any]:
+    """Get the ABI of a function of the settlement contract."""
+    abi = cast(list[dict[str, Any]], gpv2_settlement)
+    (function_abi,) = [
+        entry for entry in abi if entry["type"] == "function" and entry["name"] == name
+    ]
+    return function_abi
+
+
+def compile_function(
+    function_abi: dict[str, Any],
+) -> tuple[bytes, dict[str, tuple[Decoder, int]]]:
+    """Compile decoders for all inputs of a function.
+    Returns the function selector and a dict mapping input names to decoders and the positions
+    of their heads in the calldata.
+    """
+    inputs = function_abi["inputs"]
+    signature = f"{function_abi['name']}({','.join(canonical_type(i) for i in inputs)})"
+    decoders: dict[str, tuple[Decoder, int]] = {}
+    head = 4
+    for abi_input in inputs:
+        decoder, size, _ = compile_decoder(abi_input)
+        decoders[abi_input["name"]] = (decoder, head)
+        head += size
+    return keccak(signature.encode())[:4], decoders
+
+
+def canonical_type(abi_input: dict[str, Any]) -> str:
+    """Canonical type of an ABI input as used in function signatures."""
+    if abi_input["type"].startswith("tuple"):
+        components = ",".join(canonical_type(c) for c in abi_input["components"])
+        return f"({components}){abi_input['type'][len('tuple'):]}"
+    return str(abi_input["type"])
+
+
+SETTLE_ABI = get_function_abi("settle")
+SETTLE_SELECTOR, SETTLE_DECODERS = compile_function(SETTLE_ABI)
+# decoder for the interactions of one phase, i.e. one entry of the interactions input
+INTERACTIONS_PHASE_DECODER = compile_decoder(
+    element_abi(next(i for i in SETTLE_ABI["inputs"] if i["name"] == "interactions"))
+)[0]
+
+
+class Settlement:
+    """
+    View of a decoded settlement.
+    Each section of the calldata (tokens, clearing prices, trades, and the pre-, intra-, and
+    post-interactions) is decoded when it is accessed for the first time. Consumers only pay for
+    decoding the sections they use.
+    """
+
+    def __init__(self, calldata: bytes) -> None:
+        if calldata[:4] != SETTLE_SELECTOR:
+            raise ValueError(
+                f"Calldata does not call settle: selector 0x{calldata[:4].hex()}."
+            )
+        self.calldata = calldata
+
+    def decode_input(self, name: str) -> Any:
+        """Decode one input of the settle function from the calldata."""
+        decoder, head = SETTLE_DECODERS[name]
+        with stage(DECODE, name):
+            return decoder(self.calldata, 4, head)
+
+    def decode_interactions(self, phase: int) -> list[Interaction]:
+        """Decode the interactions of one phase (0: pre, 1: intra, 2: post) from the calldata."""
+        _, head = SETTLE_DECODERS["interactions"]
+        start = 4 + read_word(self.calldata, head)
+        with stage(DECODE, f"interactions[{phase}]"):
+            interactions: list[Interaction] = INTERACTIONS_PHASE_DECODER(
+                self.calldata, start, start + 32 * phase
+            )
+        return interactions
+
+    @cached_property
+    def tokens(self) -> list[str]:
+        """Tokens traded in the settlement."""
+        tokens: list[str] = self.decode_input("tokens")
+        return tokens
+
+    @cached_property
+    def clearing_prices(self) -> list[int]:
+        """Clearing prices of the tokens of the settlement."""
+        clearing_prices: list[int] = self.decode_input("clearingPrices")
+        return clearing_prices
+
+    @cached_property
+    def trades(self) -> list[SettlementTrade]:
+        """Trades of the settlement."""
+        trades: list[SettlementTrade] = self.decode_input("trades")
+        return trades
+
+    @cached_property
+    def ucp_indices(self) -> dict[str, int]:
+        """Map from tokens to the index of their uniform clearing price.
+        If a token appears multiple times in the token list, the first occurrence holds the
+        uniform clearing price.
+        """
+        ucp_indices: dict[str, int] = {}
+        for i, token in enumerate(self.tokens):
+            ucp_indices.setdefault(token, i)
+        return ucp_indices
+
+    @cached_property
+    def pre_interactions(self) -> list[Interaction]:
+        """Interactions executed before trades are settled."""
+        return self.decode_interactions(0)
+
+    @cached_property
+    def intra_interactions(self) -> list[Interaction]:
+        """Interactions executed after sell amounts are transferred in."""
+        return self.decode_interactions(1)
+
+    @cached_property
+    def post_interactions(self) -> list[Interaction]:
+        """Interactions executed after buy amounts are transferred out."""
+        return self.decode_interactions(2)
+
+    @property
+    def interactions(self) -> list[list[Interaction]]:
+        """Pre-, intra-, and post-interactions of the settlement."""
+        return [self.pre_interactions, self.intra_interactions, self.post_interactions]
+
+
+def decode_settlement(calldata: str | bytes) -> Settlement:
+    """
+    Decode settlement from the calldata of a call to the settle function. The calldata can be
+    given as hex string or bytes.
+    """
+    return Settlement(bytes(HexBytes(calldata)))
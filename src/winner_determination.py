@@ -0,0 +1,149 @@
+"""
+Winner determination for combinatorial auctions.
+
+Solutions touch a set of token pairs and provide some surplus. The surplus maximizing set of
+winners is a set of solutions with pairwise disjoint token pairs and maximal total surplus,
+i.e. a maximum weight set packing. It is found with branch and bound: solutions are branched on
+in order of decreasing surplus, starting from the greedy packing, and branches are pruned if an
+upper bound on their surplus does not exceed the best packing found so far. The bound assigns
+every free token pair the largest share of surplus per token pair of the remaining solutions
+touching it.
+
+Set packing is NP-hard, so the search stops after a time budget and returns the best packing
+found until then, which is marked as not optimal.
+"""
+
+from __future__ import annotations
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Collection, Sequence
+from src.constants import WINNER_DETERMINATION_TIME_BUDGET_IN_SEC
+
+
+@dataclass
+class Packing:
+    """Winning solutions, their total surplus, and whether the packing is proven optimal."""
+
+    solutions: list[int] = field(default_factory=list)
+    surplus: float = 0.0
+    optimal: bool = True
+    # number of nodes of the search tree
+    nodes: int = 0
+
+
+@dataclass
+class Candidate:
+    """A solution in the search, with its token pairs as bit mask."""
+
+    index: int
+    mask: int
+    surplus: float
+    token_pairs: list[int]
+
+    @property
+    def share(self) -> float:
+        """Surplus per token pair."""
+        return self.surplus / len(self.token_pairs)
+
+
+class SetPackingSolver:
+    """Branch and bound search for a maximum weight set packing, see the module docstring."""
+
+    def __init__(
+        self,
+        candidates: list[Candidate],
+        time_budget: float,
+        clock: Callable[[], float],
+    ) -> None:
+        # branching on large solutions first finds good packings early
+        self.candidates = sorted(
+            candidates, key=lambda candidate: (-candidate.surplus, candidate.index)
+        )
+        self.clock = clock
+        self.deadline = clock() + time_budget
+        self.best = self.greedy()
+        self.chosen: list[Candidate] = []
+
+    def greedy(self) -> Packing:
+        """Packing of solutions chosen in order of decreasing surplus if they fit."""
+        packing = Packing()
+        used = 0
+        for candidate in self.candidates:
+            if candidate.mask & used == 0:
+                used |= candidate.mask
+                packing.solutions.append(candidate.index)
+                packing.surplus += candidate.surplus
+        return packing
+
+    def upper_bound(self, start: int, used: int) -> float:
+        """
+        Upper bound on the surplus of packing the candidates from start on into the token pairs
+        which are not used.
+        """
+        shares: dict[int, float] = {}
+        total = 0.0
+        for candidate in self.candidates[start:]:
+            if candidate.mask & used:
+                continue
+            total += candidate.surplus
+            share = candidate.share
+            for token_pair in candidate.token_pairs:
+                if share > shares.get(token_pair, 0.0):
+                    shares[token_pair] = share
+        return min(total, sum(shares.values()))
+
+    def search(self, start: int, used: int, surplus: float) -> None:
+        """Extend the chosen candidates by candidates from start on."""
+        self.best.nodes += 1
+        if surplus > self.best.surplus:
+            self.best.solutions = [candidate.index for candidate in self.chosen]
+            self.best.surplus = surplus
+        if self.clock() > self.deadline:
+            self.best.optimal = False
+            return
+        for position in range(start, len(self.candidates)):
+            candidate = self.candidates[position]
+            if candidate.mask & used:
+                continue
+            # the bound only decreases with position, so later candidates are pruned as well
+            if surplus + self.upper_bound(position, used) <= self.best.surplus:
+                return
+            self.chosen.append(candidate)
+            self.search(
+                position + 1, used | candidate.mask, surplus + candidate.surplus
+            )
+            self.chosen.pop()
+            if not self.best.optimal:
+                return
+
+    def solve(self) -> Packing:
+        """Search for the best packing."""
+        self.search(0, 0, 0.0)
+        return self.best
+
+
+def pack_solutions(
+    token_pairs: Sequence[Collection[int]],
+    surplus: Sequence[float],
+    time_budget: float = WINNER_DETERMINATION_TIME_BUDGET_IN_SEC,
+    clock: Callable[[], float] = time.perf_counter,
+) -> Packing:
+    """
+    Find the set of solutions with disjoint token pairs and maximal total surplus. Solution i
+    touches token_pairs[i] and provides surplus[i]. Token pairs are bit positions of a mask, so
+    they should be numbered from 0. Solutions without positive surplus or without token pairs
+    never win. The search stops after time_budget seconds.
+    """
+    candidates = [
+        Candidate(
+            index,
+            sum(1 << token_pair for token_pair in set(pairs)),
+            solution_surplus,
+            sorted(set(pairs)),
+        )
+        for index, (pairs, solution_surplus) in enumerate(zip(token_pairs, surplus))
+        if solution_surplus > 0 and pairs
+    ]
+    packing = SetPackingSolver(candidates, time_budget, clock).solve()
+    packing.solutions.sort()
+    return packing
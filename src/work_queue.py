@@ -0,0 +1,325 @@
+"""
+Work queue for sharding settlement processing across worker processes and hosts.
+
+In coordinator mode, the daemon ingests the settlements of all chains and publishes one task per
+settlement. Workers lease tasks, run all tests of the chain of a task, and write the result of
+every test. Tasks are assigned to live workers by consistent hashing on the tx hash, so that a
+joining or leaving worker only moves a small share of tasks. The ring position of every task is
+stored with it, so that the tasks of a worker are selected by the ranges of the ring it owns.
+
+Delivery is at least once: a lease expires if its worker does not finish the task in time, and
+the task is leased again. Results are keyed by hash and test, writing them is idempotent, and
+tests which already succeeded for a hash are not run again. Completed tasks and results are kept
+for WORK_QUEUE_RETENTION_IN_SEC, so that publishing a settlement again within that time does not
+run its tests again, and are deleted afterwards.
+
+WorkQueue is the interface of queue backends. SQLiteWorkQueue stores the queue in a SQLite file,
+which can be shared by processes on one host.
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect
+from dataclasses import asdict, dataclass
+from typing import Callable, Optional
+from src.models import SettlementEvent, TradeEvent
+from src.constants import (
+    HASH_RING_VIRTUAL_NODES,
+    WORK_QUEUE_LEASE_IN_SEC,
+    WORK_QUEUE_RETENTION_IN_SEC,
+    WORKER_HEARTBEAT_TIMEOUT_IN_SEC,
+)
+
+
+@dataclass
+class SettlementTask:
+    """Task of running all tests of a chain on one settlement."""
+
+    chain_name: str
+    settlement_event: SettlementEvent
+    attempts: int = 0
+
+    @property
+    def tx_hash(self) -> str:
+        """Hash of the settlement."""
+        return self.settlement_event.tx_hash
+
+
+def encode_settlement_event(settlement_event: SettlementEvent) -> str:
+    """Serialize a settlement event as JSON."""
+    return json.dumps(asdict(settlement_event))
+
+
+def decode_settlement_event(payload: str) -> SettlementEvent:
+    """Deserialize a settlement event from JSON."""
+    data = json.loads(payload)
+    data["trades"] = [TradeEvent(**trade) for trade in data["trades"]]
+    return SettlementEvent(**data)
+
+
+def ring_position(key: str) -> int:
+    """Position of a key on the hash ring. Positions have 63 bits, so that they fit into SQLite
+    integers."""
+    return int.from_bytes(hashlib.sha256(key.encode()).digest()[:8], "big") >> 1
+
+
+class HashRing:
+    """
+    Consistent hashing of keys to nodes. Every node is placed at several points of the ring,
+    and a key belongs to the node of the first point after the position of the key.
+    """
+
+    def __init__(
+        self, nodes: list[str], virtual_nodes: int = HASH_RING_VIRTUAL_NODES
+    ) -> None:
+        points = sorted(
+            (ring_position(f"{node}#{i}"), node)
+            for node in set(nodes)
+            for i in range(virtual_nodes)
+        )
+        self.positions = [position for position, _ in points]
+        self.nodes = [node for _, node in points]
+
+    def owner(self, key: str) -> Optional[str]:
+        """Node a key is assigned to, None if the ring is empty."""
+        if not self.nodes:
+            return None
+        index = bisect(self.positions, ring_position(key.lower()))
+        return self.nodes[index % len(self.nodes)]
+
+    def ranges(self, node: str) -> list[tuple[int, int]]:
+        """
+        Ranges [start, end) of ring positions of the keys assigned to a node. Adjacent ranges
+        are merged.
+        """
+        # keys from the previous point up to a point belong to the node of the point, keys from
+        # the last point on wrap around to the first point
+        bounds = [0] + self.positions + [1 << 63]
+        owners = self.nodes + self.nodes[:1]
+        ranges: list[tuple[int, int]] = []
+        for index, owner in enumerate(owners):
+            if owner != node:
+                continue
+            start = bounds[index]
+            if ranges and ranges[-1][1] == start:
+                start = ranges.pop()[0]
+            ranges.append((start, bounds[index + 1]))
+        return ranges
+
+
+class WorkQueue(ABC):
+    """Interface of work queue backends."""
+
+    @abstractmethod
+    def publish(self, tasks: list[SettlementTask]) -> None:
+        """Add tasks to the queue. Tasks of settlements already in the queue are ignored."""
+
+    @abstractmethod
+    def heartbeat(self, worker_id: str) -> None:
+        """Mark a worker as live, so that tasks are assigned to it."""
+
+    @abstractmethod
+    def lease(self, worker_id: str, max_tasks: int) -> list[SettlementTask]:
+        """
+        Lease up to max_tasks available tasks which are assigned to a worker. Leased tasks are
+        not available to other workers until the lease expires or the task is released.
+        """
+
+    @abstractmethod
+    def complete(self, task: SettlementTask) -> None:
+        """Mark a task as done."""
+
+    @abstractmethod
+    def release(self, task: SettlementTask, delay: float) -> None:
+        """Make a task available again after delay seconds."""
+
+    @abstractmethod
+    def write_result(self, tx_hash: str, test: str, success: bool) -> None:
+        """
+        Store the result of a test on a settlement. Writes are idempotent, and a success is not
+        overwritten by a failure of a repeated delivery.
+        """
+
+    @abstractmethod
+    def passed_tests(self, tx_hash: str) -> set[str]:
+        """Names of tests which succeeded on a settlement."""
+
+    @abstractmethod
+    def prune(self, retention: float = WORK_QUEUE_RETENTION_IN_SEC) -> None:
+        """Delete tasks completed and results written more than retention seconds ago."""
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """
+    Work queue stored in a SQLite file. Leases are taken in write transactions, so that
+    several processes can share the file.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        lease_duration: float = WORK_QUEUE_LEASE_IN_SEC,
+        heartbeat_timeout: float = WORKER_HEARTBEAT_TIMEOUT_IN_SEC,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = path
+        self.lease_duration = lease_duration
+        self.heartbeat_timeout = heartbeat_timeout
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (tx_hash TEXT PRIMARY KEY, chain TEXT,
+                payload TEXT, attempts INTEGER, owner TEXT, available_at REAL, done INTEGER,
+                position INTEGER);
+            CREATE INDEX IF NOT EXISTS available_tasks ON tasks (done, available_at);
+            CREATE TABLE IF NOT EXISTS workers (worker_id TEXT PRIMARY KEY, last_seen REAL);
+            CREATE TABLE IF NOT EXISTS results (tx_hash TEXT, test TEXT, success INTEGER,
+                updated_at REAL, PRIMARY KEY (tx_hash, test));
+            CREATE INDEX IF NOT EXISTS results_by_age ON results (updated_at);
+            """)
+        columns = {
+            row[1] for row in self.connection.execute("PRAGMA table_info(tasks)")
+        }
+        if "position" not in columns:
+            # queues written before ring positions were stored with tasks
+            self.connection.create_function(
+                "ring_position", 1, ring_position, deterministic=True
+            )
+            self.connection.executescript("""
+                ALTER TABLE tasks ADD COLUMN position INTEGER;
+                UPDATE tasks SET position = ring_position(lower(tx_hash));
+                """)
+
+    def publish(self, tasks: list[SettlementTask]) -> None:
+        now = self.clock()
+        with self.lock:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO tasks VALUES (?, ?, ?, 0, NULL, ?, 0, ?)",
+                [
+                    (
+                        task.tx_hash,
+                        task.chain_name,
+                        encode_settlement_event(task.settlement_event),
+                        now,
+                        ring_position(task.tx_hash.lower()),
+                    )
+                    for task in tasks
+                ],
+            )
+
+    def heartbeat(self, worker_id: str) -> None:
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO workers VALUES (?, ?)",
+                (worker_id, self.clock()),
+            )
+
+    def lease(self, worker_id: str, max_tasks: int) -> list[SettlementTask]:
+        now = self.clock()
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                workers = [
+                    row[0]
+                    for row in self.connection.execute(
+                        "SELECT worker_id FROM workers WHERE last_seen >= ?",
+                        (now - self.heartbeat_timeout,),
+                    )
+                ]
+                ranges = HashRing(workers).ranges(worker_id)
+                rows: list[tuple[str, str, int]] = []
+                if ranges:
+                    # bounds are inclusive, as the end of the ring does not fit into SQLite
+                    condition = " OR ".join(["position BETWEEN ? AND ?"] * len(ranges))
+                    bounds = [
+                        bound for start, end in ranges for bound in (start, end - 1)
+                    ]
+                    rows = self.connection.execute(
+                        "SELECT chain, payload, attempts FROM tasks "
+                        f"WHERE done = 0 AND available_at <= ? AND ({condition}) "
+                        "ORDER BY available_at LIMIT ?",
+                        (now, *bounds, max_tasks),
+                    ).fetchall()
+                tasks = [
+                    SettlementTask(
+                        chain, decode_settlement_event(payload), attempts + 1
+                    )
+                    for chain, payload, attempts in rows
+                ]
+                self.connection.executemany(
+                    "UPDATE tasks SET owner = ?, available_at = ?, attempts = ? "
+                    "WHERE tx_hash = ?",
+                    [
+                        (
+                            worker_id,
+                            now + self.lease_duration,
+                            task.attempts,
+                            task.tx_hash,
+                        )
+                        for task in tasks
+                    ],
+                )
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+        return tasks
+
+    def complete(self, task: SettlementTask) -> None:
+        with self.lock:
+            # available_at of completed tasks is the time of completion, see prune
+            self.connection.execute(
+                "UPDATE tasks SET done = 1, owner = NULL, available_at = ? "
+                "WHERE tx_hash = ?",
+                (self.clock(), task.tx_hash),
+            )
+
+    def release(self, task: SettlementTask, delay: float) -> None:
+        with self.lock:
+            self.connection.execute(
+                "UPDATE tasks SET owner = NULL, available_at = ? "
+                "WHERE tx_hash = ? AND done = 0",
+                (self.clock() + delay, task.tx_hash),
+            )
+
+    def write_result(self, tx_hash: str, test: str, success: bool) -> None:
+        with self.lock:
+            self.connection.execute(
+                "INSERT INTO results VALUES (?, ?, ?, ?) ON CONFLICT (tx_hash, test) "
+                "DO UPDATE SET success = max(success, excluded.success), "
+                "updated_at = excluded.updated_at",
+                (tx_hash, test, int(success), self.clock()),
+            )
+
+    def passed_tests(self, tx_hash: str) -> set[str]:
+        with self.lock:
+            return {
+                row[0]
+                for row in self.connection.execute(
+                    "SELECT test FROM results WHERE tx_hash = ? AND success = 1",
+                    (tx_hash,),
+                )
+            }
+
+    def prune(self, retention: float = WORK_QUEUE_RETENTION_IN_SEC) -> None:
+        cutoff = self.clock() - retention
+        with self.lock:
+            self.connection.execute(
+                "DELETE FROM tasks WHERE done = 1 AND available_at < ?", (cutoff,)
+            )
+            self.connection.execute(
+                "DELETE FROM results WHERE updated_at < ?", (cutoff,)
+            )
+
+    def close(self) -> None:
+        """Close the connection to the file."""
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,95 @@
+"""
+Benchmark of the batched evaluation of the combinatorial auction.
+
+Synthetic competitions are evaluated one by one with CombinatorialAuctionSurplusTest.evaluate
+and at once with src.combinatorial_batch.evaluate_batch. For every batch size, the median wall
+time of both and the number of competitions per second are written as JSON.
+
+Run from the root directory via
+    python3 -m tests.benchmarks.combinatorial_batch [--output FILE]
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import time
+from typing import Any, Callable
+from src.combinatorial_batch import evaluate_batch
+from src.monitoring_tests.combinatorial_auction_surplus_test import (
+    CombinatorialAuctionSurplusTest,
+)
+from tests.benchmarks.monitoring_tests import get_commit
+from tests.benchmarks.synthetic import generate_competition_payload
+
+BATCH_SIZES = [10, 100, 1000]
+NUM_SOLUTIONS = 10
+NUM_ORDERS = 20
+NUM_TOKENS = 10
+REPETITIONS = 5
+
+
+def time_median(function: Callable[[], Any]) -> float:
+    """Median wall time of calling function, in seconds."""
+    timings = []
+    for _ in range(REPETITIONS):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    """Time single and batched evaluation for all batch sizes and write results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--output", help="output file, results are printed if not set")
+    args = parser.parse_args()
+
+    results = []
+    for batch_size in BATCH_SIZES:
+        payloads = [
+            generate_competition_payload(NUM_SOLUTIONS, NUM_ORDERS, NUM_TOKENS, seed)
+            for seed in range(batch_size)
+        ]
+        single = time_median(
+            lambda payloads=payloads: [
+                CombinatorialAuctionSurplusTest.evaluate(payload)
+                for payload in payloads
+            ]
+        )
+        batch = time_median(lambda payloads=payloads: evaluate_batch(payloads))
+        results.append(
+            {
+                "batch_size": batch_size,
+                "single_ms": single * 1000,
+                "batch_ms": batch * 1000,
+                "single_competitions_per_sec": batch_size / single,
+                "batch_competitions_per_sec": batch_size / batch,
+                "speedup": single / batch,
+            }
+        )
+
+    output = json.dumps(
+        {
+            "commit": get_commit(),
+            "python": platform.python_version(),
+            "timestamp": int(time.time()),
+            "repetitions": REPETITIONS,
+            "competition": {
+                "solutions": NUM_SOLUTIONS,
+                "orders": NUM_ORDERS,
+                "tokens": NUM_TOKENS,
+            },
+            "results": results,
+        },
+        indent=2,
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+"""
+Fixtures for benchmarks of monitoring tests.
+
+A fixture is a JSON file with all data the monitoring tests fetch from APIs for a set of
+settlements: competition data, orders, transactions, receipts, auction instances, reference
+solutions, and chain data like balances and kickbacks.
+
+Fixtures can be recorded from the live APIs via
+    python3 -m tests.benchmarks.fixtures record <name> <tx_hash> [<tx_hash> ...]
+or generated synthetically via
+    python3 -m tests.benchmarks.fixtures generate
+"""
+
+import argparse
+import json
+import os
+import random
+from typing import Any
+from eth_abi.abi import encode
+from web3 import Web3
+from src.apis.auctioninstanceapi import AuctionInstanceAPI
+from src.apis.coingeckoapi import CoingeckoAPI
+from src.apis.orderbookapi import OrderbookAPI
+from src.apis.solverapi import SolverAPI
+from src.apis.tokenlistapi import TokenListAPI
+from src.apis.web3api import Web3API
+from src.constants import (
+    MEV_BLOCKER_KICKBACKS_ADDRESSES,
+    SETTLEMENT_CONTRACT_ADDRESS,
+    WETH_ADDRESS,
+)
+from src.monitoring_tests.cowamm_commitment_test import COWAMM_CONSTANT_PRODUCT_ADDRESS
+from tests.benchmarks.synthetic import (
+    encode_settle_calldata,
+    generate_settle_arguments,
+    random_address,
+)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+# number of orders per settlement of synthetic fixtures
+BATCH_SIZES = [1, 10, 50]
+# selector of commit(address,bytes32) of the CoW AMM constant product contract
+COWAMM_COMMIT_SELECTOR = bytes.fromhex("30f73c99")
+
+
+def empty_fixture() -> dict[str, Any]:
+    """Fixture without any data."""
+    return {
+        "tx_hashes": [],
+        "competitions": {},
+        "orders": {},
+        "transactions": {},
+        "receipts": {},
+        "auction_instances": {},
+        "reference_solutions": {},
+        "trade_events": {},
+        "native_prices": {},
+        "token_list": [],
+        "token_prices": {},
+        "balances": {},
+        "eth_transfers": {},
+        "current_block": 0,
+    }
+
+
+def generate_fixture(
+    batch_size: int,
+    num_settlements: int = 3,
+    num_solutions: int = 5,
+    seed: int = 0,
+    *,
+    block_number: int = 20000000,
+    max_blocks_between_settlements: int = 10,
+    liquidity_size: int = 0,
+) -> dict[str, Any]:
+    """Generate a synthetic fixture.
+    Every settlement executes batch_size orders. The competition of each settlement has
+    num_solutions solutions executing all orders with different surplus, with the winning
+    solution last, and one baseline solution per directed token pair. Settlements are spread
+    over blocks after block_number, and auction instances contain liquidity_size AMMs.
+    """
+    # pylint: disable=too-many-locals,too-many-statements
+    rng = random.Random(seed)
+    fixture = empty_fixture()
+    num_tokens = max(2, min(batch_size, 20))
+    for settlement_index in range(num_settlements):
+        tx_hash = "0x" + rng.randbytes(32).hex()
+        auction_id = block_number * 100 + settlement_index
+        block_number += rng.randint(
+            min(1, max_blocks_between_settlements), max_blocks_between_settlements
+        )
+        tokens, clearing_prices, trades, interactions = generate_settle_arguments(
+            num_tokens,
+            batch_size,
+            num_interactions=2,
+            interaction_size=100,
+            seed=rng.randint(0, 2**32),
+        )
+        interactions[0].append(
+            (
+                Web3.to_checksum_address(COWAMM_CONSTANT_PRODUCT_ADDRESS),
+                0,
+                COWAMM_COMMIT_SELECTOR
+                + encode(["address", "bytes32"], [random_address(rng), bytes(32)]),
+            )
+        )
+        calldata = encode_settle_calldata(
+            [tokens, clearing_prices, trades, interactions]
+        )
+        tokens = [token.lower() for token in tokens]
+        native_prices = {token: str(rng.randint(10**6, 10**30)) for token in tokens}
+        fixture["native_prices"].update(native_prices)
+
+        orders: list[dict[str, Any]] = []
+        for i, trade in enumerate(trades):
+            uid = "0x" + rng.randbytes(56).hex()
+            order = {
+                "uid": uid,
+                "sellToken": tokens[trade[0]],
+                "buyToken": tokens[trade[1]],
+                "sellAmount": str(trade[3]),
+                "buyAmount": str(trade[4]),
+                "feeAmount": str(trade[7]),
+                "kind": "buy" if i % 2 else "sell",
+                "partiallyFillable": i % 3 == 0,
+            }
+            fixture["orders"][uid] = order
+            orders.append(order)
+            fixture["reference_solutions"][uid] = {
+                "orders": {"0": execute_order(order, rng, reference=True)}
+            }
+
+        solutions = []
+        token_pairs = {(order["sellToken"], order["buyToken"]) for order in orders}
+        for sell_token, buy_token in sorted(token_pairs):
+            solutions.append(
+                generate_solution(
+                    "baseline",
+                    [
+                        order
+                        for order in orders
+                        if (order["sellToken"], order["buyToken"])
+                        == (sell_token, buy_token)
+                    ],
+                    tokens,
+                    rng,
+                )
+            )
+        for solver_index in range(num_solutions):
+            solutions.append(
+                generate_solution(f"solver{solver_index}", orders, tokens, rng)
+            )
+        solutions[-1]["callData"] = "0x" + calldata.hex()
+
+        fixture["tx_hashes"].append(tx_hash)
+        fixture["competitions"][tx_hash] = {
+            "auctionId": auction_id,
+            "transactionHash": tx_hash,
+            "transactionHashes": [tx_hash],
+            "auction": {"prices": native_prices},
+            "solutions": solutions,
+        }
+        fixture["trade_events"][tx_hash] = [
+            {
+                "owner": random_address(rng),
+                "sellToken": order["sellToken"],
+                "buyToken": order["buyToken"],
+                "sellAmount": execution["sellAmount"],
+                "buyAmount": execution["buyAmount"],
+                "feeAmount": "0",
+                "orderUid": order["uid"],
+            }
+            for order, execution in zip(orders, solutions[-1]["orders"])
+        ]
+        fixture["transactions"][tx_hash] = {
+            "hash": tx_hash,
+            "from": random_address(rng),
+            "blockNumber": block_number,
+            "transactionIndex": settlement_index,
+            "gasPrice": rng.randint(10**9, 10**11),
+            "input": "0x" + calldata.hex(),
+        }
+        gas_used = rng.randint(10**5, 2 * 10**6)
+        fixture["receipts"][tx_hash] = {
+            "gasUsed": gas_used,
+            "effectiveGasPrice": fixture["transactions"][tx_hash]["gasPrice"],
+        }
+        fixture["auction_instances"][str(auction_id)] = {
+            "metadata": {"auction_id": auction_id},
+            "orders": {
+                str(i): {
+                    "id": order["uid"],
+                    "sell_token": order["sellToken"],
+                    "buy_token": order["buyToken"],
+                    "sell_amount": order["sellAmount"],
+                    "buy_amount": order["buyAmount"],
+                    "fee": {"amount": order["feeAmount"]},
+                    "is_sell_order": order["kind"] == "sell",
+                    "allow_partial_fill": order["partiallyFillable"],
+                }
+                for i, order in enumerate(orders)
+            },
+            "amms": {str(i): generate_amm(tokens, rng) for i in range(liquidity_size)},
+        }
+        fixture["eth_transfers"][str(block_number)] = rng.random() / 100
+
+    fixture["token_list"] = list(fixture["native_prices"])
+    fixture["balances"] = {
+        token: rng.randint(0, 10**20) for token in fixture["native_prices"]
+    }
+    fixture["token_prices"] = {WETH_ADDRESS: 2000.0}
+    fixture["current_block"] = block_number
+    return fixture
+
+
+def execute_order(
+    order: dict[str, Any], rng: random.Random, reference: bool = False
+) -> dict[str, Any]:
+    """Random execution of an order close to its limit price. Executions in solutions of the
+    competition are in the format of the competition endpoint, reference executions in the
+    format of the solver API."""
+    sell_amount, buy_amount = int(order["sellAmount"]), int(order["buyAmount"])
+    surplus = 1 + rng.uniform(-0.001, 0.01)
+    if order["kind"] == "sell":
+        buy_amount = int(buy_amount * surplus)
+    else:
+        sell_amount = int(sell_amount / surplus)
+    if reference:
+        return {
+            "exec_sell_amount": str(sell_amount),
+            "exec_buy_amount": str(buy_amount),
+            "fee": {"amount": order["feeAmount"]},
+        }
+    return {
+        "id": order["uid"],
+        "sellAmount": str(sell_amount),
+        "buyAmount": str(buy_amount),
+    }
+
+
+def generate_amm(tokens: list[str], rng: random.Random) -> dict[str, Any]:
+    """Random constant product AMM between two tokens, in the format of auction instances."""
+    token_a, token_b = rng.sample(tokens, 2)
+    return {
+        "kind": "ConstantProduct",
+        "address": random_address(rng),
+        "reserves": {
+            token_a: str(rng.randint(10**18, 10**24)),
+            token_b: str(rng.randint(10**18, 10**24)),
+        },
+        "fee": "0.003",
+        "cost": {"amount": str(rng.randint(10**14, 10**15)), "token": WETH_ADDRESS},
+        "mandatory": False,
+    }
+
+
+def generate_solution(
+    solver: str, orders: list[dict[str, Any]], tokens: list[str], rng: random.Random
+) -> dict[str, Any]:
+    """Random solution executing orders, in the format of the competition endpoint."""
+    return {
+        "solver": solver,
+        "solverAddress": random_address(rng),
+        "score": str(rng.randint(10**15, 10**17)),
+        "objective": {"fees": str(rng.randint(10**14, 10**16))},
+        "clearingPrices": {token: str(rng.randint(10**15, 10**21)) for token in tokens},
+        "orders": [execute_order(order, rng) for order in orders],
+    }
+
+
+def record_fixture(tx_hashes: list[str], chain_name: str) -> dict[str, Any]:
+    """Record a fixture for a list of settlements from the live APIs."""
+    # pylint: disable=too-many-locals
+    web3_api = Web3API()
+    orderbook_api = OrderbookAPI(chain_name)
+    auction_instance_api = AuctionInstanceAPI()
+    solver_api = SolverAPI()
+    fixture = empty_fixture()
+    fixture["tx_hashes"] = tx_hashes
+    for tx_hash in tx_hashes:
+        transaction = web3_api.get_transaction(tx_hash)
+        receipt = web3_api.get_receipt(tx_hash)
+        competition_data = orderbook_api.get_solver_competition_data(tx_hash)
+        if transaction is None or receipt is None or competition_data is None:
+            raise ValueError(f"Could not record data for {tx_hash}.")
+        fixture["transactions"][tx_hash] = json.loads(Web3.to_json(transaction))
+        fixture["receipts"][tx_hash] = json.loads(Web3.to_json(receipt))
+        fixture["competitions"][tx_hash] = competition_data
+        for solution in competition_data["solutions"]:
+            for order in solution["orders"]:
+                if order["id"] not in fixture["orders"]:
+                    fixture["orders"][order["id"]] = orderbook_api.get_order_data(
+                        order["id"]
+                    )
+        auction_id = competition_data["auctionId"]
+        auction_instance = auction_instance_api.get_auction_instance(auction_id)
+        if auction_instance is not None:
+            fixture["auction_instances"][str(auction_id)] = auction_instance
+            for order in competition_data["solutions"][-1]["orders"]:
+                fixture["reference_solutions"][order["id"]] = solver_api.solve_instance(
+                    auction_instance_api.generate_reduced_single_order_auction_instance(
+                        order["id"], auction_instance
+                    )
+                )
+
+    block_numbers = [
+        int(transaction["blockNumber"])
+        for transaction in fixture["transactions"].values()
+    ]
+    eth_transfers = web3_api.get_eth_transfers_by_block(
+        min(block_numbers), max(block_numbers), MEV_BLOCKER_KICKBACKS_ADDRESSES
+    )
+    fixture["eth_transfers"] = {
+        str(block): value for block, value in (eth_transfers or {}).items()
+    }
+    fixture["native_prices"] = orderbook_api.get_native_prices() or {}
+    fixture["token_list"] = TokenListAPI().get_token_list() or []
+    fixture["token_prices"] = {
+        WETH_ADDRESS: CoingeckoAPI().get_token_price_in_usd(WETH_ADDRESS)
+    }
+    tokens = [
+        token for token in fixture["token_list"] if token in fixture["native_prices"]
+    ]
+    fixture["balances"] = (
+        web3_api.get_token_balances(
+            tokens, SETTLEMENT_CONTRACT_ADDRESS, max(block_numbers)
+        )
+        or {}
+    )
+    fixture["current_block"] = web3_api.get_current_block_number()
+    return fixture
+
+
+def save_fixture(fixture: dict[str, Any], path: str) -> None:
+    """Write a fixture to a JSON file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(fixture, file)
+
+
+def load_fixture(path: str) -> dict[str, Any]:
+    """Read a fixture from a JSON file."""
+    with open(path, "r", encoding="utf-8") as file:
+        fixture: dict[str, Any] = json.load(file)
+    return fixture
+
+
+def generate_fixtures(fixtures_dir: str = FIXTURES_DIR) -> list[str]:
+    """Write synthetic fixtures for all BATCH_SIZES and return their paths."""
+    paths = []
+    for batch_size in BATCH_SIZES:
+        path = os.path.join(fixtures_dir, f"synthetic_{batch_size}.json")
+        save_fixture(generate_fixture(batch_size), path)
+        paths.append(path)
+    return paths
+
+
+def main() -> None:
+    """Generate or record fixtures."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("generate", help="generate synthetic fixtures")
+    record_parser = subparsers.add_parser("record", help="record a fixture")
+    record_parser.add_argument("name")
+    record_parser.add_argument("tx_hashes", nargs="+")
+    record_parser.add_argument("--chain", default="mainnet")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        for path in generate_fixtures():
+            print(f"Wrote {path}")
+    else:
+        path = os.path.join(FIXTURES_DIR, f"{args.name}.json")
+        save_fixture(record_fixture(args.tx_hashes, args.chain), path)
+        print(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
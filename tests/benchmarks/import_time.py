@@ -0,0 +1,112 @@
+"""
+Benchmark of the startup time of the daemon, i.e. the time for importing its modules.
+
+Every module is imported in a fresh interpreter, so that no module is cached. For each module,
+the median wall time over several runs and the slowest imports reported by `python -X importtime`
+are written as JSON. The time for creating the web3 client on first use, which is deferred from
+importing src.apis.web3api, is reported separately.
+
+Run from the root directory via
+    python3 -m tests.benchmarks.import_time [--output FILE]
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any
+from tests.benchmarks.monitoring_tests import get_commit
+
+MODULES = [
+    "src.daemon",
+    "src.apis.web3api",
+    "src.monitoring_tests.base_test",
+    "src.work_queue",
+]
+# code run after importing its module, timed as first use
+FIRST_USE = {
+    "web3 client": ("src.apis.web3api", "Web3API('http://localhost:8545').web_3"),
+}
+REPETITIONS = 5
+SLOWEST_IMPORTS = 10
+
+
+def run_timed(setup: str, statement: str) -> float:
+    """Wall time of running statement after setup in a fresh interpreter, in seconds."""
+    code = (
+        f"import time\n{setup}\nstart = time.perf_counter()\n{statement}\n"
+        "print(time.perf_counter() - start)"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, check=True, text=True
+    ).stdout
+    return float(output.split()[-1])
+
+
+def slowest_imports(module: str) -> list[dict[str, Any]]:
+    """Imports with the largest cumulative time when importing module."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stderr
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        if cumulative.strip().isdigit():
+            imports.append(
+                {"module": name.strip(), "cumulative_ms": int(cumulative) / 1000}
+            )
+    imports.sort(key=lambda entry: entry["cumulative_ms"], reverse=True)
+    return imports[:SLOWEST_IMPORTS]
+
+
+def main() -> None:
+    """Time imports of all modules and write results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--output", help="output file, results are printed if not set")
+    args = parser.parse_args()
+
+    results = []
+    for module in MODULES:
+        timings = [run_timed("", f"import {module}") for _ in range(REPETITIONS)]
+        results.append(
+            {
+                "module": module,
+                "median_ms": statistics.median(timings) * 1000,
+                "slowest_imports": slowest_imports(module),
+            }
+        )
+    for name, (module, statement) in FIRST_USE.items():
+        timings = [
+            run_timed(f"from {module} import *", statement) for _ in range(REPETITIONS)
+        ]
+        results.append(
+            {"first_use": name, "median_ms": statistics.median(timings) * 1000}
+        )
+
+    output = json.dumps(
+        {
+            "commit": get_commit(),
+            "python": platform.python_version(),
+            "timestamp": int(time.time()),
+            "repetitions": REPETITIONS,
+            "results": results,
+        },
+        indent=2,
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Load test of the daemon with synthetic settlements.
+
+A local stand-in node and orderbook (tests/benchmarks/stand_in.py) is started in a separate
+process for every scenario. Blocks with a given number of settlements are mined one at a time
+and processed with the block processing of the daemon, running all monitoring tests which only
+depend on the node, the orderbook, auction instances, and the reference solver.
+
+Two sweeps are run:
+- throughput: settlements per block are increased to find the number of settlements per second
+  the daemon sustains, and where processing a block takes longer than the block time,
+- memory: the number of solutions and orders per competition is increased and the peak of
+  traced memory during processing is measured.
+
+Run from the root directory via
+    python3 -m tests.benchmarks.load [--output FILE]
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import time
+import tracemalloc
+from dataclasses import asdict
+from typing import Any
+import requests
+from src.apis.auctioninstanceapi import AuctionInstanceAPI
+from src.apis.orderbookapi import OrderbookAPI
+from src.apis.solverapi import SolverAPI
+from src.apis.web3api import Web3API
+from src.daemon import process_block_range
+from src.monitoring_tests.base_test import BaseTest
+from src.monitoring_tests.combinatorial_auction_surplus_test import (
+    CombinatorialAuctionSurplusTest,
+)
+from src.monitoring_tests.cost_coverage_zero_signed_fee import (
+    CostCoverageForZeroSignedFee,
+)
+from src.monitoring_tests.cowamm_commitment_test import CoWAMMCommitmentTest
+from src.monitoring_tests.high_score_test import HighScoreTest
+from src.monitoring_tests.mev_blocker_kickbacks_test import (
+    MEVBlockerRefundsMonitoringTest,
+)
+from src.monitoring_tests.partially_fillable_cost_coverage_test import (
+    PartialFillCostCoverageTest,
+)
+from src.monitoring_tests.price_sensitivity_test import PriceSensitivityTest
+from src.monitoring_tests.reference_solver_surplus_test import (
+    ReferenceSolverSurplusTest,
+)
+from src.monitoring_tests.solver_competition_surplus_test import (
+    SolverCompetitionSurplusTest,
+)
+from src.monitoring_tests.uniform_directed_prices_test import (
+    UniformDirectedPricesTest,
+)
+from tests.benchmarks.stand_in import ChainConfig, serve
+
+# block time of mainnet, processing a block must not take longer to keep up with the chain
+BLOCK_TIME_IN_SEC = 12
+BLOCKS_PER_SCENARIO = 3
+THROUGHPUT_SETTLEMENTS_PER_BLOCK = [1, 5, 10, 25]
+# (solutions per settlement, orders per settlement)
+MEMORY_COMPETITION_SIZES = [(5, 10), (20, 10), (20, 50), (50, 100)]
+
+
+def create_tests(web3_api: Web3API, url: str) -> list[BaseTest]:
+    """Monitoring tests using the stand-in for all external services."""
+    orderbook_api = OrderbookAPI("mainnet", f"{url}/api/v1/")
+    reference_test = ReferenceSolverSurplusTest(web3_api, orderbook_api)
+    reference_test.auction_instance_api = AuctionInstanceAPI(f"{url}/instances/")
+    reference_test.solver_api = SolverAPI(url)
+    tests: list[BaseTest] = [
+        SolverCompetitionSurplusTest(orderbook_api),
+        CombinatorialAuctionSurplusTest(orderbook_api),
+        HighScoreTest(orderbook_api),
+        PriceSensitivityTest(orderbook_api),
+        UniformDirectedPricesTest(orderbook_api),
+        CostCoverageForZeroSignedFee(web3_api, orderbook_api),
+        PartialFillCostCoverageTest(web3_api, orderbook_api),
+        MEVBlockerRefundsMonitoringTest(web3_api),
+        CoWAMMCommitmentTest(web3_api),
+        reference_test,
+    ]
+    for test in tests:
+        test.alert_dispatcher = None
+    return tests
+
+
+def run_scenario(config: ChainConfig, trace_memory: bool) -> dict[str, Any]:
+    """Mine BLOCKS_PER_SCENARIO blocks on a fresh stand-in and process them one by one."""
+    port_queue: Any = multiprocessing.Queue()
+    server = multiprocessing.Process(
+        target=serve, args=(config, port_queue), daemon=True
+    )
+    server.start()
+    try:
+        url = f"http://127.0.0.1:{port_queue.get(timeout=30)}"
+        os.environ["NODE_URL"] = url
+        web3_api = Web3API()
+        tests = create_tests(web3_api, url)
+
+        processing_times: list[float] = []
+        settlements = 0
+        if trace_memory:
+            tracemalloc.start()
+        for _ in range(BLOCKS_PER_SCENARIO):
+            block_number = int(
+                requests.post(
+                    url,
+                    json={
+                        "jsonrpc": "2.0",
+                        "id": 0,
+                        "method": "evm_mine",
+                        "params": [],
+                    },
+                    timeout=30,
+                ).json()["result"],
+                16,
+            )
+            start = time.perf_counter()
+            settlements += process_block_range(
+                web3_api, tests, block_number, block_number
+            )
+            processing_times.append(time.perf_counter() - start)
+        peak_memory = tracemalloc.get_traced_memory()[1] if trace_memory else None
+        if trace_memory:
+            tracemalloc.stop()
+    finally:
+        server.terminate()
+        server.join()
+
+    total_time = sum(processing_times)
+    return {
+        **asdict(config),
+        "blocks": BLOCKS_PER_SCENARIO,
+        "settlements": settlements,
+        "settlements_per_sec": settlements / total_time,
+        "mean_block_processing_sec": total_time / BLOCKS_PER_SCENARIO,
+        "max_block_processing_sec": max(processing_times),
+        "saturated": max(processing_times) > BLOCK_TIME_IN_SEC,
+        "tests_with_retries": sum(1 for test in tests if test.tx_hashes),
+        "peak_traced_memory_mb": (None if peak_memory is None else peak_memory / 2**20),
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10,
+    }
+
+
+def main() -> None:
+    """Run the throughput and memory sweeps and write results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--output", help="output file, results are printed if not set")
+    parser.add_argument(
+        "--liquidity", type=int, default=100, help="AMMs per auction instance"
+    )
+    args = parser.parse_args()
+    # tests log every checked settlement and alerts, which would distort timings
+    logging.disable(logging.CRITICAL)
+
+    throughput = [
+        run_scenario(
+            ChainConfig(
+                settlements_per_block=settlements_per_block,
+                liquidity_size=args.liquidity,
+            ),
+            trace_memory=False,
+        )
+        for settlements_per_block in THROUGHPUT_SETTLEMENTS_PER_BLOCK
+    ]
+    memory = [
+        run_scenario(
+            ChainConfig(
+                orders_per_settlement=orders,
+                solutions_per_settlement=solutions,
+                liquidity_size=args.liquidity,
+            ),
+            trace_memory=True,
+        )
+        for solutions, orders in MEMORY_COMPETITION_SIZES
+    ]
+
+    output = json.dumps(
+        {
+            "block_time_in_sec": BLOCK_TIME_IN_SEC,
+            "throughput": throughput,
+            "memory": memory,
+        },
+        indent=2,
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
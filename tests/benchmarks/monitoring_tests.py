@@ -0,0 +1,268 @@
+"""
+Benchmark of all monitoring tests, trade extraction, and the combinatorial auction on fixtures.
+
+Data is served from fixture files through API stubs, so that no network access is needed. If
+the fixture directory contains no fixtures, synthetic fixtures are generated first; no recorded
+fixtures are committed. Every timed run must succeed, so that a test stopping early does not
+show up as a speedup. Results are written as JSON to compare them across commits.
+
+Run from the root directory via
+    python3 -m tests.benchmarks.monitoring_tests [--fixtures DIR] [--output FILE]
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import time
+from typing import Any, Callable, Optional
+from src.constants import BUFFER_INTERVAL
+from src.monitoring_tests.base_test import BaseTest
+from src.monitoring_tests.buffers_monitoring_test import BuffersMonitoringTest
+from src.monitoring_tests.combinatorial_auction_surplus_test import (
+    CombinatorialAuctionSurplusTest,
+)
+from src.monitoring_tests.cost_coverage_zero_signed_fee import (
+    CostCoverageForZeroSignedFee,
+)
+from src.monitoring_tests.cowamm_commitment_test import CoWAMMCommitmentTest
+from src.monitoring_tests.high_score_test import HighScoreTest
+from src.monitoring_tests.mev_blocker_kickbacks_test import (
+    MEVBlockerRefundsMonitoringTest,
+)
+from src.monitoring_tests.partially_fillable_cost_coverage_test import (
+    PartialFillCostCoverageTest,
+)
+from src.monitoring_tests.price_sensitivity_test import PriceSensitivityTest
+from src.monitoring_tests.reference_solver_surplus_test import (
+    ReferenceSolverSurplusTest,
+)
+from src.monitoring_tests.solver_competition_surplus_test import (
+    SolverCompetitionSurplusTest,
+)
+from src.monitoring_tests.uniform_directed_prices_test import (
+    UniformDirectedPricesTest,
+)
+from tests.benchmarks.fixtures import FIXTURES_DIR, generate_fixtures, load_fixture
+from tests.benchmarks.stubs import (
+    StubAuctionInstanceAPI,
+    StubCoingeckoAPI,
+    StubOrderbookAPI,
+    StubSolverAPI,
+    StubTokenListAPI,
+    StubWeb3API,
+)
+
+REPETITIONS = 5
+
+
+class Stubs:
+    """API stubs for one fixture."""
+
+    def __init__(self, fixture: dict[str, Any]) -> None:
+        self.fixture = fixture
+        self.web3_api = StubWeb3API(fixture)
+        self.orderbook_api = StubOrderbookAPI(fixture)
+
+
+def create_test(test_class: type[BaseTest], stubs: Stubs) -> BaseTest:
+    """Create a monitoring test using API stubs."""
+    # pylint: disable=too-many-return-statements
+    fixture = stubs.fixture
+    if test_class is BuffersMonitoringTest:
+        buffers_test = BuffersMonitoringTest(stubs.web3_api, stubs.orderbook_api)
+        buffers_test.coingecko_api = StubCoingeckoAPI(fixture)
+        buffers_test.tokenlist_api = StubTokenListAPI(fixture)
+        return buffers_test
+    if test_class is ReferenceSolverSurplusTest:
+        reference_test = ReferenceSolverSurplusTest(stubs.web3_api, stubs.orderbook_api)
+        reference_test.auction_instance_api = StubAuctionInstanceAPI(fixture)
+        reference_test.solver_api = StubSolverAPI(fixture)
+        return reference_test
+    if test_class is CoWAMMCommitmentTest:
+        return CoWAMMCommitmentTest(stubs.web3_api)
+    if test_class is MEVBlockerRefundsMonitoringTest:
+        return MEVBlockerRefundsMonitoringTest(stubs.web3_api)
+    if test_class in (
+        CostCoverageForZeroSignedFee,
+        PartialFillCostCoverageTest,
+    ):
+        return test_class(stubs.web3_api, stubs.orderbook_api)  # type: ignore[call-arg]
+    return test_class(stubs.orderbook_api)  # type: ignore[call-arg]
+
+
+TEST_CLASSES: list[type[BaseTest]] = [
+    BuffersMonitoringTest,
+    CombinatorialAuctionSurplusTest,
+    CostCoverageForZeroSignedFee,
+    CoWAMMCommitmentTest,
+    HighScoreTest,
+    MEVBlockerRefundsMonitoringTest,
+    PartialFillCostCoverageTest,
+    PriceSensitivityTest,
+    ReferenceSolverSurplusTest,
+    SolverCompetitionSurplusTest,
+    UniformDirectedPricesTest,
+]
+
+
+def time_calls(function: Callable[[str], bool], tx_hashes: list[str]) -> list[float]:
+    """
+    Time function for every hash, REPETITIONS times. Returns timings in seconds. The function
+    returns whether it succeeded. Failures raise, since a test which stops early, e.g. because a
+    stub lacks data, would otherwise show up as a speedup.
+    """
+    timings = []
+    for _ in range(REPETITIONS):
+        for tx_hash in tx_hashes:
+            start = time.perf_counter()
+            success = function(tx_hash)
+            timings.append(time.perf_counter() - start)
+            if not success:
+                raise RuntimeError(f"Benchmarked run failed for {tx_hash}.")
+    return timings
+
+
+def summarize(
+    benchmark: str, fixture_name: str, fixture: dict[str, Any], timings: list[float]
+) -> dict[str, Any]:
+    """Summary of timings of a benchmark on a fixture, in milliseconds per settlement."""
+    competitions = fixture["competitions"].values()
+    return {
+        "benchmark": benchmark,
+        "fixture": fixture_name,
+        "settlements": len(fixture["tx_hashes"]),
+        "orders_per_settlement": max(
+            (len(c["solutions"][-1]["orders"]) for c in competitions), default=0
+        ),
+        "solutions_per_settlement": max(
+            (len(c["solutions"]) for c in competitions), default=0
+        ),
+        "samples": len(timings),
+        "min_ms": min(timings) * 1e3,
+        "median_ms": statistics.median(timings) * 1e3,
+        "mean_ms": statistics.mean(timings) * 1e3,
+        "max_ms": max(timings) * 1e3,
+    }
+
+
+def benchmark_fixture(
+    fixture_name: str, fixture: dict[str, Any]
+) -> list[dict[str, Any]]:
+    """Run all benchmarks on one fixture."""
+    stubs = Stubs(fixture)
+    tx_hashes = fixture["tx_hashes"]
+    results = []
+
+    for test_class in TEST_CLASSES:
+        test = create_test(test_class, stubs)
+        test.alert_dispatcher = None
+
+        def run_test(tx_hash: str, test: BaseTest = test) -> bool:
+            if isinstance(test, BuffersMonitoringTest):
+                # check buffers for every settlement instead of every BUFFER_INTERVAL-th
+                test.counter = BUFFER_INTERVAL
+            test.add_hashes_to_queue([tx_hash])
+            test.run_queue()
+            # hashes which need to be run again stay in the queue
+            success = not test.tx_hashes
+            test.tx_hashes = []
+            return success
+
+        results.append(
+            summarize(
+                f"test/{test_class.__name__}",
+                fixture_name,
+                fixture,
+                time_calls(run_test, tx_hashes),
+            )
+        )
+
+    def get_trades(tx_hash: str) -> bool:
+        transaction = stubs.web3_api.get_transaction(tx_hash)
+        if transaction is None:
+            return False
+        trades = stubs.web3_api.get_trades(stubs.web3_api.get_settlement(transaction))
+        return len(trades) > 0
+
+    results.append(
+        summarize(
+            "Web3API.get_trades",
+            fixture_name,
+            fixture,
+            time_calls(get_trades, tx_hashes),
+        )
+    )
+
+    combinatorial_test = CombinatorialAuctionSurplusTest(stubs.orderbook_api)
+    combinatorial_test.alert_dispatcher = None
+    results.append(
+        summarize(
+            "CombinatorialAuctionSurplusTest.run_combinatorial_auction",
+            fixture_name,
+            fixture,
+            time_calls(
+                lambda tx_hash: combinatorial_test.run_combinatorial_auction(
+                    fixture["competitions"][tx_hash]
+                ),
+                tx_hashes,
+            ),
+        )
+    )
+    return results
+
+
+def get_commit() -> Optional[str]:
+    """Commit of the working directory, if available."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    """Run benchmarks on all fixtures and write results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--output", help="output file, results are printed if not set")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.fixtures, "*.json")))
+    if not paths:
+        paths = generate_fixtures(args.fixtures)
+    # tests log every checked settlement and alerts, which would distort timings
+    logging.disable(logging.CRITICAL)
+
+    results = []
+    for path in paths:
+        fixture_name = os.path.splitext(os.path.basename(path))[0]
+        results += benchmark_fixture(fixture_name, load_fixture(path))
+
+    output = json.dumps(
+        {
+            "commit": get_commit(),
+            "python": platform.python_version(),
+            "timestamp": int(time.time()),
+            "repetitions": REPETITIONS,
+            "results": results,
+        },
+        indent=2,
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark of settlement decoding, comparing the generic web3 decoder to the precompiled decoder.
+
+Run from the root directory via
+    python3 -m tests.benchmarks.settlement_decoding
+"""
+
+import timeit
+from web3 import Web3
+from contracts.gpv2_settlement import gpv2_settlement
+from src.settlement import Settlement, decode_settlement
+from src.constants import SETTLEMENT_CONTRACT_ADDRESS
+from tests.benchmarks.synthetic import (
+    generate_settle_arguments,
+    encode_settle_calldata,
+)
+
+# (number of tokens, number of trades, number of interactions per phase)
+SCENARIOS = [(2, 1, 2), (10, 10, 10), (30, 50, 40)]
+REPETITIONS = 5
+
+
+def decode_trades(calldata: bytes) -> Settlement:
+    """Decode the sections of a settlement needed for computing trades."""
+    settlement = decode_settlement(calldata)
+    _ = settlement.tokens, settlement.clearing_prices, settlement.trades
+    return settlement
+
+
+def main() -> None:
+    """Time both decoders on synthetic settlements of different sizes."""
+    contract = Web3().eth.contract(
+        address=SETTLEMENT_CONTRACT_ADDRESS, abi=gpv2_settlement
+    )
+    print(
+        "tokens\ttrades\tinteractions\tweb3 [ms]\ttrades only [ms]\tall sections [ms]"
+    )
+    for num_tokens, num_trades, num_interactions in SCENARIOS:
+        calldata = encode_settle_calldata(
+            generate_settle_arguments(num_tokens, num_trades, num_interactions)
+        )
+        number = max(1, 200 // num_trades)
+        timings = [
+            min(timeit.repeat(function, number=number, repeat=REPETITIONS))
+            / number
+            * 1000
+            for function in [
+                lambda: contract.decode_function_input(calldata),
+                lambda: decode_trades(calldata),
+                lambda: decode_trades(calldata).interactions,
+            ]
+        ]
+        print(
+            f"{num_tokens}\t{num_trades}\t{num_interactions}\t\t"
+            + "\t\t".join(f"{timing:.3f}" for timing in timings)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""
+Local stand-in for an Ethereum node, the orderbook, auction instance storage, and the reference
+solver, serving a synthetic chain of settlements.
+
+The node implements the JSON-RPC methods used by Web3API. New blocks are produced on request via
+evm_mine, each containing a configurable number of synthetic settlements from
+tests/benchmarks/fixtures.py. The orderbook serves competition data, orders, and native prices
+under /api/v1/, auction instances are served under /instances/, and reference solutions under
+/solve.
+"""
+
+from __future__ import annotations
+import json
+import threading
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+from eth_abi.abi import decode, encode
+from hexbytes import HexBytes
+from src.apis.web3api import SAFE_RECEIVED_EVENT_TOPIC, TRADE_EVENT_TOPIC
+from src.constants import (
+    MEV_BLOCKER_KICKBACKS_ADDRESSES,
+    MULTICALL3_ADDRESS,
+    SETTLEMENT_CONTRACT_ADDRESS,
+)
+from tests.benchmarks.fixtures import empty_fixture, generate_fixture
+
+AGGREGATE3_SELECTOR = bytes.fromhex("82ad56cb")
+ZERO_HASH = "0x" + "00" * 32
+
+
+@dataclass
+class ChainConfig:
+    """Configuration of the synthetic chain."""
+
+    settlements_per_block: int = 1
+    orders_per_settlement: int = 10
+    solutions_per_settlement: int = 5
+    liquidity_size: int = 0
+    start_block: int = 20000000
+    seed: int = 0
+
+
+def hex_int(value: int) -> str:
+    """Hex encoding of quantities in JSON-RPC."""
+    return hex(int(value))
+
+
+def pad_address(address: str) -> str:
+    """Address as indexed event topic."""
+    return "0x" + "00" * 12 + address.lower().removeprefix("0x")
+
+
+class SyntheticChain:
+    """
+    Chain state of the stand-in. All data of mined blocks is kept in one fixture, logs are
+    indexed by block.
+    """
+
+    def __init__(self, config: ChainConfig) -> None:
+        self.config = config
+        self.head = config.start_block
+        self.data = empty_fixture()
+        self.logs_by_block: dict[int, list[dict[str, Any]]] = {}
+        self.lock = threading.Lock()
+
+    def mine(self) -> int:
+        """Produce a block with settlements_per_block settlements and return its number."""
+        with self.lock:
+            block_number = self.head + 1
+            fixture = generate_fixture(
+                self.config.orders_per_settlement,
+                self.config.settlements_per_block,
+                self.config.solutions_per_settlement,
+                seed=self.config.seed * 10**9 + block_number,
+                block_number=block_number,
+                max_blocks_between_settlements=0,
+                liquidity_size=self.config.liquidity_size,
+            )
+            for key in ["tx_hashes", "token_list"]:
+                self.data[key] += fixture[key]
+            for key, value in fixture.items():
+                if isinstance(value, dict):
+                    self.data[key].update(value)
+            self.logs_by_block[block_number] = self.create_logs(block_number, fixture)
+            self.head = block_number
+        return block_number
+
+    def create_logs(
+        self, block_number: int, fixture: dict[str, Any]
+    ) -> list[dict[str, Any]]:
+        """Trade logs of all settlements and a kickback log for the block."""
+        block_hash = "0x" + block_number.to_bytes(32, "big").hex()
+        logs: list[dict[str, Any]] = []
+        for tx_hash in fixture["tx_hashes"]:
+            transaction = fixture["transactions"][tx_hash]
+            for trade_event in fixture["trade_events"][tx_hash]:
+                data = encode(
+                    ["address", "address", "uint256", "uint256", "uint256", "bytes"],
+                    [
+                        trade_event["sellToken"],
+                        trade_event["buyToken"],
+                        int(trade_event["sellAmount"]),
+                        int(trade_event["buyAmount"]),
+                        int(trade_event["feeAmount"]),
+                        bytes(HexBytes(trade_event["orderUid"])),
+                    ],
+                )
+                logs.append(
+                    {
+                        "address": SETTLEMENT_CONTRACT_ADDRESS,
+                        "topics": [
+                            TRADE_EVENT_TOPIC,
+                            pad_address(trade_event["owner"]),
+                        ],
+                        "data": "0x" + data.hex(),
+                        "transactionHash": tx_hash,
+                        "transactionIndex": hex_int(transaction["transactionIndex"]),
+                    }
+                )
+        for value in fixture["eth_transfers"].values():
+            logs.append(
+                {
+                    "address": MEV_BLOCKER_KICKBACKS_ADDRESSES[0],
+                    "topics": [SAFE_RECEIVED_EVENT_TOPIC, pad_address(ZERO_HASH[:42])],
+                    "data": "0x" + int(value * 10**18).to_bytes(32, "big").hex(),
+                    "transactionHash": ZERO_HASH,
+                    "transactionIndex": hex_int(0),
+                }
+            )
+        for log_index, log in enumerate(logs):
+            log.update(
+                {
+                    "blockNumber": hex_int(block_number),
+                    "blockHash": block_hash,
+                    "logIndex": hex_int(log_index),
+                    "removed": False,
+                }
+            )
+        return logs
+
+    def get_logs(self, log_filter: dict[str, Any]) -> list[dict[str, Any]]:
+        """Logs matching a filter on block range, addresses, and first topic."""
+        from_block = int(log_filter.get("fromBlock", hex_int(self.head)), 16)
+        to_block = int(log_filter.get("toBlock", hex_int(self.head)), 16)
+        addresses = log_filter.get("address", [])
+        addresses = {
+            address.lower()
+            for address in (addresses if isinstance(addresses, list) else [addresses])
+        }
+        topics = log_filter.get("topics") or [None]
+        first_topics = topics[0] if isinstance(topics[0], list) else [topics[0]]
+        return [
+            log
+            for block in range(from_block, min(to_block, self.head) + 1)
+            for log in self.logs_by_block.get(block, [])
+            if (not addresses or log["address"].lower() in addresses)
+            and (first_topics == [None] or log["topics"][0] in first_topics)
+        ]
+
+    def get_transaction(self, tx_hash: str) -> Optional[dict[str, Any]]:
+        """Transaction in JSON-RPC format."""
+        transaction = self.data["transactions"].get(normalize_hash(tx_hash))
+        if transaction is None:
+            return None
+        return {
+            "hash": transaction["hash"],
+            "blockHash": "0x"
+            + int(transaction["blockNumber"]).to_bytes(32, "big").hex(),
+            "blockNumber": hex_int(transaction["blockNumber"]),
+            "transactionIndex": hex_int(transaction.get("transactionIndex", 0)),
+            "from": transaction["from"],
+            "to": SETTLEMENT_CONTRACT_ADDRESS,
+            "gas": hex_int(3 * 10**6),
+            "gasPrice": hex_int(transaction["gasPrice"]),
+            "input": transaction["input"],
+            "nonce": hex_int(0),
+            "value": hex_int(0),
+            "type": hex_int(0),
+            "chainId": hex_int(1),
+            "v": hex_int(27),
+            "r": ZERO_HASH,
+            "s": ZERO_HASH,
+        }
+
+    def get_receipt(self, tx_hash: str) -> Optional[dict[str, Any]]:
+        """Receipt in JSON-RPC format."""
+        transaction = self.get_transaction(tx_hash)
+        receipt = self.data["receipts"].get(normalize_hash(tx_hash))
+        if transaction is None or receipt is None:
+            return None
+        return {
+            "transactionHash": transaction["hash"],
+            "transactionIndex": transaction["transactionIndex"],
+            "blockHash": transaction["blockHash"],
+            "blockNumber": transaction["blockNumber"],
+            "from": transaction["from"],
+            "to": transaction["to"],
+            "cumulativeGasUsed": hex_int(receipt["gasUsed"]),
+            "gasUsed": hex_int(receipt["gasUsed"]),
+            "effectiveGasPrice": hex_int(receipt["effectiveGasPrice"]),
+            "contractAddress": None,
+            "logs": [],
+            "logsBloom": "0x" + "00" * 256,
+            "status": hex_int(1),
+            "type": hex_int(0),
+        }
+
+    def call(self, call: dict[str, Any]) -> str:
+        """eth_call. Only Multicall3.aggregate3 is supported, balances and CoW AMM commitments
+        are read from the chain data."""
+        calldata = bytes(HexBytes(call.get("input") or call.get("data") or "0x"))
+        if (
+            call.get("to", "").lower() != MULTICALL3_ADDRESS.lower()
+            or calldata[:4] != AGGREGATE3_SELECTOR
+        ):
+            raise ValueError("Only Multicall3.aggregate3 is supported.")
+        (calls,) = decode(["(address,bool,bytes)[]"], calldata[4:])
+        results = [
+            (
+                True,
+                int(self.data["balances"].get(target.lower(), 0)).to_bytes(32, "big"),
+            )
+            for target, _, _ in calls
+        ]
+        return "0x" + encode(["(bool,bytes)[]"], [results]).hex()
+
+    def handle_rpc(self, method: str, params: list[Any]) -> Any:
+        """Result of a JSON-RPC call."""
+        # pylint: disable=too-many-return-statements
+        if method == "eth_chainId":
+            return hex_int(1)
+        if method == "eth_blockNumber":
+            return hex_int(self.head)
+        if method == "eth_gasPrice":
+            return hex_int(30 * 10**9)
+        if method == "eth_getLogs":
+            return self.get_logs(params[0])
+        if method == "eth_getTransactionByHash":
+            return self.get_transaction(params[0])
+        if method == "eth_getTransactionReceipt":
+            return self.get_receipt(params[0])
+        if method == "eth_call":
+            return self.call(params[0])
+        if method == "evm_mine":
+            return hex_int(self.mine())
+        raise NotImplementedError(f"Method {method} is not supported.")
+
+
+def normalize_hash(tx_hash: str) -> str:
+    """Transaction hashes are used with and without 0x prefix, the chain uses the prefix."""
+    return "0x" + tx_hash.lower().removeprefix("0x")
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """HTTP handler for node, orderbook, auction instance, and solver requests."""
+
+    server: StandInServer
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if self.path.startswith("/solve"):
+            (order,) = body["orders"].values()
+            self.respond(self.server.chain.data["reference_solutions"].get(order["id"]))
+            return
+        calls = body if isinstance(body, list) else [body]
+        responses = []
+        for call in calls:
+            response: dict[str, Any] = {"jsonrpc": "2.0", "id": call.get("id")}
+            try:
+                response["result"] = self.server.chain.handle_rpc(
+                    call["method"], call.get("params", [])
+                )
+            except Exception as err:  # pylint: disable=W0718
+                response["error"] = {"code": -32601, "message": str(err)}
+            responses.append(response)
+        self.respond(responses if isinstance(body, list) else responses[0])
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        data = self.server.chain.data
+        path = self.path.split("?")[0]
+        result: Optional[Any] = None
+        if path.startswith("/api/v1/solver_competition/by_tx_hash/"):
+            result = data["competitions"].get(normalize_hash(path.rsplit("/", 1)[1]))
+        elif path.startswith("/api/v1/orders/"):
+            result = data["orders"].get(path.rsplit("/", 1)[1])
+        elif path == "/api/v1/auction":
+            result = {"prices": data["native_prices"]}
+        elif path.startswith("/instances/"):
+            auction_id = path.rsplit("/", 1)[1].removesuffix(".json")
+            result = data["auction_instances"].get(auction_id)
+        self.respond(result)
+
+    def respond(self, payload: Optional[Any]) -> None:
+        """Send a JSON response, 404 if there is no payload."""
+        body = json.dumps(payload).encode()
+        self.send_response(200 if payload is not None else 404)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:
+        """Requests are not logged."""
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Threaded HTTP server of the stand-in."""
+
+    daemon_threads = True
+
+    def __init__(self, chain: SyntheticChain, port: int = 0) -> None:
+        super().__init__(("127.0.0.1", port), StandInHandler)
+        self.chain = chain
+
+    @property
+    def url(self) -> str:
+        """Base URL of the server."""
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+def serve(config: ChainConfig, port_queue: Any) -> None:
+    """Serve a synthetic chain until the process is terminated. The port is put into
+    port_queue once the server is listening."""
+    server = StandInServer(SyntheticChain(config))
+    port_queue.put(server.server_port)
+    server.serve_forever()
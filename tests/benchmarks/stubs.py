@@ -0,0 +1,155 @@
+"""
+API stubs serving data from fixtures, see tests/benchmarks/fixtures.py.
+
+The stubs subclass the API classes and only replace methods which fetch data, so that all
+processing of fetched data runs the production code.
+"""
+
+from typing import Any, Optional, cast
+from hexbytes import HexBytes
+from web3.types import BlockIdentifier, TxData, TxReceipt
+from src.apis.auctioninstanceapi import AuctionInstanceAPI
+from src.apis.coingeckoapi import CoingeckoAPI
+from src.apis.orderbookapi import OrderbookAPI
+from src.apis.solverapi import SolverAPI
+from src.apis.tokenlistapi import TokenListAPI
+from src.apis.web3api import BALANCE_OF_SELECTOR, Web3API
+
+
+def normalize_hash(tx_hash: str) -> str:
+    """Transaction hashes are used with and without 0x prefix, fixtures use the prefix."""
+    return "0x" + tx_hash.lower().removeprefix("0x")
+
+
+class StubWeb3API(Web3API):
+    """Web3API serving transactions, receipts, balances and ETH transfers from a fixture."""
+
+    def __init__(self, fixture: dict[str, Any]) -> None:
+        super().__init__()
+        self.fixture = fixture
+        self.transactions = {
+            tx_hash: cast(
+                TxData,
+                {
+                    **transaction,
+                    "hash": HexBytes(transaction["hash"]),
+                    "input": HexBytes(transaction["input"]),
+                },
+            )
+            for tx_hash, transaction in fixture["transactions"].items()
+        }
+
+    def get_current_block_number(self) -> Optional[int]:
+        return int(self.fixture["current_block"])
+
+    def get_transaction(self, tx_hash: str) -> Optional[TxData]:
+        return self.transactions.get(normalize_hash(tx_hash))
+
+    def get_receipt(self, tx_hash: str) -> Optional[TxReceipt]:
+        receipt = self.fixture["receipts"].get(normalize_hash(tx_hash))
+        return cast(Optional[TxReceipt], receipt)
+
+    def get_tx_block_number(self, tx_hash: str) -> Optional[int]:
+        transaction = self.get_transaction(tx_hash)
+        return None if transaction is None else int(transaction["blockNumber"])
+
+    def get_eth_transfers_by_block(
+        self, start_block: int, end_block: int, targets: list[str]
+    ) -> Optional[dict[int, float]]:
+        return {
+            int(block): value
+            for block, value in self.fixture["eth_transfers"].items()
+            if start_block <= int(block) <= end_block
+        }
+
+    def multicall(
+        self,
+        calls: list[tuple[str, bytes]],
+        block_identifier: BlockIdentifier = "latest",
+    ) -> Optional[list[Optional[bytes]]]:
+        """Calls to balanceOf return balances from the fixture, all other calls return zero."""
+        results: list[Optional[bytes]] = []
+        for target, calldata in calls:
+            value = 0
+            if calldata[:4] == BALANCE_OF_SELECTOR:
+                value = int(self.fixture["balances"].get(target.lower(), 0))
+            results.append(value.to_bytes(32, "big"))
+        return results
+
+
+class StubOrderbookAPI(OrderbookAPI):
+    """OrderbookAPI serving competition data, orders, and native prices from a fixture."""
+
+    def __init__(self, fixture: dict[str, Any]) -> None:
+        super().__init__("mainnet")
+        self.fixture = fixture
+
+    def get_solver_competition_data(self, tx_hash: str) -> Optional[dict[str, Any]]:
+        competition_data: Optional[dict[str, Any]] = self.fixture["competitions"].get(
+            normalize_hash(tx_hash)
+        )
+        return competition_data
+
+    def get_order_data(self, uid: str) -> dict[str, Any] | None:
+        order_data: Optional[dict[str, Any]] = self.fixture["orders"].get(uid)
+        return order_data
+
+    def get_native_prices(self) -> Optional[dict[str, int]]:
+        return {
+            token.lower(): int(price)
+            for token, price in self.fixture["native_prices"].items()
+        }
+
+
+class StubAuctionInstanceAPI(AuctionInstanceAPI):
+    """AuctionInstanceAPI serving auction instances from a fixture."""
+
+    def __init__(self, fixture: dict[str, Any]) -> None:
+        super().__init__()
+        self.fixture = fixture
+
+    def get_auction_instance(self, auction_id: int) -> Optional[dict[str, Any]]:
+        auction_instance: Optional[dict[str, Any]] = self.fixture[
+            "auction_instances"
+        ].get(str(auction_id))
+        return auction_instance
+
+
+class StubSolverAPI(SolverAPI):
+    """SolverAPI serving reference solutions from a fixture."""
+
+    def __init__(self, fixture: dict[str, Any]) -> None:
+        super().__init__()
+        self.fixture = fixture
+
+    def solve_instance(
+        self, auction_instance: dict[str, Any]
+    ) -> Optional[dict[str, Any]]:
+        (order,) = auction_instance["orders"].values()
+        solution: Optional[dict[str, Any]] = self.fixture["reference_solutions"].get(
+            order["id"]
+        )
+        return solution
+
+
+class StubCoingeckoAPI(CoingeckoAPI):
+    """CoingeckoAPI serving token prices from a fixture."""
+
+    def __init__(self, fixture: dict[str, Any]) -> None:
+        super().__init__()
+        self.fixture = fixture
+
+    def get_token_price_in_usd(self, address: str) -> Optional[float]:
+        price: Optional[float] = self.fixture["token_prices"].get(address.lower())
+        return price
+
+
+class StubTokenListAPI(TokenListAPI):
+    """TokenListAPI serving the token list from a fixture."""
+
+    def __init__(self, fixture: dict[str, Any]) -> None:
+        super().__init__()
+        self.fixture = fixture
+
+    def get_token_list(self) -> Optional[list[str]]:
+        return list(self.fixture["token_list"])
@@ -0,0 +1,128 @@
+"""
+Generation of synthetic settlement calldata and competitions for benchmarks and tests.
+"""
+
+import random
+from typing import Any
+from eth_abi.abi import encode
+from eth_utils.address import to_checksum_address
+from src.settlement import SETTLE_SELECTOR
+
+SETTLE_TYPES = [
+    "address[]",
+    "uint256[]",
+    "(uint256,uint256,address,uint256,uint256,uint32,bytes32,uint256,uint256,uint256,bytes)[]",
+    "(address,uint256,bytes)[][3]",
+]
+
+
+def random_address(rng: random.Random) -> str:
+    """Random checksummed address."""
+    return to_checksum_address(rng.randbytes(20))
+
+
+def generate_settle_arguments(
+    num_tokens: int = 10,
+    num_trades: int = 10,
+    num_interactions: int = 10,
+    interaction_size: int = 500,
+    seed: int = 0,
+) -> list[Any]:
+    """Generate random arguments of a call to settle.
+    Clearing prices are chosen such that all trades have a non-zero execution. Trades alternate
+    between sell and buy orders, and every third order is partially fillable.
+    """
+    rng = random.Random(seed)
+    tokens = [random_address(rng) for _ in range(num_tokens)]
+    clearing_prices = [rng.randint(10**15, 10**21) for _ in range(num_tokens)]
+    trades = []
+    for i in range(num_trades):
+        sell_token_index, buy_token_index = rng.sample(range(num_tokens), 2)
+        trades.append(
+            (
+                sell_token_index,
+                buy_token_index,
+                random_address(rng),
+                rng.randint(10**18, 10**21),
+                rng.randint(10**18, 10**21),
+                rng.randint(0, 2**32 - 1),
+                rng.randbytes(32),
+                rng.randint(0, 10**16),
+                (i % 2) | (2 if i % 3 == 0 else 0),
+                rng.randint(10**18, 10**21),
+                rng.randbytes(65),
+            )
+        )
+    interactions = [
+        [
+            (random_address(rng), 0, rng.randbytes(interaction_size))
+            for _ in range(num_interactions)
+        ]
+        for _ in range(3)
+    ]
+    return [tokens, clearing_prices, trades, interactions]
+
+
+def encode_settle_calldata(arguments: list[Any]) -> bytes:
+    """Encode a call to settle with the given arguments."""
+    return SETTLE_SELECTOR + encode(SETTLE_TYPES, arguments)
+
+
+def generate_competition_payload(
+    num_solutions: int = 10,
+    num_orders: int = 10,
+    num_tokens: int = 5,
+    seed: int = 0,
+) -> dict[str, Any]:
+    """Generate a random payload of CombinatorialAuctionSurplusTest.evaluate.
+    Every solution executes a random subset of the orders, at amounts around their limit price,
+    so that surplus can be negative. Every third solution is a baseline solution of solver
+    `baseline`, which only executes orders of a single token pair. The last solution, the
+    winner, executes all orders.
+    """
+    rng = random.Random(seed)
+    tokens = [random_address(rng).lower() for _ in range(num_tokens)]
+    orders = []
+    for i in range(num_orders):
+        sell_token, buy_token = rng.sample(tokens, 2)
+        orders.append(
+            [
+                rng.randint(10**18, 10**21),
+                rng.randint(10**18, 10**21),
+                0,
+                buy_token,
+                sell_token,
+                i % 2 == 0,
+                False,
+            ]
+        )
+
+    def execute(order: list[Any]) -> list[Any]:
+        limit_buy_amount, limit_sell_amount = order[0], order[1]
+        fee_amount = rng.randint(0, limit_sell_amount // 100)
+        if order[5]:  # sell order
+            buy_amount = int(limit_buy_amount * rng.uniform(0.99, 1.05))
+            return [*order, buy_amount, limit_sell_amount - fee_amount, fee_amount]
+        sell_amount = int(limit_sell_amount * rng.uniform(0.95, 1.01)) - fee_amount
+        return [*order, limit_buy_amount, sell_amount, fee_amount]
+
+    solutions = []
+    for i in range(num_solutions - 1):
+        if i % 3 == 0:
+            pair = rng.choice(orders)[3:5]
+            executed = [order for order in orders if order[3:5] == pair]
+            solver = "baseline"
+        else:
+            executed = rng.sample(orders, rng.randint(1, num_orders))
+            solver = f"solver_{i % 5}"
+        solutions.append(
+            {"solver": solver, "trades": [execute(order) for order in executed]}
+        )
+    solutions.append(
+        {"solver": "winner", "trades": [execute(order) for order in orders]}
+    )
+    return {
+        "tx_hash": "0x" + rng.randbytes(32).hex(),
+        "prices": {token: str(rng.randint(10**15, 10**21)) for token in tokens},
+        "solutions": solutions,
+    }
@@ -0,0 +1,152 @@
+"""
+Benchmark of finding the surplus maximizing winners of combinatorial auctions.
+
+For every number of solutions, instances are generated in two ways: from synthetic competitions,
+where solutions execute random subsets of the orders, and with solutions touching few random
+token pairs, which leaves more combinations to search. For each, the median and maximal wall time
+per instance, the number of search nodes, and the share of instances solved optimally within the
+time budget are written as JSON. For synthetic competitions, the surplus of the optimal winners
+is compared to the combinatorial auction.
+
+Run from the root directory via
+    python3 -m tests.benchmarks.winner_determination [--output FILE]
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import time
+from typing import Any
+import numpy as np
+from src.combinatorial_batch import build_surplus_matrix
+from src.mechanisms import Combinatorial, OptimalPacking, simulate
+from src.winner_determination import pack_solutions
+from src.constants import WINNER_DETERMINATION_TIME_BUDGET_IN_SEC
+from tests.benchmarks.monitoring_tests import get_commit
+from tests.benchmarks.synthetic import generate_competition_payload
+
+NUM_SOLUTIONS = [10, 30, 50, 100]
+INSTANCES = 50
+# synthetic competitions
+NUM_ORDERS = 30
+NUM_TOKENS = 10
+# random instances
+NUM_TOKEN_PAIRS = 60
+MAX_TOKEN_PAIRS_PER_SOLUTION = 6
+
+
+def competition_instances(
+    num_solutions: int,
+) -> list[tuple[list[list[int]], list[float]]]:
+    """Token pairs and surplus of the solutions of synthetic competitions."""
+    matrix = build_surplus_matrix(
+        [
+            generate_competition_payload(num_solutions, NUM_ORDERS, NUM_TOKENS, seed)
+            for seed in range(INSTANCES)
+        ]
+    )
+    solution_surplus = np.bincount(
+        matrix.rows, weights=matrix.surplus, minlength=matrix.num_solutions
+    ).tolist()
+    token_pairs: list[list[int]] = [[] for _ in range(matrix.num_solutions)]
+    for row, column in zip(matrix.rows.tolist(), matrix.columns.tolist()):
+        token_pairs[row].append(column)
+    offsets = matrix.offsets.tolist()
+    return [
+        (token_pairs[first:end], solution_surplus[first:end])
+        for first, end in zip(offsets, offsets[1:])
+    ]
+
+
+def random_instances(num_solutions: int) -> list[tuple[list[list[int]], list[float]]]:
+    """Solutions touching few random token pairs, with surplus growing with their size."""
+    instances = []
+    for seed in range(INSTANCES):
+        rng = random.Random(seed)
+        token_pairs = [
+            rng.sample(
+                range(NUM_TOKEN_PAIRS), rng.randint(1, MAX_TOKEN_PAIRS_PER_SOLUTION)
+            )
+            for _ in range(num_solutions)
+        ]
+        surplus = [rng.uniform(0, 1) * len(pairs) ** 0.8 for pairs in token_pairs]
+        instances.append((token_pairs, surplus))
+    return instances
+
+
+def time_instances(
+    instances: list[tuple[list[list[int]], list[float]]],
+) -> dict[str, Any]:
+    """Wall time, search nodes, and optimality of solving all instances."""
+    timings, nodes, optimal = [], [], 0
+    for token_pairs, surplus in instances:
+        start = time.perf_counter()
+        packing = pack_solutions(token_pairs, surplus)
+        timings.append(time.perf_counter() - start)
+        nodes.append(packing.nodes)
+        optimal += packing.optimal
+    return {
+        "median_ms": statistics.median(timings) * 1000,
+        "max_ms": max(timings) * 1000,
+        "median_nodes": statistics.median(nodes),
+        "max_nodes": max(nodes),
+        "optimal_share": optimal / len(instances),
+    }
+
+
+def surplus_gain(num_solutions: int) -> dict[str, float]:
+    """Surplus of the optimal winners compared to the combinatorial auction."""
+    matrix = build_surplus_matrix(
+        [
+            generate_competition_payload(num_solutions, NUM_ORDERS, NUM_TOKENS, seed)
+            for seed in range(INSTANCES)
+        ]
+    )
+    combinatorial, optimal = simulate(
+        matrix, {"combinatorial": Combinatorial(), "optimal": OptimalPacking()}
+    )
+    return {
+        "combinatorial_surplus_eth": float(combinatorial.surplus.sum()),
+        "optimal_surplus_eth": float(optimal.surplus.sum()),
+    }
+
+
+def main() -> None:
+    """Time winner determination for all numbers of solutions and write results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--output", help="output file, results are printed if not set")
+    args = parser.parse_args()
+
+    results = []
+    for num_solutions in NUM_SOLUTIONS:
+        results.append(
+            {
+                "solutions": num_solutions,
+                "competitions": time_instances(competition_instances(num_solutions)),
+                "random": time_instances(random_instances(num_solutions)),
+                **surplus_gain(num_solutions),
+            }
+        )
+
+    output = json.dumps(
+        {
+            "commit": get_commit(),
+            "python": platform.python_version(),
+            "timestamp": int(time.time()),
+            "instances": INSTANCES,
+            "time_budget_ms": WINNER_DETERMINATION_TIME_BUDGET_IN_SEC * 1000,
+            "results": results,
+        },
+        indent=2,
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Tests for incremental aggregates of test results.
+"""
+
+import json
+import random
+import statistics
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+from urllib.request import urlopen
+from src.aggregates import (
+    AggregatesHandler,
+    Aggregator,
+    QuantileSketch,
+    RunningStats,
+    get_aggregator,
+)
+from src.monitoring_tests.base_test import BaseTest
+from src.results import Result
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def create_result(
+    solver: str, value: float, alert: bool = False, chain: str = ""
+) -> Result:
+    return Result(
+        "HighScoreTest", "0x01", "", solver, alert, {"score_eth": value}, chain=chain
+    )
+
+
+class RetriedTest(BaseTest):
+    """Records a score on every run, and needs to be run again after the first run."""
+
+    def __init__(self, aggregator: Aggregator) -> None:
+        super().__init__()
+        self.alert_dispatcher = None
+        self.results_store = None
+        self.aggregator = aggregator
+        self.runs = 0
+
+    def run(self, tx_hash: str) -> bool:
+        self.runs += 1
+        self.record_result(tx_hash, {"score_eth": float(self.runs)}, solver="solver_a")
+        return self.runs > 1
+
+
+class TestStatistics(unittest.TestCase):
+    def test_running_stats(self) -> None:
+        values = [random.uniform(-10, 10) for _ in range(1000)]
+        stats, first, second = RunningStats(), RunningStats(), RunningStats()
+        for value in values:
+            stats.add(value)
+        for value in values[:300]:
+            first.add(value)
+        for value in values[300:]:
+            second.add(value)
+        first.merge(second)
+        for merged in (stats, first):
+            self.assertEqual(merged.count, 1000)
+            self.assertAlmostEqual(merged.mean, statistics.fmean(values))
+            self.assertAlmostEqual(merged.variance, statistics.pvariance(values))
+            self.assertAlmostEqual(merged.total, sum(values))
+            self.assertEqual(merged.maximum, max(values))
+
+    def test_quantile_sketch(self) -> None:
+        values = [random.lognormvariate(0, 2) for _ in range(10000)]
+        values += [-value for value in values[:1000]] + [0.0] * 500
+        sketch = QuantileSketch(0.01)
+        for value in values:
+            sketch.add(value)
+        values.sort()
+        for quantile in (0.01, 0.05, 0.5, 0.9, 0.99):
+            exact = values[int(quantile * (len(values) - 1))]
+            estimate = sketch.quantile(quantile)
+            assert estimate is not None
+            self.assertLessEqual(abs(estimate - exact), 0.01 * abs(exact))
+        self.assertIsNone(QuantileSketch().quantile(0.5))
+
+
+class TestAggregator(unittest.TestCase):
+    def test_rolling_windows(self) -> None:
+        clock = Clock()
+        aggregator = Aggregator({"1h": 3600}, bucket_width=600, clock=clock)
+        aggregator.record(create_result("solver_a", 1.0))
+        aggregator.record(create_result("solver_b", 3.0, alert=True))
+        clock.now += 7200
+        aggregator.record(create_result("solver_a", 5.0))
+
+        all_time = aggregator.get("HighScoreTest", "solver_a", "score_eth")
+        last_hour = aggregator.get("HighScoreTest", "solver_a", "score_eth", "1h")
+        all_solvers = aggregator.get("HighScoreTest", "", "score_eth")
+        alert_rate = aggregator.get("HighScoreTest", "", "alert")
+        assert all_time and last_hour and all_solvers and alert_rate
+        self.assertEqual((all_time["count"], all_time["mean"]), (2, 3.0))
+        self.assertEqual((last_hour["count"], last_hour["total"]), (1, 5.0))
+        self.assertEqual((all_solvers["count"], all_solvers["max"]), (3, 5.0))
+        self.assertAlmostEqual(alert_rate["mean"], 1 / 3)
+        self.assertIsNone(aggregator.get("HighScoreTest", "solver_c", "score_eth"))
+        self.assertEqual(len(aggregator.query(solver="solver_b")), 2)
+        with self.assertRaises(ValueError):
+            aggregator.query(window="1y")
+
+    def test_chains(self) -> None:
+        aggregator = Aggregator({}, clock=Clock())
+        aggregator.record(create_result("solver_a", 1.0, chain="mainnet"))
+        aggregator.record(create_result("solver_a", 3.0, chain="gnosis"))
+
+        mainnet = aggregator.get(
+            "HighScoreTest", "solver_a", "score_eth", chain="mainnet"
+        )
+        all_chains = aggregator.get("HighScoreTest", "solver_a", "score_eth")
+        assert mainnet and all_chains
+        self.assertEqual((mainnet["count"], mainnet["mean"]), (1, 1.0))
+        self.assertEqual((all_chains["count"], all_chains["mean"]), (2, 2.0))
+        self.assertIsNone(
+            aggregator.get("HighScoreTest", "solver_a", "score_eth", chain="base")
+        )
+        self.assertEqual(
+            {row["chain"] for row in aggregator.query(chain="gnosis")}, {"gnosis"}
+        )
+
+    def test_retried_runs_are_aggregated_once(self) -> None:
+        aggregator = Aggregator({}, clock=Clock())
+        test = RetriedTest(aggregator)
+        test.add_hashes_to_queue(["0x01"])
+        test.run_queue()
+        self.assertIsNone(aggregator.get("RetriedTest", "solver_a", "score_eth"))
+        test.run_queue()
+        score = aggregator.get("RetriedTest", "solver_a", "score_eth")
+        assert score
+        self.assertEqual((score["count"], score["mean"]), (1, 2.0))
+        self.assertEqual(test.pending_results, {})
+
+    def test_endpoint(self) -> None:
+        get_aggregator.cache_clear()
+        get_aggregator().record(create_result("solver_a", 2.0))
+        server = ThreadingHTTPServer(("127.0.0.1", 0), AggregatesHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/aggregates"
+        with urlopen(f"{url}?solver=solver_a&window=1h", timeout=5) as response:
+            aggregates = json.loads(response.read())
+        server.shutdown()
+        server.server_close()
+        get_aggregator.cache_clear()
+        self.assertEqual(
+            {(row["value"], row["count"]) for row in aggregates},
+            {("score_eth", 1), ("alert", 1)},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+"""
+Tests for the asynchronous Slack alert dispatcher.
+"""
+
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+from src.alerts import AlertSuppressor, SlackAlertDispatcher, TokenBucket
+
+
+class TestAlertSuppressor(unittest.TestCase):
+    def test_suppress_and_summarize(self) -> None:
+        now = [0.0]
+        suppressor = AlertSuppressor(window=60, clock=lambda: now[0])
+        key = ("solver", "sell_token", "buy_token")
+        self.assertTrue(suppressor.check(key, "alert 1"))
+        self.assertTrue(suppressor.check(("other solver",), "alert 2"))
+        now[0] = 30
+        self.assertFalse(suppressor.check(key, "alert 3"))
+        self.assertFalse(suppressor.check(key, "alert 4"))
+        self.assertEqual(suppressor.expire(), [])
+        now[0] = 60
+        (summary,) = suppressor.expire()
+        self.assertTrue(summary.startswith("2 repeated alerts suppressed"))
+        self.assertTrue(summary.endswith("alert 4"))
+        self.assertEqual(suppressor.windows, {})
+        self.assertTrue(suppressor.check(key, "alert 5"))
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_waits_when_empty(self) -> None:
+        now = [0.0]
+        sleeps: list[float] = []
+
+        def sleep(seconds: float) -> None:
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        bucket = TokenBucket(rate=2, capacity=2, clock=lambda: now[0], sleep=sleep)
+        for _ in range(3):
+            bucket.acquire()
+        self.assertEqual(sleeps, [0.5])
+
+
+class TestSlackAlertDispatcher(unittest.TestCase):
+    def setUp(self) -> None:
+        self.client = MagicMock()
+        self.dispatcher = SlackAlertDispatcher(
+            self.client,
+            "#test",
+            flush_interval=0.05,
+            rate_limiter=TokenBucket(rate=1000, capacity=1000),
+            max_retries=2,
+            sleep=lambda _: None,
+        )
+
+    def tearDown(self) -> None:
+        self.dispatcher.stop(timeout=1)
+
+    def test_coalesce_per_source(self) -> None:
+        self.dispatcher.submit("TestA", "alert 1")
+        self.dispatcher.submit("TestA", "alert 2")
+        self.dispatcher.submit("TestB", "alert 3")
+        self.dispatcher.stop(timeout=1)
+        texts = [
+            call.kwargs["text"] for call in self.client.chat_postMessage.mock_calls
+        ]
+        self.assertEqual(texts, ["2 alerts from TestA:\nalert 1\nalert 2", "alert 3"])
+
+    def test_retry(self) -> None:
+        self.client.chat_postMessage.side_effect = [ValueError("error"), None]
+        self.dispatcher.submit("TestA", "alert")
+        self.dispatcher.stop(timeout=1)
+        self.assertEqual(self.client.chat_postMessage.call_count, 2)
+
+    def test_drop_when_full(self) -> None:
+        dispatcher = SlackAlertDispatcher(
+            self.client, "#test", max_queue_size=1, flush_interval=0.05
+        )
+        # stop the worker thread so that the queue fills up
+        dispatcher.queue.put(None)
+        dispatcher.thread.join(timeout=1)
+        self.assertTrue(dispatcher.submit("TestA", "alert 1"))
+        self.assertFalse(dispatcher.submit("TestA", "alert 2"))
+        self.assertEqual(dispatcher.dropped, 1)
+
+    def test_stop_when_full(self) -> None:
+        # Slack does not respond, so that the worker thread is stuck in delivering
+        released = threading.Event()
+        self.client.chat_postMessage.side_effect = lambda **_: released.wait()
+        dispatcher = SlackAlertDispatcher(
+            self.client, "#test", max_queue_size=1, flush_interval=0.01
+        )
+        dispatcher.submit("TestA", "alert 1")
+        while self.client.chat_postMessage.call_count == 0:
+            time.sleep(0.01)
+        self.assertTrue(dispatcher.submit("TestA", "alert 2"))
+        start = time.monotonic()
+        dispatcher.stop(timeout=0.1)
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(dispatcher.dropped, 1)
+        released.set()
+        dispatcher.thread.join(timeout=1)
+        self.assertFalse(dispatcher.thread.is_alive())
+        self.assertEqual(self.client.chat_postMessage.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
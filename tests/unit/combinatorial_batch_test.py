@@ -0,0 +1,71 @@
+"""
+Tests for the batched evaluation of the combinatorial auction.
+"""
+
+import unittest
+from src.combinatorial_batch import evaluate_batch
+from src.monitoring_tests.combinatorial_auction_surplus_test import (
+    CombinatorialAuctionSurplusTest,
+)
+from tests.benchmarks.synthetic import generate_competition_payload
+
+
+class TestCombinatorialBatch(unittest.TestCase):
+    def test_matches_single_evaluation(self) -> None:
+        payloads = [
+            generate_competition_payload(
+                num_solutions=seed % 12 + 1,
+                num_orders=seed % 7 + 1,
+                num_tokens=seed % 4 + 2,
+                seed=seed,
+            )
+            for seed in range(100)
+        ]
+        results = evaluate_batch(payloads)
+        self.assertEqual(len(results), len(payloads))
+        levels = set()
+        for payload, result in zip(payloads, results):
+            expected = CombinatorialAuctionSurplusTest.evaluate(payload)
+            self.assertEqual(result["tx_hash"], payload["tx_hash"])
+            self.assertEqual(result["winner"], expected["winner"])
+            self.assertEqual(result["level"], expected["level"])
+            for name, value in expected["values"].items():
+                self.assertAlmostEqual(
+                    result["values"][name], value, delta=1e-9 * max(1, abs(value))
+                )
+            levels.add(result["level"])
+        self.assertEqual(levels, {"alert", "info", "debug"})
+
+    def test_winner_filtered_by_baseline(self) -> None:
+        buy_order = [10**18, 10**18, 0, "0xb", "0xa", False, False]
+        sell_order = [10**18, 10**18, 0, "0xc", "0xa", True, False]
+        payload = {
+            "tx_hash": "0x1",
+            "prices": {"0xa": str(10**18), "0xb": str(10**18), "0xc": str(10**18)},
+            "solutions": [
+                {
+                    "solver": "baseline",
+                    "trades": [[*sell_order, 2 * 10**18, 10**18, 0]],
+                },
+                {
+                    "solver": "solver",
+                    "trades": [
+                        [*buy_order, 10**18, 10**18 // 2, 0],
+                        [*sell_order, 10**18 + 10**17, 10**18, 0],
+                    ],
+                },
+            ],
+        }
+        (result,) = evaluate_batch([payload])
+        self.assertEqual(result["winner"], "solver")
+        self.assertEqual(result["level"], "alert")
+        self.assertEqual(result["values"]["filtering_solutions"], 1)
+        self.assertAlmostEqual(result["values"]["total_surplus_eth"], 0.6)
+        self.assertAlmostEqual(result["values"]["combinatorial_surplus_eth"], 1.0)
+
+    def test_empty_batch(self) -> None:
+        self.assertEqual(evaluate_batch([]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+Tests for running CPU bound tests in the process pool.
+"""
+
+import os
+import tempfile
+import unittest
+from typing import Any, Optional
+from unittest.mock import Mock, patch
+from prometheus_client import REGISTRY
+from src.helper_functions import get_process_pool
+from src.monitoring_tests.base_test import CPUBoundTest
+
+
+class SquareTest(CPUBoundTest):
+    """Squares the number in a hash, hashes without number need to be run again."""
+
+    def __init__(self, *, chain_name: str = "") -> None:
+        super().__init__(chain_name=chain_name)
+        self.alert_dispatcher = None
+        self.reported: dict[str, Any] = {}
+
+    def fetch(self, tx_hash: str) -> Optional[dict[str, Any]]:
+        if not tx_hash.isdigit():
+            return None
+        return {"number": int(tx_hash)}
+
+    @staticmethod
+    def evaluate(payload: dict[str, Any]) -> dict[str, Any]:
+        return {"square": payload["number"] ** 2, "pid": os.getpid()}
+
+    def report(self, tx_hash: str, result: dict[str, Any]) -> bool:
+        self.reported[tx_hash] = result
+        return True
+
+
+class TestCPUBoundTest(unittest.TestCase):
+    def run_queue(
+        self, pool_size: str, profiling_dir: str = "", chain_name: str = ""
+    ) -> SquareTest:
+        get_process_pool.cache_clear()
+        environment = {"PROCESS_POOL_SIZE": pool_size, "PROFILING_DIR": profiling_dir}
+        with patch.dict(os.environ, environment):
+            test = SquareTest(chain_name=chain_name)
+            test.add_hashes_to_queue(["2", "x", str(10**30)])
+            test.run_queue()
+        process_pool = get_process_pool()
+        if process_pool is not None:
+            process_pool.shutdown()
+        get_process_pool.cache_clear()
+        return test
+
+    def test_process_pool(self) -> None:
+        test = self.run_queue("2")
+        self.assertEqual(test.tx_hashes, ["x"])
+        self.assertEqual(test.reported["2"]["square"], 4)
+        self.assertEqual(test.reported[str(10**30)]["square"], 10**60)
+        self.assertNotEqual(test.reported["2"]["pid"], os.getpid())
+
+    def test_process_pool_profiling(self) -> None:
+        with tempfile.TemporaryDirectory() as profiling_dir:
+            self.run_queue("2", profiling_dir, chain_name="pool")
+            self.assertEqual(
+                set(os.listdir(profiling_dir)),
+                {
+                    "SquareTest_2_fetch.json",
+                    "SquareTest_2_report.json",
+                    "SquareTest_x_fetch.json",
+                    f"SquareTest_{10**30}_fetch.json",
+                    f"SquareTest_{10**30}_report.json",
+                },
+            )
+        self.assertEqual(
+            REGISTRY.get_sample_value(
+                "ebbo_test_run_seconds_count", {"chain": "pool", "test": "SquareTest"}
+            ),
+            3,
+        )
+
+    def test_without_process_pool(self) -> None:
+        test = self.run_queue("0")
+        self.assertEqual(test.tx_hashes, ["x"])
+        self.assertEqual(test.reported["2"], {"square": 4, "pid": os.getpid()})
+
+    def test_chain_labels(self) -> None:
+        get_process_pool.cache_clear()
+        with patch.dict(os.environ, {"PROCESS_POOL_SIZE": "0"}):
+            test = SquareTest(chain_name="gnosis")
+            test.alert_dispatcher = Mock()
+            test.add_hashes_to_queue(["3"])
+            test.run_queue()
+            test.emit_alert("Alert")
+        get_process_pool.cache_clear()
+        test.alert_dispatcher.submit.assert_called_once_with(
+            "gnosis/SquareTest", "[gnosis] Alert"
+        )
+        self.assertEqual(
+            REGISTRY.get_sample_value(
+                "ebbo_test_run_seconds_count",
+                {"chain": "gnosis", "test": "SquareTest"},
+            ),
+            1,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+"""
+Tests for the multi-chain daemon.
+"""
+
+import os
+import unittest
+from unittest.mock import patch
+from src.daemon import ChainPipeline, get_node_urls, run_pipelines
+
+
+class TestDaemon(unittest.TestCase):
+    def test_node_urls(self) -> None:
+        with patch.dict(os.environ, {"NODE_URLS": "http://a, http://b,"}):
+            self.assertEqual(get_node_urls(), ["http://a", "http://b"])
+        with patch.dict(os.environ, {"NODE_URLS": ""}):
+            self.assertEqual(get_node_urls(), [None])
+
+    def test_failing_chain_is_isolated(self) -> None:
+        failing = ChainPipeline("http://127.0.0.1:1")
+        healthy = ChainPipeline("http://127.0.0.1:2")
+        with patch.object(
+            failing.web3_api, "get_chain_id", side_effect=ConnectionError("down")
+        ), patch.object(
+            healthy.web3_api, "get_chain_id", return_value=100
+        ), patch.object(
+            healthy.web3_api, "get_current_block_number", return_value=10
+        ):
+            run_pipelines([failing, healthy])
+        self.assertIsNone(failing.chain_name)
+        self.assertEqual(healthy.chain_name, "xdai")
+        self.assertEqual(healthy.start_block, 10)
+        self.assertEqual(healthy.tests, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
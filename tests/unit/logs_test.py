@@ -0,0 +1,60 @@
+"""
+Tests for the logging configuration.
+"""
+
+import json
+import logging
+import queue
+import unittest
+from prometheus_client import REGISTRY
+from src.logs import JsonFormatter, NonBlockingQueueHandler, parse_levels
+
+
+class Unformattable(float):
+    def __str__(self) -> str:
+        raise AssertionError("formatted in the logging thread")
+
+
+def create_record(msg: str, *args: object) -> logging.LogRecord:
+    return logging.LogRecord("ebbo.HighScoreTest", logging.INFO, "", 0, msg, args, None)
+
+
+class TestLogs(unittest.TestCase):
+    def test_json_formatter(self) -> None:
+        entry = json.loads(JsonFormatter().format(create_record("score %.1f", 2.5)))
+        self.assertEqual(entry["message"], "score 2.5")
+        self.assertEqual(entry["logger"], "ebbo.HighScoreTest")
+        self.assertEqual(entry["level"], "INFO")
+
+    def test_queue_handler(self) -> None:
+        log_queue: queue.Queue[logging.LogRecord] = queue.Queue(2)
+        handler = NonBlockingQueueHandler(log_queue)
+        dropped = REGISTRY.get_sample_value("ebbo_log_records_dropped_total") or 0
+        for _ in range(3):
+            handler.handle(create_record("%s", Unformattable()))
+        self.assertEqual(log_queue.qsize(), 2)
+        self.assertEqual(handler.dropped, 1)
+        self.assertEqual(
+            REGISTRY.get_sample_value("ebbo_log_records_dropped_total"), dropped + 1
+        )
+
+    def test_mutable_arguments_are_formatted(self) -> None:
+        log_queue: queue.Queue[logging.LogRecord] = queue.Queue()
+        handler = NonBlockingQueueHandler(log_queue)
+        hashes = ["0x01"]
+        handler.handle(create_record("hashes %s, score %.1f", hashes, 2.5))
+        handler.handle(create_record("hash %s, score %.1f", "0x02", 2.5))
+        hashes.append("0x03")
+        mutable, immutable = log_queue.get(), log_queue.get()
+        self.assertEqual(mutable.getMessage(), "hashes ['0x01'], score 2.5")
+        self.assertEqual(immutable.args, ("0x02", 2.5))
+
+    def test_parse_levels(self) -> None:
+        self.assertEqual(
+            parse_levels("HighScoreTest=debug, Web3API=ERROR,invalid"),
+            {"HighScoreTest": "DEBUG", "Web3API": "ERROR"},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,201 @@
+"""
+Tests for simulating auction mechanisms on cached competitions.
+"""
+
+import os
+import tempfile
+import unittest
+from typing import Any, Optional
+from unittest.mock import patch
+import numpy as np
+from src.combinatorial_batch import build_surplus_matrix, evaluate_batch
+from src.mechanisms import (
+    Combinatorial,
+    CompetitionCache,
+    FairBatch,
+    OptimalPacking,
+    SingleWinner,
+    default_mechanisms,
+    simulate,
+)
+from src.winner_determination import pack_solutions
+from tests.benchmarks.synthetic import generate_competition_payload
+
+
+class TestMechanisms(unittest.TestCase):
+    def setUp(self) -> None:
+        self.payloads = [
+            generate_competition_payload(
+                num_solutions=seed % 12 + 1,
+                num_orders=seed % 7 + 1,
+                num_tokens=seed % 4 + 2,
+                seed=seed,
+            )
+            for seed in range(50)
+        ]
+        self.matrix = build_surplus_matrix(self.payloads)
+
+    def test_matches_combinatorial_auction_test(self) -> None:
+        expected = evaluate_batch(self.payloads)
+        single_winner, combinatorial = simulate(
+            self.matrix, {"single": SingleWinner(), "combinatorial": Combinatorial()}
+        )
+        np.testing.assert_allclose(
+            single_winner.surplus,
+            [result["values"]["total_surplus_eth"] for result in expected],
+        )
+        np.testing.assert_allclose(
+            combinatorial.surplus,
+            [result["values"]["combinatorial_surplus_eth"] for result in expected],
+        )
+        self.assertTrue((single_winner.winners == 1).all())
+
+    def test_token_pairs_are_won_at_most_once(self) -> None:
+        for name, mechanism in default_mechanisms().items():
+            winning = mechanism.allocate(self.matrix)
+            columns = self.matrix.columns[winning]
+            self.assertEqual(len(columns), len(np.unique(columns)), name)
+
+    def test_fair_batch_selects_largest_surplus(self) -> None:
+        order = [10**18, 10**18, 0, "0xb", "0xa", True, False]
+        other_order = [10**18, 10**18, 0, "0xc", "0xa", True, False]
+        payload = {
+            "tx_hash": "0x1",
+            "prices": {"0xa": str(10**18), "0xb": str(10**18), "0xc": str(10**18)},
+            "solutions": [
+                {
+                    "solver": "large",
+                    "trades": [
+                        [*order, 2 * 10**18, 10**18, 0],
+                        [*other_order, 2 * 10**18, 10**18, 0],
+                    ],
+                },
+                {
+                    "solver": "small",
+                    "trades": [
+                        [*order, 10**18 + 10**17, 10**18, 0],
+                        [*other_order, 10**18 + 10**17, 10**18, 0],
+                    ],
+                },
+            ],
+        }
+        matrix = build_surplus_matrix([payload])
+        combinatorial, fair_batch = simulate(
+            matrix, {"combinatorial": Combinatorial(), "fair_batch": FairBatch()}
+        )
+        self.assertAlmostEqual(combinatorial.surplus[0], 0.2)
+        self.assertAlmostEqual(fair_batch.surplus[0], 2.0)
+        summary = fair_batch.summary(combinatorial)
+        self.assertEqual(summary["competitions_with_more_surplus"], 1)
+        self.assertAlmostEqual(summary["surplus_difference_eth"], 1.8)
+
+    def test_baseline_solvers(self) -> None:
+        np.testing.assert_array_equal(
+            Combinatorial(baseline_solvers=set(self.matrix.solvers)).allocate(
+                self.matrix
+            ),
+            Combinatorial().allocate(self.matrix),
+        )
+        # without baseline, no solution is filtered out and the winner wins everything
+        np.testing.assert_array_equal(
+            Combinatorial(baseline_solvers=set()).allocate(self.matrix),
+            SingleWinner().allocate(self.matrix),
+        )
+
+    def test_optimal_packing_has_largest_surplus(self) -> None:
+        simulations = {
+            simulation.mechanism: simulation for simulation in simulate(self.matrix)
+        }
+        for name, simulation in simulations.items():
+            self.assertTrue(
+                (simulations["optimal"].surplus >= simulation.surplus - 1e-9).all(),
+                name,
+            )
+        for name in ["combinatorial", "fair_batch"]:
+            self.assertTrue(
+                (
+                    simulations["optimal_fair"].surplus
+                    >= simulations[name].surplus - 1e-9
+                ).all(),
+                name,
+            )
+        mechanism = OptimalPacking()
+        mechanism.allocate(self.matrix)
+        self.assertEqual(mechanism.not_optimal, 0)
+
+    def test_default_mechanisms_are_not_shared(self) -> None:
+        mechanism, other = (
+            default_mechanisms()["optimal"],
+            default_mechanisms()["optimal"],
+        )
+        assert isinstance(mechanism, OptimalPacking) and isinstance(
+            other, OptimalPacking
+        )
+        # a search without time budget is not proven optimal
+        mechanism.time_budget = 0.0
+        mechanism.allocate(self.matrix)
+        self.assertGreater(mechanism.not_optimal, 0)
+        self.assertEqual(other.not_optimal, 0)
+
+    def test_optimal_packing_uses_columns_of_competition(self) -> None:
+        payloads = [
+            generate_competition_payload(
+                num_solutions=10, num_orders=50, num_tokens=30, seed=seed
+            )
+            for seed in range(40)
+        ]
+        matrix = build_surplus_matrix(payloads)
+        self.assertGreater(matrix.num_columns, 1000)
+        with patch("src.mechanisms.pack_solutions", wraps=pack_solutions) as packing:
+            batch = OptimalPacking().allocate(matrix)
+        # token pairs are numbered per competition, not by their column in the batch
+        for competition, call in enumerate(packing.call_args_list):
+            num_columns = np.count_nonzero(matrix.column_competition == competition)
+            for token_pairs in call.args[0]:
+                self.assertTrue(all(0 <= pair < num_columns for pair in token_pairs))
+        # the last competition is allocated as if it was simulated on its own
+        alone = OptimalPacking().allocate(build_surplus_matrix(payloads[-1:]))
+        np.testing.assert_array_equal(
+            batch[matrix.entry_competition == len(payloads) - 1], alone
+        )
+
+    def test_matrices_without_entries(self) -> None:
+        payload = {
+            "tx_hash": "0x1",
+            "prices": {},
+            "solutions": [{"solver": "a", "trades": []}],
+        }
+        for payloads in ([], [payload]):
+            matrix = build_surplus_matrix(payloads)
+            for simulation in simulate(matrix):
+                self.assertEqual(
+                    simulation.surplus.tolist(), [0.0] * len(payloads), simulation
+                )
+
+
+class TestCompetitionCache(unittest.TestCase):
+    def test_fetches_missing_competitions_once(self) -> None:
+        fetched: list[str] = []
+
+        def fetch(tx_hash: str) -> Optional[dict[str, Any]]:
+            fetched.append(tx_hash)
+            if tx_hash == "0x3":
+                return None
+            return {"tx_hash": tx_hash, "prices": {}, "solutions": []}
+
+        with tempfile.TemporaryDirectory() as directory:
+            cache = CompetitionCache(os.path.join(directory, "competitions.sqlite"))
+            payloads = cache.get_or_fetch(["0x2", "0x1", "0x3"], fetch)
+            self.assertEqual(
+                [payload["tx_hash"] for payload in payloads], ["0x2", "0x1"]
+            )
+            cache.get_or_fetch(["0x1", "0x2"], fetch)
+            self.assertEqual(fetched, ["0x2", "0x1", "0x3"])
+            self.assertEqual(
+                [payload["tx_hash"] for payload in cache.payloads()], ["0x1", "0x2"]
+            )
+            cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+"""
+Tests for the Prometheus metrics helpers.
+"""
+
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+from prometheus_client import REGISTRY
+from src.helper_functions import get_session
+from src.metrics import observe_api_request
+
+
+def sample(name: str, method: str) -> float:
+    value = REGISTRY.get_sample_value(name, {"api": "test_api", "method": method})
+    return value or 0.0
+
+
+class StatusHandler(BaseHTTPRequestHandler):
+    """Responds with the status given as path, e.g. GET /404."""
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        self.send_response(int(self.path.strip("/")))
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args: Any) -> None:  # pylint: disable=W0622
+        pass
+
+
+class TestObserveApiRequest(unittest.TestCase):
+    def test_counts_requests_and_errors(self) -> None:
+        @observe_api_request("test_api")
+        def request(value: Optional[int]) -> Optional[int]:
+            if value == 0:
+                raise ValueError("failed")
+            return value
+
+        count = sample("ebbo_api_request_seconds_count", "request")
+        errors = sample("ebbo_api_errors_total", "request")
+        self.assertEqual(request(1), 1)
+        # None signals missing data, which is not an error
+        self.assertIsNone(request(None))
+        with self.assertRaises(ValueError):
+            request(0)
+        self.assertEqual(sample("ebbo_api_request_seconds_count", "request"), count + 3)
+        self.assertEqual(sample("ebbo_api_errors_total", "request"), errors + 1)
+
+    def test_counts_failure_statuses(self) -> None:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StatusHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+
+        @observe_api_request("test_api")
+        def get(status: int) -> Optional[int]:
+            response = get_session().get(f"{url}/{status}", timeout=5)
+            return response.status_code if response.status_code == 200 else None
+
+        try:
+            errors = sample("ebbo_api_errors_total", "get")
+            get(200)
+            get(404)
+            self.assertEqual(sample("ebbo_api_errors_total", "get"), errors)
+            get(500)
+            get(429)
+            self.assertEqual(sample("ebbo_api_errors_total", "get"), errors + 2)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+"""
+Tests for grouping blocks into log query windows of the kickbacks test.
+"""
+
+import unittest
+from src.monitoring_tests.mev_blocker_kickbacks_test import block_windows
+
+
+class TestBlockWindows(unittest.TestCase):
+    def test_nearby_blocks_share_a_window(self) -> None:
+        self.assertEqual(block_windows([105, 100, 100, 199], 100), [range(100, 200)])
+
+    def test_distant_blocks_get_own_windows(self) -> None:
+        self.assertEqual(
+            block_windows([20_000_000, 100, 20_000_050, 150], 100),
+            [range(100, 151), range(20_000_000, 20_000_051)],
+        )
+
+    def test_windows_are_bounded(self) -> None:
+        block_numbers = list(range(0, 1000, 7))
+        windows = block_windows(block_numbers, 100)
+        self.assertTrue(all(len(window) <= 100 for window in windows))
+        self.assertTrue(
+            all(any(block in window for window in windows) for block in block_numbers)
+        )
+
+    def test_no_blocks(self) -> None:
+        self.assertEqual(block_windows([]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+"""
+Tests for profiling of test runs.
+"""
+
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+from src.profiling import ALERT, COMPUTE, DECODE, FETCH, profile, stage
+
+
+class TestProfile(unittest.TestCase):
+    def test_disabled(self) -> None:
+        with patch.dict(os.environ, {"PROFILING_DIR": ""}):
+            with profile("Test", "abc"):
+                with stage(FETCH):
+                    pass
+
+    def test_writes_trace(self) -> None:
+        with tempfile.TemporaryDirectory() as profiling_dir:
+            with patch.dict(os.environ, {"PROFILING_DIR": profiling_dir}):
+                with profile("Test", "abc"):
+                    with stage(FETCH, "web3.get_transaction"):
+                        time.sleep(0.01)
+                    with stage(DECODE, "trades"):
+                        with stage(FETCH, "orderbook.get_order_data"):
+                            pass
+                    with stage(ALERT):
+                        pass
+            with open(
+                os.path.join(profiling_dir, "Test_abc.json"), encoding="utf-8"
+            ) as file:
+                trace = json.load(file)
+
+        root, *events = trace["traceEvents"]
+        self.assertEqual(
+            [event["name"] for event in events],
+            ["web3.get_transaction", "orderbook.get_order_data", "trades", "alert"],
+        )
+        self.assertEqual(set(root["args"]), {FETCH, DECODE, ALERT, COMPUTE})
+        # nested fetch events are counted in the totals of the enclosing decode event
+        self.assertEqual(root["args"][FETCH]["wall_time_ms"], events[0]["dur"] / 1e3)
+        self.assertGreaterEqual(root["args"][COMPUTE]["wall_time_ms"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+Tests for the results store.
+"""
+
+import importlib.util
+import os
+import tempfile
+import unittest
+from src.results import Result, ResultsStore
+
+
+def create_result(index: int, alert: bool = False) -> Result:
+    return Result(
+        "HighScoreTest",
+        f"0x{index:064x}",
+        "",
+        "solver",
+        alert,
+        {"score_eth": float(index)},
+        recorded_at=float(index),
+    )
+
+
+class TestResultsStore(unittest.TestCase):
+    def test_batching(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.sqlite")
+            store = ResultsStore(path, batch_size=3)
+            reader = ResultsStore(path)
+            store.record(create_result(1))
+            store.record(create_result(2))
+            self.assertEqual(reader.query(), [])
+            store.record(create_result(3))
+            self.assertEqual(reader.query(), [create_result(i) for i in range(1, 4)])
+            store.close()
+            reader.close()
+
+    def test_results_are_replaced(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            store = ResultsStore(os.path.join(directory, "results.sqlite"))
+            store.record(create_result(1))
+            store.record(create_result(1, alert=True))
+            store.record(
+                Result("UniformDirectedPricesTest", "0x01", "0xa:0xb", "", True, {})
+            )
+            self.assertEqual(store.query("HighScoreTest"), [create_result(1, True)])
+            self.assertEqual(len(store.query()), 2)
+            store.close()
+
+    def test_discarded_results_are_deleted(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            store = ResultsStore(os.path.join(directory, "results.sqlite"))
+            first_run = [
+                Result("UniformDirectedPricesTest", "0x01", key, "", True, {})
+                for key in ("0xa:0xb", "0xb:0xc")
+            ]
+            for result in first_run:
+                store.record(result)
+            store.flush()
+            # the test is run again and finds only one of the token pairs
+            store.discard("", "UniformDirectedPricesTest", "0x01")
+            store.record(first_run[1])
+            store.discard("", "HighScoreTest", "0x01")
+            self.assertEqual(store.query(), [first_run[1]])
+            store.close()
+
+    def test_results_per_chain(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            store = ResultsStore(os.path.join(directory, "results.sqlite"))
+            mainnet = Result(
+                "HighScoreTest", "0x01", "", "", False, {}, chain="mainnet"
+            )
+            gnosis = Result("HighScoreTest", "0x01", "", "", True, {}, chain="gnosis")
+            store.record(mainnet)
+            store.record(gnosis)
+            self.assertEqual(
+                sorted(store.query(), key=lambda result: result.chain),
+                [gnosis, mainnet],
+            )
+            store.close()
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "requires pyarrow")
+    def test_export_parquet(self) -> None:
+        parquet = importlib.import_module("pyarrow.parquet")
+        with tempfile.TemporaryDirectory() as directory:
+            store = ResultsStore(os.path.join(directory, "results.sqlite"))
+            parquet_dir = os.path.join(directory, "parquet")
+            for i in range(5):
+                store.record(create_result(i))
+            (path,) = store.export_parquet(parquet_dir)
+            table = parquet.read_table(path)
+            self.assertEqual(table.column("score_eth").to_pylist(), list(range(5)))
+            self.assertEqual(store.export_parquet(parquet_dir), [])
+
+            # only results recorded since the previous export are appended as a new part
+            for i in range(5, 8):
+                store.record(create_result(i))
+            (new_path,) = store.export_parquet(parquet_dir)
+            self.assertNotEqual(new_path, path)
+            table = parquet.read_table(new_path)
+            self.assertEqual(table.column("score_eth").to_pylist(), [5, 6, 7])
+            store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+Tests for decoding settlement calldata.
+"""
+
+import unittest
+from web3 import Web3
+from contracts.gpv2_settlement import gpv2_settlement
+from src.constants import SETTLEMENT_CONTRACT_ADDRESS
+from src.settlement import decode_settlement, SettlementTrade, Interaction
+from tests.benchmarks.synthetic import generate_settle_arguments, encode_settle_calldata
+
+
+class TestSettlementDecoding(unittest.TestCase):
+    def setUp(self) -> None:
+        self.calldata = encode_settle_calldata(
+            generate_settle_arguments(num_tokens=5, num_trades=7, num_interactions=3)
+        )
+        contract = Web3().eth.contract(
+            address=SETTLEMENT_CONTRACT_ADDRESS, abi=gpv2_settlement
+        )
+        self.expected = contract.decode_function_input(self.calldata)[1]
+
+    def test_decode_matches_web3(self) -> None:
+        settlement = decode_settlement(self.calldata)
+        self.assertEqual(settlement.tokens, self.expected["tokens"])
+        self.assertEqual(settlement.clearing_prices, self.expected["clearingPrices"])
+        self.assertEqual(
+            settlement.trades,
+            [SettlementTrade(*trade.values()) for trade in self.expected["trades"]],
+        )
+        self.assertEqual(
+            settlement.interactions,
+            [
+                [Interaction(*interaction.values()) for interaction in phase]
+                for phase in self.expected["interactions"]
+            ],
+        )
+
+    def test_sections_decoded_on_access(self) -> None:
+        settlement = decode_settlement(self.calldata)
+        self.assertEqual(len(settlement.trades), len(self.expected["trades"]))
+        self.assertNotIn("tokens", vars(settlement))
+        self.assertNotIn("pre_interactions", vars(settlement))
+        self.assertEqual(
+            settlement.post_interactions,
+            [Interaction(*i.values()) for i in self.expected["interactions"][2]],
+        )
+        self.assertNotIn("pre_interactions", vars(settlement))
+
+    def test_ucp_indices_and_flags(self) -> None:
+        arguments = generate_settle_arguments(num_tokens=3, num_trades=4)
+        # the first token appears a second time with a different clearing price
+        arguments[0].append(arguments[0][0])
+        arguments[1].append(1)
+        settlement = decode_settlement(encode_settle_calldata(arguments))
+        self.assertEqual(
+            settlement.ucp_indices,
+            {token: arguments[0].index(token) for token in arguments[0]},
+        )
+        self.assertEqual(
+            [trade.is_sell_order for trade in settlement.trades],
+            [True, False, True, False],
+        )
+        self.assertEqual(
+            [trade.is_partially_fillable for trade in settlement.trades],
+            [True, False, False, True],
+        )
+
+    def test_hex_input_and_trailing_data(self) -> None:
+        # the settlement contract ignores data appended to the calldata, e.g. auction ids
+        settlement = decode_settlement("0x" + self.calldata.hex() + "00000000deadbeef")
+        self.assertEqual(settlement.tokens, self.expected["tokens"])
+
+    def test_wrong_selector(self) -> None:
+        with self.assertRaises(ValueError):
+            decode_settlement(b"\x00\x00\x00\x00" + self.calldata[4:])
+
+
+if __name__ == "__main__":
+    unittest.main()
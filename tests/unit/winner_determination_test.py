@@ -0,0 +1,73 @@
+"""
+Tests for finding the surplus maximizing winners of a combinatorial auction.
+"""
+
+import itertools
+import random
+import unittest
+from src.winner_determination import pack_solutions
+
+
+def brute_force(token_pairs: list[list[int]], surplus: list[float]) -> float:
+    """Largest surplus of a set of solutions with disjoint token pairs."""
+    best = 0.0
+    for size in range(1, len(token_pairs) + 1):
+        for solutions in itertools.combinations(range(len(token_pairs)), size):
+            touched = [pair for index in solutions for pair in token_pairs[index]]
+            if len(touched) == len(set(touched)):
+                best = max(best, sum(surplus[index] for index in solutions))
+    return best
+
+
+class TestWinnerDetermination(unittest.TestCase):
+    def test_matches_brute_force(self) -> None:
+        rng = random.Random(0)
+        for _ in range(200):
+            num_token_pairs = rng.randint(1, 8)
+            token_pairs = [
+                rng.sample(
+                    range(num_token_pairs), rng.randint(1, min(4, num_token_pairs))
+                )
+                for _ in range(rng.randint(1, 10))
+            ]
+            surplus = [rng.uniform(-1, 3) for _ in token_pairs]
+            packing = pack_solutions(token_pairs, surplus)
+            self.assertTrue(packing.optimal)
+            self.assertAlmostEqual(packing.surplus, brute_force(token_pairs, surplus))
+            self.assertAlmostEqual(
+                packing.surplus, sum(surplus[index] for index in packing.solutions)
+            )
+
+    def test_combination_beats_single_solution(self) -> None:
+        packing = pack_solutions(
+            [[0, 1, 2], [0], [1], [2, 3], [3]], [5.0, 2.0, 2.0, 2.0, -1.0]
+        )
+        self.assertEqual(packing.solutions, [1, 2, 3])
+        self.assertAlmostEqual(packing.surplus, 6.0)
+
+    def test_time_budget(self) -> None:
+        rng = random.Random(1)
+        token_pairs = [rng.sample(range(40), 5) for _ in range(50)]
+        surplus = [rng.uniform(0, 1) for _ in token_pairs]
+        now = [0.0]
+
+        def clock() -> float:
+            now[0] += 1
+            return now[0]
+
+        packing = pack_solutions(token_pairs, surplus, time_budget=3, clock=clock)
+        self.assertFalse(packing.optimal)
+        touched = [pair for index in packing.solutions for pair in token_pairs[index]]
+        self.assertEqual(len(touched), len(set(touched)))
+        self.assertLessEqual(
+            packing.surplus, pack_solutions(token_pairs, surplus).surplus
+        )
+
+    def test_no_positive_surplus(self) -> None:
+        packing = pack_solutions([[0], [0, 1], []], [-1.0, 0.0, 5.0])
+        self.assertEqual(packing.solutions, [])
+        self.assertEqual(packing.surplus, 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+"""
+Tests for the work queue of sharded settlement processing.
+"""
+
+import os
+import tempfile
+import unittest
+from src.models import SettlementEvent, TradeEvent
+from src.work_queue import (
+    HashRing,
+    SettlementTask,
+    SQLiteWorkQueue,
+    decode_settlement_event,
+    encode_settlement_event,
+    ring_position,
+)
+
+
+def create_task(index: int) -> SettlementTask:
+    trade = TradeEvent(
+        "0x01", "0x02", "0x03", 10**30, 5, 0, "0x" + "ab" * 56, 2 * index
+    )
+    return SettlementTask(
+        "mainnet", SettlementEvent(f"0x{index:064x}", 100, "0x" + "cd" * 32, 1, [trade])
+    )
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestHashRing(unittest.TestCase):
+    def test_adding_node_moves_few_keys(self) -> None:
+        keys = [f"0x{i:064x}" for i in range(1000)]
+        ring = HashRing(["a", "b", "c"])
+        owners = {key: ring.owner(key) for key in keys}
+        self.assertEqual(set(owners.values()), {"a", "b", "c"})
+
+        larger_ring = HashRing(["a", "b", "c", "d"])
+        moved = [key for key in keys if larger_ring.owner(key) != owners[key]]
+        self.assertTrue(all(larger_ring.owner(key) == "d" for key in moved))
+        self.assertLess(len(moved), 400)
+        self.assertIsNone(HashRing([]).owner(keys[0]))
+
+    def test_ranges(self) -> None:
+        ring = HashRing(["a", "b", "c"])
+        for node in ("a", "b", "c"):
+            ranges = ring.ranges(node)
+            for i in range(1000):
+                key = f"0x{i:064x}"
+                position = ring_position(key)
+                self.assertEqual(
+                    ring.owner(key) == node,
+                    any(start <= position < end for start, end in ranges),
+                )
+        self.assertEqual(HashRing(["a"]).ranges("a"), [(0, 1 << 63)])
+        self.assertEqual(ring.ranges("d"), [])
+
+
+class TestSQLiteWorkQueue(unittest.TestCase):
+    def test_serialization(self) -> None:
+        settlement_event = create_task(1).settlement_event
+        self.assertEqual(
+            decode_settlement_event(encode_settlement_event(settlement_event)),
+            settlement_event,
+        )
+
+    def test_leases(self) -> None:
+        clock = Clock()
+        with tempfile.TemporaryDirectory() as directory:
+            work_queue = SQLiteWorkQueue(
+                os.path.join(directory, "queue.sqlite"),
+                lease_duration=100,
+                heartbeat_timeout=50,
+                clock=clock,
+            )
+            tasks = [create_task(i) for i in range(20)]
+            work_queue.publish(tasks)
+            # publishing again, e.g. after a restart of the coordinator, adds no tasks
+            work_queue.publish(tasks[:5])
+            work_queue.heartbeat("worker_a")
+            work_queue.heartbeat("worker_b")
+
+            leased_a = work_queue.lease("worker_a", 100)
+            leased_b = work_queue.lease("worker_b", 100)
+            hashes_a = {task.tx_hash for task in leased_a}
+            hashes_b = {task.tx_hash for task in leased_b}
+            self.assertFalse(hashes_a & hashes_b)
+            self.assertEqual(hashes_a | hashes_b, {task.tx_hash for task in tasks})
+            self.assertEqual(work_queue.lease("worker_a", 100), [])
+
+            for task in leased_a:
+                work_queue.complete(task)
+            # worker b stops, its leases expire and its tasks move to worker a
+            clock.now += 101
+            work_queue.heartbeat("worker_a")
+            leased_again = work_queue.lease("worker_a", 100)
+            self.assertEqual({task.tx_hash for task in leased_again}, hashes_b)
+            self.assertTrue(all(task.attempts == 2 for task in leased_again))
+
+            task = leased_again[0]
+            work_queue.release(task, delay=10)
+            self.assertNotIn(task, work_queue.lease("worker_a", 100))
+            clock.now += 10
+            self.assertEqual(work_queue.lease("worker_a", 100)[0].tx_hash, task.tx_hash)
+            work_queue.close()
+
+    def test_lease_limit(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            work_queue = SQLiteWorkQueue(os.path.join(directory, "queue.sqlite"))
+            work_queue.publish([create_task(i) for i in range(20)])
+            work_queue.heartbeat("worker_a")
+            self.assertEqual(len(work_queue.lease("worker_a", 7)), 7)
+            self.assertEqual(len(work_queue.lease("worker_a", 100)), 13)
+            work_queue.close()
+
+    def test_prune(self) -> None:
+        clock = Clock()
+        with tempfile.TemporaryDirectory() as directory:
+            work_queue = SQLiteWorkQueue(
+                os.path.join(directory, "queue.sqlite"), clock=clock
+            )
+            tasks = [create_task(i) for i in range(2)]
+            work_queue.publish(tasks)
+            work_queue.heartbeat("worker_a")
+            work_queue.lease("worker_a", 1)
+            work_queue.complete(tasks[0])
+            work_queue.write_result(tasks[0].tx_hash, "HighScoreTest", True)
+            clock.now += 100
+            work_queue.prune(retention=50)
+            self.assertEqual(work_queue.passed_tests(tasks[0].tx_hash), set())
+            # the pending task is kept, the completed one is published again
+            work_queue.publish(tasks)
+            work_queue.heartbeat("worker_a")
+            self.assertEqual(len(work_queue.lease("worker_a", 100)), 2)
+            work_queue.close()
+
+    def test_results_are_idempotent(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            work_queue = SQLiteWorkQueue(os.path.join(directory, "queue.sqlite"))
+            work_queue.write_result("0x01", "HighScoreTest", False)
+            work_queue.write_result("0x01", "HighScoreTest", True)
+            work_queue.write_result("0x01", "HighScoreTest", True)
+            # a late failure of a repeated delivery does not overwrite the success
+            work_queue.write_result("0x01", "HighScoreTest", False)
+            work_queue.write_result("0x01", "PriceSensitivityTest", False)
+            self.assertEqual(work_queue.passed_tests("0x01"), {"HighScoreTest"})
+            work_queue.close()
+
+
+if __name__ == "__main__":
+    unittest.main()